@@ -3,14 +3,36 @@ Multi-Agent Research Assistant Configuration
 Defines the state, agents, and workflow for the research system
 """
 
-from typing import TypedDict, Annotated, List
+from typing import TypedDict, Annotated, Any, Dict, List, Optional, Tuple
 from langgraph.graph import StateGraph, END
 from langchain_groq import ChatGroq
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import AIMessage
+import contextlib
+import contextvars
+import hashlib
+import json
 import operator
 import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from pydantic import BaseModel
+from budget import TokenBudget, plan_query
+from extraction import build_research_context, dedupe_sources, strip_boilerplate
+from prompts import (
+    RESEARCH_PROMPT, EXTRACT_PROMPT, CRITIQUE_PROMPT, CRITIQUE_FOCUS_PROMPTS, SUMMARIZE_PROMPT, REVISE_PROMPT,
+    ROLLING_SUMMARY_PROMPT,
+    parse_verdict, record_prompt, track_prompts
+)
+from key_pool import RATE_LIMIT_HEADERS, KeyPool, build_llm_pool, build_search_pool
+from limiter import AdaptiveLimiter, LimitedSearch
+from scheduler import ScheduledLLM, ScheduledSearch, Scheduler, scheduling
+from search import SearchProvider, chunk_text, get_search_provider
+from profiling import profile_span, traced
+from replay import Recorder, RecordingLLM, RecordingSearch
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +46,14 @@ llm = ChatGroq(
     groq_api_key=os.getenv("GROQ_API_KEY")
 )
 
+# Smaller, faster model used when a run is close to its deadline
+fast_llm = ChatGroq(
+    model="llama-3.1-8b-instant",
+    temperature=0.7,
+    max_tokens=1024,
+    groq_api_key=os.getenv("GROQ_API_KEY")
+)
+
 # Initialize Tavily Search for real-time web data
 # Reduced results to minimize token usage
 tavily_search = TavilySearchResults(
@@ -31,10 +61,212 @@ tavily_search = TavilySearchResults(
     tavily_api_key=os.getenv("TAVILY_API_KEY")
 )
 
+# LLM backends that can be selected per agent (RESEARCH_LLM, CRITIQUE_LLM,
+# SUMMARIZE_LLM, falling back to LLM_PROVIDER, then groq)
+LLM_PROVIDERS = ("groq", "local", "stub")
+AGENT_NAMES = ("research", "critique", "summarize")
+
+# OpenAI chat roles for LangChain message types
+_CHAT_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+def _message_text(message) -> str:
+    return message if isinstance(message, str) else getattr(message, "content", "") or ""
+
+
+class LocalChatModel:
+    """
+    Chat model client for a local OpenAI-compatible server
+    
+    Works with llama.cpp's llama-server, vLLM, Ollama and LM Studio, which
+    all expose /v1/chat/completions. Uses only the standard library and
+    returns AIMessage objects with token usage, like ChatGroq.
+    """
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        timeout: float = 120.0
+    ):
+        """
+        Args:
+            base_url: Server URL up to /v1 (defaults to LOCAL_LLM_URL, then llama.cpp's port 8080)
+            model: Model name sent to the server (defaults to LOCAL_LLM_MODEL)
+            api_key: Optional bearer token (defaults to LOCAL_LLM_API_KEY)
+            temperature: Sampling temperature
+            max_tokens: Default output cap
+            timeout: Default request timeout in seconds
+        """
+        self.base_url = (base_url or os.getenv("LOCAL_LLM_URL") or "http://localhost:8080/v1").rstrip("/")
+        self.model = model or os.getenv("LOCAL_LLM_MODEL") or "local"
+        self.api_key = api_key or os.getenv("LOCAL_LLM_API_KEY")
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+    
+    def invoke(self, messages, max_tokens: Optional[int] = None, timeout: Optional[float] = None, **kwargs) -> AIMessage:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": _CHAT_ROLES.get(getattr(m, "type", "human"), "user"), "content": _message_text(m)}
+                for m in ([messages] if isinstance(messages, str) else messages)
+            ],
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+        }
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions", data=json.dumps(payload).encode("utf-8"), headers=headers
+        )
+        with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+            body = json.loads(response.read().decode("utf-8"))
+            # Quota left on this key, for KeyPool's load balancing
+            rate_limits = {k.lower(): v for k, v in response.headers.items() if k.lower().startswith(RATE_LIMIT_HEADERS)}
+        
+        return AIMessage(
+            content=body["choices"][0]["message"]["content"],
+            response_metadata={
+                "token_usage": body.get("usage") or {},
+                "model_name": body.get("model", self.model),
+                "rate_limits": rate_limits,
+            }
+        )
+
+
+class StubChatModel:
+    """
+    Deterministic offline model for tests, benchmarks and dry runs
+    
+    Echoes the leading sentences of the last message, tagged with a hash of
+    the full prompt, so identical prompts always give identical answers.
+    """
+    
+    def __init__(self, max_tokens: int = 1024, latency: float = 0.0):
+        self.max_tokens = max_tokens
+        self.latency = latency
+    
+    def invoke(self, messages, max_tokens: Optional[int] = None, **kwargs) -> AIMessage:
+        messages = [messages] if isinstance(messages, str) else messages
+        prompt = "\n\n".join(_message_text(m) for m in messages)
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=4).hexdigest()
+        limit = (max_tokens or self.max_tokens) * 4
+        content = f"[stub {digest}] " + " ".join(_message_text(messages[-1]).split())[:limit]
+        if self.latency:
+            time.sleep(self.latency)
+        
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        return AIMessage(
+            content=content,
+            response_metadata={"token_usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }, "model_name": "stub"}
+        )
+
+
+# Several keys or endpoints (GROQ_API_KEYS, LLM_POOL_URLS, TAVILY_API_KEYS)
+# replace the single-key clients with load-balancing, failover pools
+llm = build_llm_pool(LocalChatModel, "llama-3.3-70b-versatile") or llm
+fast_llm = build_llm_pool(LocalChatModel, "llama-3.1-8b-instant") or fast_llm
+tavily_search = build_search_pool(max_results=3) or tavily_search
+
+
+# Local clients are created on first use and then shared
+_llm_clients: Dict[str, Any] = {}
+
+
+def get_llm(provider: Optional[str] = None, agent: Optional[str] = None):
+    """
+    Return the chat model for a provider, or the one configured for an agent
+    
+    Args:
+        provider: 'groq', 'local' or 'stub'
+        agent: Agent name used to look up <AGENT>_LLM when provider is None
+    
+    Returns:
+        A chat model with an invoke(messages, **kwargs) method
+    """
+    if provider is None:
+        provider = (agent and os.getenv(f"{agent.upper()}_LLM")) or os.getenv("LLM_PROVIDER") or "groq"
+    if provider not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    if provider == "groq":
+        return llm
+    if provider not in _llm_clients:
+        _llm_clients[provider] = LocalChatModel() if provider == "local" else StubChatModel()
+    return _llm_clients[provider]
+
+
+# Shared fair queue for every run built by run_research_assistant in this
+# process, so batch runs cannot starve interactive (Streamlit) users.
+# SCHEDULER_CONCURRENCY=auto (the default) learns the slot count from latency
+# and 429s, up to SCHEDULER_MAX_CONCURRENCY; a number fixes it.
+_concurrency = os.getenv("SCHEDULER_CONCURRENCY", "auto")
+request_scheduler = Scheduler(
+    limiter=AdaptiveLimiter(max_limit=int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "32")))
+) if _concurrency == "auto" else Scheduler(max_concurrent=int(_concurrency))
+
+# Set RECORD_TRACE to a .jsonl.gz path to record all LLM/search traffic for replay.py
+trace_recorder = Recorder(
+    os.environ["RECORD_TRACE"], include_requests=os.getenv("RECORD_TRACE_REQUESTS") == "1"
+) if os.getenv("RECORD_TRACE") else None
+
+# Character budget for source passages in the research prompt (~3 sources x 500)
+SOURCE_CONTEXT_CHARS = 1500
+
+# Map-reduce research: each source chunk is condensed by its own short call
+# (in parallel), then one reduce call writes the research summary
+MAP_REDUCE_MAX_RESULTS = 10       # sources fetched when no query budget sets one
+MAP_CHUNK_CHARS = 2000            # source text per map call
+MAP_MAX_CHUNKS_PER_SOURCE = 2
+MAP_MAX_TOKENS = 200              # completion cap per map call
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "8"))
+REDUCE_CONTEXT_CHARS = 6000       # extracts passed to the reduce call
+
+# Context budgets of the summarize call: the rolling summary covers earlier
+# rounds, so only the latest round is sent in full and the cost stays flat
+SUMMARY_RESEARCH_CHARS = 1500
+SUMMARY_CRITIQUE_CHARS = 500
+ROLLING_SUMMARY_CHARS = 1500
+ROLLING_SUMMARY_TOKENS = 400
+
+# Specialized critiques run side by side when parallel critique is enabled
+CRITIQUE_FOCUSES = ("factuality", "recency", "coverage")
+
+# Critique wording that asks for another round, for models that leave out the
+# VERDICT line (small local models, stubs); a verdict always takes precedence
+CONTINUE_KEYWORDS = ("more research", "insufficient", "gap")
+
+# Deadline thresholds (seconds remaining) for graceful degradation
+MIN_ITERATION_SECONDS = 15.0   # below this, no further research iterations
+FAST_MODE_SECONDS = 10.0       # below this, switch to fast_llm and shrink context
+MIN_CRITIQUE_SECONDS = 4.0     # below this, skip the critique call
+DEADLINE_RESERVE_SECONDS = 0.5  # kept back to assemble the partial result
+SHRUNK_CONTEXT_RATIO = 0.4
+
+def collect_parts(left: List[str], right: Optional[List[str]]) -> List[str]:
+    """
+    Reducer that accumulates parallel branch outputs; writing None clears it
+    """
+    if right is None:
+        return []
+    return (left or []) + right
+
 
 class AgentState(TypedDict):
     """
     State shared across all agents in the workflow
+    
+    Nodes return only the keys they change; list fields are merged by
+    their reducers, so parallel branches can write to them safely.
     """
     query: str
     research_results: Annotated[List[str], operator.add]
@@ -42,68 +274,299 @@ class AgentState(TypedDict):
     final_summary: str
     iteration: int
     max_iterations: int
+    critique_parts: Annotated[List[str], collect_parts]
+    prefetched_results: Optional[List[Dict[str, Any]]]
+    draft_summary: Optional[str]
+    speculation: Optional[str]
+    query_class: Optional[str]
+    max_results: Optional[int]
+    max_tokens: Optional[int]
+    deadline_at: Optional[float]
+    degraded: Annotated[List[str], operator.add]
+    running_summary: Optional[str]
+    sources: Annotated[List[Dict[str, Any]], operator.add]
+
+
+def join_truncated(parts: List[str], limit: int, separator: str = "\n\n") -> str:
+    """
+    Equivalent to separator.join(parts)[:limit] without building the full join
+    """
+    pieces = []
+    size = 0
+    for i, part in enumerate(parts):
+        if i:
+            pieces.append(separator)
+            size += len(separator)
+        if size >= limit:
+            break
+        pieces.append(part[:limit - size])
+        size += len(pieces[-1])
+    return "".join(pieces)[:limit]
+
+
+def time_remaining(state: AgentState) -> Optional[float]:
+    """
+    Seconds left before the run's deadline, or None if it has none
+    """
+    deadline_at = state.get("deadline_at")
+    return None if deadline_at is None else deadline_at - time.monotonic()
+
+
+def fast_mode(state: AgentState) -> bool:
+    """
+    Whether the run is close enough to its deadline to degrade
+    """
+    remaining = time_remaining(state)
+    return remaining is not None and remaining < FAST_MODE_SECONDS
+
+
+def llm_options(state: AgentState) -> Dict[str, Any]:
+    """
+    Per-call LLM keyword arguments derived from the run's budget and deadline
+    """
+    options = {}
+    if state.get("max_tokens"):
+        options["max_tokens"] = state["max_tokens"]
+    remaining = time_remaining(state)
+    if remaining is not None:
+        options["timeout"] = max(0.5, remaining - DEADLINE_RESERVE_SECONDS)
+    return options
+
+
+def best_partial_summary(state: AgentState) -> str:
+    """
+    The best answer available so far, for runs cut short by a deadline
+    """
+    if state.get("final_summary"):
+        return state["final_summary"]
+    if state.get("draft_summary"):
+        return state["draft_summary"]
+    if state.get("running_summary"):
+        return state["running_summary"]
+    if state.get("research_results"):
+        return state["research_results"][-1]
+    return "No findings were gathered before the deadline."
+
+
+class SpeculationStats:
+    """
+    Process-wide counters for speculative summary drafts
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.revised = 0
+    
+    def record(self, outcome: str):
+        with self._lock:
+            if outcome == "accepted":
+                self.accepted += 1
+            else:
+                self.revised += 1
+    
+    def hit_rate(self) -> float:
+        """
+        Fraction of drafts accepted without a revise pass
+        """
+        total = self.accepted + self.revised
+        return self.accepted / total if total else 0.0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"accepted": self.accepted, "revised": self.revised, "hit_rate": self.hit_rate()}
+
+
+speculation_stats = SpeculationStats()
+
+
+def search_sources(tool, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Run a search tool, honoring a per-query result count if one is set
+    
+    Args:
+        tool: SearchProvider, Tavily tool or any object with invoke(query)
+        query: Search query
+        max_results: Optional cap on the number of results
+    
+    Returns:
+        Search results as dictionaries with at least 'content'
+    """
+    base = tool
+    while isinstance(base, (ScheduledSearch, RecordingSearch, LimitedSearch)):
+        base = base.tool
+    with profile_span("search", "search"):
+        if isinstance(base, SearchProvider):
+            return tool.invoke(query, max_results=max_results)
+        if max_results and isinstance(base, (BaseModel, KeyPool)) and getattr(base, "max_results", max_results) != max_results:
+            tool = tool.model_copy(update={"max_results": max_results})
+        results = tool.invoke(query)
+    return results[:max_results] if max_results else results
 
 
 class ResearchAgent:
     """
     Research Agent: Gathers information using Tavily Search API
     Responsible for finding relevant, up-to-date information
+    
+    By default all sources share one prompt, trimmed to SOURCE_CONTEXT_CHARS.
+    In map-reduce mode every source chunk is first condensed by a short
+    concurrent call on the fast model, and the research call reduces the
+    extracts, so many more sources fit in the same wall-clock time.
     """
     
-    def __init__(self, llm, search_tool):
+    def __init__(self, llm, search_tool, fast_llm=None, map_reduce: bool = False):
         self.llm = llm
         self.search_tool = search_tool
+        self.fast_llm = fast_llm or llm
+        self.map_reduce = map_reduce
+    
+    def _max_results(self, state: AgentState) -> Optional[int]:
+        if state.get("max_results"):
+            return state["max_results"]
+        return MAP_REDUCE_MAX_RESULTS if self.map_reduce else None
     
-    def execute(self, state: AgentState) -> AgentState:
+    def _search(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        return search_sources(self.search_tool, query, max_results)
+    
+    def execute(self, state: AgentState) -> dict:
         """
         Execute research by searching the web and analyzing results
         """
         query = state["query"]
         
-        print(f"\n🔍 Research Agent: Searching for information about '{query}'...")
-        
-        # Perform web search using Tavily
-        search_results = self.search_tool.invoke(query)
+        # Reuse results fetched speculatively during the previous critique
+        search_results = state.get("prefetched_results")
+        if search_results is None:
+            print(f"\n🔍 Research Agent: Searching for information about '{query}'...")
+            search_results = self._search(query, self._max_results(state))
+        else:
+            print(f"\n🔍 Research Agent: Using prefetched results for '{query}'...")
         
-        # Use LLM to analyze and extract key information
-        system_prompt = """You are a research specialist. Analyze the search results and extract 
-        the most relevant and accurate information. Focus on facts, recent developments, and credible sources.
-        Be concise but comprehensive."""
+        # Near the deadline: smaller context on the faster model
+        degraded = fast_mode(state)
+        context_chars = int(SOURCE_CONTEXT_CHARS * SHRUNK_CONTEXT_RATIO) if degraded else SOURCE_CONTEXT_CHARS
+        model = self.fast_llm if degraded else self.llm
         
-        # Truncate content to prevent token overflow (max ~500 chars per source)
-        research_context = "\n\n".join([
-            f"Source {i+1}: {result.get('content', '')[:500]}..."
-            for i, result in enumerate(search_results)
-        ])
+        if self.map_reduce and not degraded:
+            # Condense each source separately, then reduce the extracts
+            with profile_span("map", "extraction"):
+                research_context = self.map_sources(query, search_results, state)
+        else:
+            # Keep only the most query-relevant, de-duplicated passages
+            with profile_span("research", "extraction"):
+                research_context = build_research_context(query, search_results, context_chars)
         
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"Query: {query}\n\nSearch Results:\n{research_context}\n\nProvide a detailed research summary:")
-        ]
+        with profile_span("research", "prompt"):
+            messages = RESEARCH_PROMPT.format_messages(query=query, search_results=research_context)
         
-        response = self.llm.invoke(messages)
+        with profile_span("research", "llm"):
+            response = model.invoke(messages, **llm_options(state))
         research_summary = response.content
+        record_prompt(RESEARCH_PROMPT.name, messages, research_summary)
         
         print(f"✅ Research completed: {len(research_summary)} characters")
         
-        state["research_results"].append(research_summary)
-        state["iteration"] += 1
+        update = {
+            "research_results": [research_summary],
+            "iteration": state["iteration"] + 1,
+            "prefetched_results": None,
+            "sources": search_results
+        }
+        if degraded:
+            update["degraded"] = ["research_fast_mode"]
+        return update
+    
+    def prefetch(self, state: AgentState) -> dict:
+        """
+        Speculatively run the next iteration's search while critique runs
+        
+        The results are only used if the critique sends the workflow back to
+        research; otherwise they are discarded.
+        """
+        if state["iteration"] >= state["max_iterations"]:
+            return {"prefetched_results": None}
+        
+        print(f"\n⚡ Research Agent: Prefetching search results...")
+        return {"prefetched_results": self._search(state["query"], self._max_results(state))}
+    
+    @staticmethod
+    def source_chunks(search_results: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+        """
+        Split de-duplicated, cleaned sources into map-sized chunks
+        
+        Returns:
+            (source number, chunk text) pairs in source order
+        """
+        chunks = []
+        for number, result in enumerate(dedupe_sources(search_results), 1):
+            text = strip_boilerplate(result.get("content", ""))
+            pieces = [piece[:MAP_CHUNK_CHARS] for piece in chunk_text(text, MAP_CHUNK_CHARS)]
+            chunks.extend((number, piece) for piece in pieces[:MAP_MAX_CHUNKS_PER_SOURCE])
+        return chunks
+    
+    def _extract(self, query: str, chunk: str, options: Dict[str, Any]) -> Tuple[List[Any], str]:
+        messages = EXTRACT_PROMPT.format_messages(query=query, source=chunk)
+        with profile_span("extract", "llm"):
+            response = self.fast_llm.invoke(messages, **options)
+        return messages, response.content
+    
+    def map_sources(self, query: str, search_results: List[Dict[str, Any]], state: AgentState) -> str:
+        """
+        Map step: condense every source chunk with its own concurrent LLM call
+        
+        Args:
+            query: The research question
+            search_results: Raw search results
+            state: Current state (for the deadline and token options)
         
-        return state
+        Returns:
+            Per-source extracts formatted as the research prompt's context
+        """
+        chunks = self.source_chunks(search_results)
+        if not chunks:
+            return ""
+        options = llm_options(state)
+        options["max_tokens"] = min(options.get("max_tokens", MAP_MAX_TOKENS), MAP_MAX_TOKENS)
+        
+        print(f"🗺️ Research Agent: Extracting from {len(chunks)} source chunks in parallel...")
+        # Each call runs in a copy of this context so scheduling, prompt
+        # tracking and profiling still apply inside the pool threads
+        with ThreadPoolExecutor(max_workers=min(MAP_CONCURRENCY, len(chunks))) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._extract, query, chunk, options)
+                for _, chunk in chunks
+            ]
+            outputs = [future.result() for future in futures]
+        
+        extracts = []
+        for (number, _), (messages, text) in zip(chunks, outputs):
+            record_prompt(EXTRACT_PROMPT.name, messages, text)
+            text = text.strip()
+            if text and text.rstrip(".").upper() != "NONE":
+                extracts.append(f"Source {number}: {text}")
+        return join_truncated(extracts, REDUCE_CONTEXT_CHARS)
 
 
 class CritiqueAgent:
     """
     Critique Agent: Evaluates and validates research findings
-    Identifies gaps, inconsistencies, or areas needing more research
+    Identifies gaps, inconsistencies, or areas needing more research, and
+    ends with a VERDICT: CONTINUE/DONE line that should_continue branches on
     """
     
-    def __init__(self, llm):
+    def __init__(self, llm, focus: str = None, fast_llm=None):
         self.llm = llm
+        self.focus = focus
+        self.fast_llm = fast_llm or llm
+        self.prompt = CRITIQUE_FOCUS_PROMPTS[focus] if focus else CRITIQUE_PROMPT
     
-    def execute(self, state: AgentState) -> AgentState:
+    def execute(self, state: AgentState) -> dict:
         """
         Critique the research findings and provide feedback
+        
+        A focused critique writes to critique_parts so that several can run
+        in parallel and be merged afterwards by merge_critiques.
         """
         query = state["query"]
         research = state["research_results"][-1] if state["research_results"] else ""
@@ -111,71 +574,208 @@ class CritiqueAgent:
         # Truncate research to prevent token overflow
         research_truncated = research[:1000] if len(research) > 1000 else research
         
-        print(f"\n🔎 Critique Agent: Evaluating research quality...")
+        label = f" ({self.focus})" if self.focus else ""
         
-        system_prompt = """You are a critical analyst. Briefly evaluate the research for accuracy, completeness, and relevance. Be concise."""
+        remaining = time_remaining(state)
+        if remaining is not None and remaining < MIN_CRITIQUE_SECONDS:
+            print(f"\n⏱️ Critique Agent{label}: Skipped, deadline approaching")
+            if self.focus:
+                return {"critique_parts": []}
+            return {"degraded": ["critique_skipped"]}
         
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"Query: {query}\n\nResearch:\n{research_truncated}\n\nProvide brief critique:")
-        ]
+        print(f"\n🔎 Critique Agent{label}: Evaluating research quality...")
         
-        response = self.llm.invoke(messages)
-        critique = response.content
+        with profile_span(self.prompt.name, "prompt"):
+            messages = self.prompt.format_messages(query=query, research=research_truncated)
         
-        print(f"✅ Critique completed")
+        model = self.fast_llm if fast_mode(state) else self.llm
+        with profile_span(self.prompt.name, "llm"):
+            response = model.invoke(messages, **llm_options(state))
+        critique = response.content
+        record_prompt(self.prompt.name, messages, critique)
         
-        state["critique_feedback"].append(critique)
+        print(f"✅ Critique{label} completed")
         
-        return state
+        if self.focus:
+            return {"critique_parts": [f"{self.focus.capitalize()}: {critique}"]}
+        return {"critique_feedback": [critique]}
+
+
+def merge_critiques(state: AgentState) -> dict:
+    """
+    Fan-in node: combine parallel focused critiques into one feedback entry
+    """
+    if not state.get("critique_parts"):
+        return {"critique_parts": None, "degraded": ["critique_skipped"]}
+    
+    parts = sorted(
+        state.get("critique_parts") or [],
+        key=lambda part: [f.capitalize() for f in CRITIQUE_FOCUSES].index(part.split(":", 1)[0])
+    )
+    return {
+        "critique_feedback": ["\n\n".join(parts)],
+        "critique_parts": None
+    }
 
 
 class SummarizeAgent:
     """
     Summarize Agent: Synthesizes research and critique into final response
     Creates a coherent, comprehensive answer to the user's query
+    
+    When the workflow loops back for more research, update() folds the
+    finished round into `running_summary`. The final call then only sends
+    that summary plus the latest round, so every iteration is represented
+    and the final prompt does not grow with the number of iterations.
     """
     
-    def __init__(self, llm):
+    def __init__(self, llm, fast_llm=None):
         self.llm = llm
+        self.fast_llm = fast_llm or llm
+    
+    @staticmethod
+    def _latest(items: List[str]) -> str:
+        return items[-1] if items else ""
+    
+    def _synthesize(self, state: AgentState) -> str:
+        query = state["query"]
+        
+        # Truncate to prevent token overflow (harder near the deadline)
+        degraded = fast_mode(state)
+        ratio = SHRUNK_CONTEXT_RATIO if degraded else 1.0
+        latest = self._latest(state["research_results"])[:int(SUMMARY_RESEARCH_CHARS * ratio)]
+        running = state.get("running_summary")
+        if running:
+            research_truncated = join_truncated(
+                [running[:int(ROLLING_SUMMARY_CHARS * ratio)], latest],
+                int((ROLLING_SUMMARY_CHARS + SUMMARY_RESEARCH_CHARS) * ratio)
+            )
+        else:
+            research_truncated = latest
+        critique_truncated = self._latest(state["critique_feedback"])[:int(SUMMARY_CRITIQUE_CHARS * ratio)]
+        model = self.fast_llm if degraded else self.llm
+        
+        with profile_span("summarize", "prompt"):
+            messages = SUMMARIZE_PROMPT.format_messages(
+                query=query,
+                research=research_truncated,
+                critique=critique_truncated
+            )
+        
+        with profile_span("summarize", "llm"):
+            response = model.invoke(messages, **llm_options(state))
+        summary = response.content
+        record_prompt(SUMMARIZE_PROMPT.name, messages, summary)
+        return summary
     
-    def execute(self, state: AgentState) -> AgentState:
+    def execute(self, state: AgentState) -> dict:
         """
         Create final summary incorporating research and critique
+        
+        If a speculative draft exists, it is accepted as-is when the final
+        critique raises no substantive issue, or revised with a short pass
+        that only sends the draft and the critique.
         """
-        query = state["query"]
-        research = "\n\n".join(state["research_results"])
-        critique = "\n\n".join(state["critique_feedback"])
+        remaining = time_remaining(state)
+        if remaining is not None and remaining <= DEADLINE_RESERVE_SECONDS:
+            print(f"\n⏱️ Summarize Agent: Out of time, returning best partial summary")
+            return {"final_summary": best_partial_summary(state), "degraded": ["partial"]}
         
-        # Truncate to prevent token overflow
-        research_truncated = research[:1500] if len(research) > 1500 else research
-        critique_truncated = critique[:500] if len(critique) > 500 else critique
+        draft = state.get("draft_summary")
+        if draft:
+            return self._finish_draft(state, draft)
         
         print(f"\n📝 Summarize Agent: Creating final summary...")
         
-        system_prompt = """You are a synthesis expert. Create a clear, well-structured response that directly answers the query using the research findings."""
+        summary = self._synthesize(state)
         
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"""Query: {query}
-
-Research:
-{research_truncated}
-
-Critique:
-{critique_truncated}
-
-Create final response:""")
-        ]
+        print(f"✅ Summary completed: {len(summary)} characters")
+        
+        update = {"final_summary": summary}
+        if fast_mode(state):
+            update["degraded"] = ["summary_fast_mode"]
+        return update
+    
+    def draft(self, state: AgentState) -> dict:
+        """
+        Speculatively draft the summary while the final critique runs
         
-        response = self.llm.invoke(messages)
+        Only drafts on the last iteration, when the workflow is certain to
+        summarize next; earlier iterations may still loop back to research.
+        """
+        if state["iteration"] < state["max_iterations"]:
+            return {"draft_summary": None}
+        
+        print(f"\n📝 Summarize Agent: Drafting summary speculatively...")
+        return {"draft_summary": self._synthesize(state)}
+    
+    def update(self, state: AgentState) -> dict:
+        """
+        Fold the round that just finished into the rolling summary
+        
+        Runs alongside the next research node, so it adds no wall-clock time;
+        only the previous summary and the new round are sent.
+        """
+        print(f"\n📝 Summarize Agent: Updating running summary...")
+        
+        messages = ROLLING_SUMMARY_PROMPT.format_messages(
+            query=state["query"],
+            summary=state.get("running_summary") or "(none yet)",
+            research=self._latest(state["research_results"])[:SUMMARY_RESEARCH_CHARS],
+            critique=self._latest(state["critique_feedback"])[:SUMMARY_CRITIQUE_CHARS]
+        )
+        options = llm_options(state)
+        options["max_tokens"] = min(options.get("max_tokens", ROLLING_SUMMARY_TOKENS), ROLLING_SUMMARY_TOKENS)
+        
+        model = self.fast_llm if fast_mode(state) else self.llm
+        with profile_span(ROLLING_SUMMARY_PROMPT.name, "llm"):
+            response = model.invoke(messages, **options)
         summary = response.content
+        record_prompt(ROLLING_SUMMARY_PROMPT.name, messages, summary)
+        return {"running_summary": summary}
+    
+    def _finish_draft(self, state: AgentState, draft: str) -> dict:
+        critique = state["critique_feedback"][-1] if state["critique_feedback"] else ""
         
-        print(f"✅ Summary completed: {len(summary)} characters")
+        # A final critique asking for another round means the draft needs
+        # fixing (no round is left); the same test as should_continue
+        if not critique_wants_more(critique):
+            print(f"\n📝 Summarize Agent: Speculative draft accepted")
+            speculation_stats.record("accepted")
+            return {"final_summary": draft, "speculation": "accepted"}
+        
+        print(f"\n📝 Summarize Agent: Revising speculative draft...")
+        
+        critique_truncated = critique[:SUMMARY_CRITIQUE_CHARS]
+        messages = REVISE_PROMPT.format_messages(
+            query=state["query"],
+            draft=draft,
+            critique=critique_truncated
+        )
         
-        state["final_summary"] = summary
+        model = self.fast_llm if fast_mode(state) else self.llm
+        with profile_span("revise", "llm"):
+            response = model.invoke(messages, **llm_options(state))
+        summary = response.content
+        record_prompt(REVISE_PROMPT.name, messages, summary)
+        speculation_stats.record("revised")
+        
+        print(f"✅ Summary revised: {len(summary)} characters")
         
-        return state
+        return {"final_summary": summary, "speculation": "revised"}
+
+
+def critique_wants_more(critique: str) -> bool:
+    """
+    Whether a critique asks for another research round
+    
+    Its VERDICT line decides; without one, any of CONTINUE_KEYWORDS does.
+    """
+    verdict = parse_verdict(critique)
+    if verdict is not None:
+        return verdict == "continue"
+    critique = (critique or "").lower()
+    return any(keyword in critique for keyword in CONTINUE_KEYWORDS)
 
 
 def should_continue(state: AgentState) -> str:
@@ -185,68 +785,261 @@ def should_continue(state: AgentState) -> str:
     if state["iteration"] >= state["max_iterations"]:
         return "summarize"
     
-    # Check if critique suggests more research is needed
-    if state["critique_feedback"]:
-        last_critique = state["critique_feedback"][-1].lower()
-        if "more research" in last_critique or "insufficient" in last_critique or "gap" in last_critique:
-            if state["iteration"] < state["max_iterations"]:
-                return "research"
+    # Not enough time left for another research-critique cycle
+    remaining = time_remaining(state)
+    if remaining is not None and remaining < MIN_ITERATION_SECONDS:
+        return "summarize"
+    
+    # Check if critique asks for more research
+    if state["critique_feedback"] and critique_wants_more(state["critique_feedback"][-1]):
+        return "research"
     
     return "summarize"
 
 
-def create_research_workflow():
+def route_after_critique(state: AgentState) -> List[str]:
+    """
+    Next nodes after a critique: another round also updates the running summary
+    """
+    if should_continue(state) == "research":
+        return ["research", "update_summary"]
+    return ["summarize"]
+
+
+def create_research_workflow(
+    model=None,
+    search_tool=None,
+    parallel_critique: bool = False,
+    speculative_search: bool = False,
+    speculative_summary: bool = False,
+    fast_model=None,
+    scheduler: Optional[Scheduler] = None,
+    models: Optional[Dict[str, Any]] = None,
+    map_reduce: bool = False,
+    recorder: Optional[Recorder] = None
+):
     """
     Create the LangGraph workflow with all agents
+    
+    The default graph is research -> critique -> (research | summarize);
+    each loop back to research also runs update_summary alongside it.
+    Optional branches turn the critique step into a fan-out/fan-in stage:
+    
+        research -> critique_factuality ┐
+                 -> critique_recency    ├-> critique (merge) -> ...
+                 -> critique_coverage   ┘
+                 -> prefetch (next search, runs alongside the critique)
+                 -> draft (speculative summary, final iteration only)
+    
+    Args:
+        model: Optional chat model for every agent (defaults to each agent's
+            configured provider, normally the shared Groq LLM)
+        search_tool: Optional search tool override (defaults to the provider
+            named by SEARCH_PROVIDER: tavily, local or hybrid)
+        parallel_critique: Run factuality/recency/coverage critiques in parallel
+        speculative_search: Start the next iteration's search during critique
+        speculative_summary: Draft the summary during the final critique
+        fast_model: Model used near a deadline (defaults to fast_llm for
+            agents on Groq, otherwise the agent's own model)
+        scheduler: Optional fair queue that every LLM and search call waits in
+        models: Per-agent overrides keyed by 'research', 'critique' and
+            'summarize'; values are chat models or provider names. Agents
+            without an override use `model`, or else their <AGENT>_LLM /
+            LLM_PROVIDER setting.
+        map_reduce: Condense each source with its own parallel call before
+            the research call (handles 10+ sources per iteration)
+        recorder: Records every LLM/search call for replay (defaults to the
+            RECORD_TRACE recorder, if set)
+    
+    Returns:
+        Compiled LangGraph workflow
     """
+    agent_models = {}
+    fast_models = {}
+    for agent in AGENT_NAMES:
+        choice = (models or {}).get(agent)
+        if choice is None:
+            choice = model if model is not None else get_llm(agent=agent)
+        if isinstance(choice, str):
+            choice = get_llm(choice)
+        agent_models[agent] = choice
+        if fast_model is not None:
+            fast_models[agent] = fast_model
+        else:
+            # Only the Groq 70B model has a faster sibling; other backends run as-is
+            fast_models[agent] = fast_llm if choice is llm else choice
+    search_tool = search_tool if search_tool is not None else get_search_provider(tavily_client=tavily_search)
+    
+    recorder = recorder or trace_recorder
+    if recorder is not None:
+        # Innermost, so recorded latencies exclude time queued in the scheduler
+        agent_models = {agent: RecordingLLM(m, recorder) for agent, m in agent_models.items()}
+        fast_models = {agent: RecordingLLM(m, recorder) for agent, m in fast_models.items()}
+        search_tool = RecordingSearch(search_tool, recorder)
+    
+    if scheduler is not None:
+        agent_models = {agent: ScheduledLLM(m, scheduler) for agent, m in agent_models.items()}
+        fast_models = {agent: ScheduledLLM(m, scheduler) for agent, m in fast_models.items()}
+        search_tool = ScheduledSearch(search_tool, scheduler)
+    
     # Initialize agents
-    research_agent = ResearchAgent(llm, tavily_search)
-    critique_agent = CritiqueAgent(llm)
-    summarize_agent = SummarizeAgent(llm)
+    research_agent = ResearchAgent(agent_models["research"], search_tool, fast_models["research"], map_reduce)
+    critique_agent = CritiqueAgent(agent_models["critique"], fast_llm=fast_models["critique"])
+    summarize_agent = SummarizeAgent(agent_models["summarize"], fast_models["summarize"])
     
     # Create workflow graph
     workflow = StateGraph(AgentState)
     
     # Add nodes for each agent
-    workflow.add_node("research", research_agent.execute)
-    workflow.add_node("critique", critique_agent.execute)
-    workflow.add_node("summarize", summarize_agent.execute)
+    # Every node is wrapped in a profiling span (a no-op unless profiling)
+    workflow.add_node("research", traced("research")(research_agent.execute))
+    workflow.add_node("summarize", traced("summarize")(summarize_agent.execute))
     
     # Define edges
     workflow.set_entry_point("research")
-    workflow.add_edge("research", "critique")
+    
+    if parallel_critique:
+        branches = []
+        for focus in CRITIQUE_FOCUSES:
+            node = f"critique_{focus}"
+            workflow.add_node(node, traced(node)(CritiqueAgent(
+                agent_models["critique"], focus=focus, fast_llm=fast_models["critique"]
+            ).execute))
+            workflow.add_edge("research", node)
+            branches.append(node)
+        workflow.add_node("critique", traced("critique")(merge_critiques))
+        workflow.add_edge(branches, "critique")
+    else:
+        workflow.add_node("critique", traced("critique")(critique_agent.execute))
+        workflow.add_edge("research", "critique")
+    
+    if speculative_search:
+        # Dead-end branch: it finishes in the same step as the critique and
+        # only leaves prefetched_results behind for the next research node
+        workflow.add_node("prefetch", traced("prefetch")(research_agent.prefetch))
+        workflow.add_edge("research", "prefetch")
+    
+    if speculative_summary:
+        # Same pattern: the draft is picked up by the summarize node
+        workflow.add_node("draft", traced("draft")(summarize_agent.draft))
+        workflow.add_edge("research", "draft")
+    
+    # Looping back also folds the finished round into the running summary;
+    # that branch dead-ends, like prefetch, and runs alongside the research
+    workflow.add_node("update_summary", traced("update_summary")(summarize_agent.update))
     workflow.add_conditional_edges(
         "critique",
-        should_continue,
-        {
-            "research": "research",
-            "summarize": "summarize"
-        }
+        route_after_critique,
+        ["research", "update_summary", "summarize"]
     )
     workflow.add_edge("summarize", END)
     
     return workflow.compile()
 
 
-def run_research_assistant(query: str, max_iterations: int = 2) -> dict:
+def _invoke_before_deadline(app, initial_state: dict, deadline_at: float) -> dict:
+    """
+    Run the workflow in a background thread and return by the deadline
+    
+    The latest state is kept after every step. If the graph has not finished
+    when the deadline (less a small reserve) arrives, the best partial
+    summary from that state is returned; the abandoned run winds down on its
+    own because every node sees that no time remains.
+    """
+    latest = {"state": dict(initial_state), "error": None}
+    done = threading.Event()
+    
+    def run():
+        try:
+            for state in app.stream(initial_state, stream_mode="values"):
+                latest["state"] = state
+        except Exception as e:
+            latest["error"] = e
+        finally:
+            done.set()
+    
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), daemon=True).start()
+    
+    finished = done.wait(max(0.0, deadline_at - time.monotonic() - DEADLINE_RESERVE_SECONDS))
+    if latest["error"] is not None:
+        raise latest["error"]
+    
+    state = dict(latest["state"])
+    if not finished:
+        print(f"\n⏱️ Deadline reached: returning best partial summary")
+        state["final_summary"] = best_partial_summary(state)
+        state["degraded"] = list(state.get("degraded", [])) + ["partial"]
+    return state
+
+
+def run_research_assistant(
+    query: str,
+    max_iterations: int = 2,
+    workflow=None,
+    parallel_critique: bool = False,
+    speculative_search: bool = False,
+    speculative_summary: bool = False,
+    adaptive: bool = False,
+    budget: Optional[TokenBudget] = None,
+    deadline: Optional[float] = None,
+    tenant: Optional[str] = None,
+    priority: Optional[str] = None,
+    map_reduce: bool = False,
+    search_results: Optional[List[Dict[str, Any]]] = None,
+    recorder: Optional[Recorder] = None
+) -> dict:
     """
     Run the multi-agent research assistant on a query
     
     Args:
         query: The user's research question
         max_iterations: Maximum number of research-critique cycles
+        workflow: Optional pre-compiled workflow to reuse across runs
+        parallel_critique: Run specialized critiques in parallel
+        speculative_search: Prefetch the next search while critique runs
+        speculative_summary: Draft the summary while the final critique runs
+        adaptive: Pick iterations, search depth and output cap from the query
+        budget: Shared token budget; adaptive runs downgrade when it runs low
+        deadline: Seconds the caller can wait. Nodes skip iterations, shrink
+            context and switch to the fast model as time runs low, and the
+            best partial summary is returned once the deadline is reached.
+        tenant: Team or user this run's calls are billed to in the scheduler
+        priority: Scheduler class, 'interactive' (default) or 'batch'
+        map_reduce: Condense sources in parallel before the research call
+        search_results: Results the caller already fetched; the first
+            research round uses them instead of searching again
+        recorder: Groups this run's recorded calls and records its query and
+            settings, so replay.py can re-issue it (defaults to RECORD_TRACE)
     
     Returns:
-        Final state with research results and summary
+        Final state with research results and summary; `sources` holds every
+        round's search results
     """
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+    
     print(f"\n{'='*80}")
     print(f"🚀 Multi-Agent Research Assistant")
     print(f"{'='*80}")
     print(f"Query: {query}")
+    
+    profile = plan_query(query, budget) if adaptive else None
+    if profile is not None:
+        max_iterations = profile.max_iterations
+        print(f"Query class: {profile.name} ({profile.max_iterations} iterations, "
+              f"{profile.max_results} sources, {profile.max_tokens} max tokens)")
+    
     print(f"{'='*80}\n")
     
-    # Create workflow
-    app = create_research_workflow()
+    # Create workflow (or reuse a warm one)
+    app = workflow if workflow is not None else create_research_workflow(
+        parallel_critique=parallel_critique,
+        speculative_search=speculative_search,
+        speculative_summary=speculative_summary,
+        scheduler=request_scheduler,
+        map_reduce=map_reduce,
+        recorder=recorder
+    )
     
     # Initialize state
     initial_state = {
@@ -257,9 +1050,38 @@ def run_research_assistant(query: str, max_iterations: int = 2) -> dict:
         "iteration": 0,
         "max_iterations": max_iterations
     }
+    if profile is not None:
+        initial_state.update(
+            query_class=profile.name,
+            max_results=profile.max_results,
+            max_tokens=profile.max_tokens
+        )
+    if deadline_at is not None:
+        initial_state["deadline_at"] = deadline_at
+    if search_results is not None:
+        initial_state["prefetched_results"] = search_results
+    
+    recorder = recorder or trace_recorder
+    recording = recorder.run(
+        query, max_iterations=max_iterations, adaptive=adaptive, deadline=deadline,
+        tenant=tenant, priority=priority, map_reduce=map_reduce
+    ) if recorder is not None else contextlib.nullcontext()
+    
+    # Run the workflow, measuring prompt tokens resent across calls
+    with recording, scheduling(tenant, priority), track_prompts() as tracker, profile_span("workflow", "graph"):
+        if deadline_at is None:
+            final_state = app.invoke(initial_state)
+        else:
+            final_state = _invoke_before_deadline(app, initial_state, deadline_at)
+    stats = final_state["prompt_stats"] = tracker.report()
+    if budget is not None:
+        budget.record(stats["prompt_tokens"] + stats["completion_tokens"])
     
-    # Run the workflow
-    final_state = app.invoke(initial_state)
+    # Drop a speculative search that the loop never used
+    final_state.pop("prefetched_results", None)
+    final_state.pop("critique_parts", None)
+    final_state.pop("draft_summary", None)
+    final_state.pop("deadline_at", None)
     
     print(f"\n{'='*80}")
     print(f"✨ Research Complete!")
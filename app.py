@@ -4,8 +4,16 @@ Interactive web UI for the research assistant
 """
 
 import streamlit as st
-from agents import run_research_assistant
+from agents import create_research_workflow, request_scheduler
+from budget import shared_budget
+from cache import ResultCache, cache_key
+from profiling import format_summary, profile_run
+from sessions import FollowUpResearch, SessionStore
+import contextlib
+import json
+import os
 import time
+import uuid
 
 
 # Page configuration
@@ -16,6 +24,28 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource
+def get_workflow(map_reduce: bool = False):
+    """Compiled workflow shared by every session in this server process"""
+    return create_research_workflow(scheduler=request_scheduler, map_reduce=map_reduce)
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Completed results shared by every session in this server process"""
+    return ResultCache()
+
+
+@st.cache_resource
+def get_follow_ups() -> FollowUpResearch:
+    """Conversations shared by every session in this server process, bounded by SessionStore"""
+    return FollowUpResearch(SessionStore(), workflow=get_workflow(), scheduler=request_scheduler)
+
+
+result_cache = get_result_cache()
+follow_ups = get_follow_ups()
+
 # Custom CSS for premium styling
 st.markdown("""
 <style>
@@ -80,14 +110,66 @@ st.markdown("""
 with st.sidebar:
     st.header("⚙️ Configuration")
     
+    adaptive = st.checkbox(
+        "Adaptive Budget",
+        value=False,
+        help="Pick iterations, search depth and output length from the query's complexity"
+    )
+    
+    token_budget = st.number_input(
+        "Token Budget (TPM, 0 = none)",
+        min_value=0,
+        max_value=1000000,
+        value=int(os.getenv("TOKEN_BUDGET") or 0),
+        step=1000,
+        help="Tokens per minute shared by every session; heavy queries are downgraded when it runs low (implies Adaptive Budget)"
+    )
+    budget = shared_budget(token_budget)
+    # Only adaptive planning can act on a budget, so a budget turns it on
+    adaptive = adaptive or budget is not None
+    
     max_iterations = st.slider(
         "Max Research Iterations",
         min_value=1,
         max_value=5,
         value=2,
+        disabled=adaptive,
         help="Number of research-critique cycles before final summary"
     )
     
+    map_reduce = st.checkbox(
+        "Map-Reduce Sources",
+        value=False,
+        help="Read 10+ sources per iteration, each condensed by its own parallel LLM call"
+    )
+    
+    team = st.text_input(
+        "Team",
+        value="default",
+        help="Tenant your calls are billed to in the shared fair-queue scheduler"
+    )
+    
+    deadline = st.number_input(
+        "Deadline (sec, 0 = none)",
+        min_value=0,
+        max_value=300,
+        value=0,
+        help="Return the best available answer within this time"
+    )
+    
+    profile = st.checkbox(
+        "Profile Run",
+        value=False,
+        help="Time each agent and LLM/search call and offer a flame graph download"
+    )
+    
+    st.markdown("---")
+    
+    st.header("💾 Result Cache")
+    cache_panel = st.empty()
+    if st.button("🗑️ Clear Cache", use_container_width=True):
+        result_cache.clear()
+    
     st.markdown("---")
     
     st.header("🤖 Agent Workflow")
@@ -145,8 +227,21 @@ with col1:
     
     col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 1])
     
+    # Start Research begins a new conversation; Follow-up continues the current one
+    session_id = st.session_state.get("session_id")
+    
+    with col_btn1:
+        follow_up_button = st.button("💬 Follow-up", use_container_width=True,
+                                     help="Answer from this conversation's findings, searching only for what is missing")
+    
     with col_btn2:
         search_button = st.button("🚀 Start Research", use_container_width=True)
+    
+    with col_btn3:
+        refresh_button = st.button("🔄 Refresh", use_container_width=True,
+                                   help="Rerun the research even if a cached answer exists")
+    
+    history_panel = st.empty()
 
 with col2:
     st.header("📈 Performance")
@@ -173,7 +268,7 @@ with col2:
     """, unsafe_allow_html=True)
 
 # Process research request
-if search_button and query:
+if (search_button or refresh_button or follow_up_button) and query:
     # Create tabs for different views
     tab1, tab2, tab3, tab4 = st.tabs(["📝 Summary", "🔍 Research", "🔎 Critique", "📊 Details"])
     
@@ -189,12 +284,43 @@ if search_button and query:
             status_text.text("🔍 Research Agent: Searching for information...")
             progress_bar.progress(33)
             
-            result = run_research_assistant(query, max_iterations=max_iterations)
+            # Deadline and team do not change a complete answer, so they are not part of the key
+            key = cache_key(query, max_iterations=max_iterations, adaptive=adaptive, map_reduce=map_reduce)
+            
+            run_options = dict(workflow=get_workflow(map_reduce), adaptive=adaptive, budget=budget,
+                               deadline=deadline or None)
+            
+            # Profiled runs always execute so there is something to profile
+            profiling = profile_run(query) if profile else contextlib.nullcontext()
+            with profiling as profiler:
+                if follow_up_button:
+                    # Follow-ups depend on the conversation so far, so they bypass the result cache
+                    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+                    result = follow_ups.ask(session_id, query, max_iterations=max_iterations,
+                                            tenant=team or None, priority="interactive", **run_options)
+                    entry, cache_hit = None, False
+                else:
+                    # A new question starts a new session; the run seeds it with its sources
+                    session_id = st.session_state["session_id"] = uuid.uuid4().hex
+                    
+                    def run():
+                        return follow_ups.ask(session_id, query, max_iterations=max_iterations,
+                                              tenant=team or None, priority="interactive", **run_options)
+                    
+                    entry, cache_hit = result_cache.get_or_run(
+                        key, run, refresh=refresh_button or profile,
+                        cacheable=lambda result: not result.get("degraded")
+                    )
+                    result = entry.result
+                    if cache_hit:
+                        # The cached run seeded another session; give this one its sources too
+                        follow_ups.adopt(session_id, result)
             
             status_text.text("🔎 Critique Agent: Evaluating findings...")
             progress_bar.progress(66)
             
-            time.sleep(0.5)  # Brief pause for UX
+            if not cache_hit and not follow_up_button:
+                time.sleep(0.5)  # Brief pause for UX
             
             status_text.text("📝 Summarize Agent: Creating final summary...")
             progress_bar.progress(100)
@@ -207,7 +333,17 @@ if search_button and query:
             status_text.empty()
             
             # Display success message
-            st.success(f"✅ Research completed in {elapsed_time:.2f} seconds!")
+            if result.get("follow_up"):
+                how = (f"after searching for: {result['delta_query']}" if result["searched"]
+                       else "from this conversation's findings")
+                st.success(f"💬 Follow-up answered in {elapsed_time:.2f} seconds {how}")
+            elif cache_hit:
+                st.success(f"⚡ Served from cache in {elapsed_time:.2f} seconds "
+                           f"(researched {entry.age() / 60:.0f} min ago)")
+                if result_cache.is_stale(entry):
+                    st.warning("⏳ This answer may be out of date. Press 🔄 Refresh to research it again.")
+            else:
+                st.success(f"✅ Research completed in {elapsed_time:.2f} seconds!")
             
             # Summary tab
             with tab1:
@@ -251,19 +387,51 @@ if search_button and query:
                 st.markdown("### 🔧 Configuration Used")
                 st.json({
                     "query": query,
-                    "max_iterations": max_iterations,
+                    "max_iterations": result["max_iterations"],
+                    "query_class": result.get("query_class", "fixed"),
+                    "degraded": result.get("degraded", []),
+                    "queue_wait": request_scheduler.wait_stats(),
+                    "concurrency": request_scheduler.concurrency_stats(),
+                    "cached": cache_hit,
+                    "follow_up": result.get("follow_up", False),
                     "model": "llama-3.1-70b-versatile",
                     "search_tool": "Tavily Search API",
                     "workflow": "LangGraph Multi-Agent"
                 })
+                
+                if profiler is not None:
+                    st.markdown("### ⏱️ Profile")
+                    st.code(format_summary(profiler.summary()))
+                    st.download_button(
+                        "🔥 Download flame graph (speedscope)",
+                        data=json.dumps(profiler.to_speedscope()),
+                        file_name="profile.speedscope.json",
+                        mime="application/json"
+                    )
         
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
             st.info("Please check your API keys in the .env file")
 
-elif search_button and not query:
+elif (search_button or refresh_button or follow_up_button) and not query:
     st.warning("⚠️ Please enter a research question")
 
+# Cache statistics (filled in last so they include this run)
+cache_stats = result_cache.stats()
+with cache_panel.container():
+    col_hits, col_entries = st.columns(2)
+    col_hits.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+                    help=f"{cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    col_entries.metric("Entries", cache_stats["entries"])
+
+# Conversation so far (filled in last so it includes this question)
+if session_id is not None:
+    turns = follow_ups.store.get(session_id).turns
+    with history_panel.expander(f"🗂️ Conversation ({len(turns)} questions)"):
+        for turn in turns:
+            st.markdown(f"**Q:** {turn['query']}")
+            st.markdown(turn["answer"][:300] + ("..." if len(turn["answer"]) > 300 else ""))
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,1397 @@
+"""
+Multi-Agent Research Assistant - Offline Benchmarks
+Synthetic workloads for measuring the Python-side cost of the pipeline
+
+Usage:
+    python benchmark.py export --records 200 --iterations 5
+    python benchmark.py workers --queries 16 --max-processes 4
+    python benchmark.py workflow --iterations 2
+    python benchmark.py speculative --flag-rate 0.3
+    python benchmark.py budget
+    python benchmark.py deadline --deadline 2
+    python benchmark.py mapreduce
+    python benchmark.py followup
+    python benchmark.py history --records 100000
+    python benchmark.py concurrency --capacity 8
+"""
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import io
+import operator
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+WORDS = (
+    "research model data analysis quantum energy market policy climate "
+    "network inference agent source result evidence trend growth risk "
+    "system report study survey adoption capacity latency throughput"
+).split()
+
+
+def synthetic_text(rng: random.Random, paragraphs: int = 6, sentences: int = 8) -> str:
+    """
+    Build LLM-like prose from a small vocabulary
+
+    Args:
+        rng: Random number generator (seeded for reproducibility)
+        paragraphs: Number of paragraphs
+        sentences: Sentences per paragraph
+
+    Returns:
+        Synthetic multi-paragraph text
+    """
+    out = []
+    for _ in range(paragraphs):
+        para = []
+        for _ in range(sentences):
+            words = rng.choices(WORDS, k=rng.randint(8, 20))
+            para.append(" ".join(words).capitalize() + ".")
+        out.append(" ".join(para))
+    return "\n\n".join(out)
+
+
+def synthetic_result(rng: random.Random, iterations: int = 3) -> Dict[str, Any]:
+    """
+    Build a synthetic research result shaped like run_research_assistant output
+
+    Args:
+        rng: Random number generator
+        iterations: Number of research/critique rounds
+
+    Returns:
+        Research result dictionary
+    """
+    return {
+        "query": " ".join(rng.choices(WORDS, k=8)) + "?",
+        "final_summary": synthetic_text(rng),
+        "research_results": [synthetic_text(rng) for _ in range(iterations)],
+        "critique_feedback": [synthetic_text(rng, paragraphs=2) for _ in range(iterations)],
+        "iteration": iterations,
+        "max_iterations": iterations,
+    }
+
+
+class StubLLM:
+    """
+    Offline chat model with configurable CPU cost and network-like latency
+
+    Responses are deterministic for a given prompt so runs are repeatable.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        cpu_iterations: int = 20000,
+        max_tokens: int = 1024,
+        suffix: str = "",
+        flag_rate: float = 0.0,
+        token_latency: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0
+    ):
+        self.latency = latency
+        self.cpu_iterations = cpu_iterations
+        self.max_tokens = max_tokens
+        # Appended to every response, e.g. " VERDICT: CONTINUE" to force iterations
+        self.suffix = suffix
+        # Share of critique responses that flag an issue (VERDICT: CONTINUE)
+        self.flag_rate = flag_rate
+        # Extra seconds per completion token, to model generation speed
+        self.token_latency = token_latency
+        # Occasional slow calls, to model tail latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+
+    def invoke(self, messages, *args, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        prompt = "\n".join(getattr(m, "content", str(m)) for m in messages)
+        digest = prompt.encode("utf-8")
+        for _ in range(self.cpu_iterations):
+            digest = hashlib.sha256(digest).digest()
+        max_tokens = kwargs.get("max_tokens") or self.max_tokens
+        rng = random.Random(digest)
+        paragraphs = max(1, min(3, max_tokens // 256))
+        content = synthetic_text(rng, paragraphs=paragraphs, sentences=5)[:max_tokens * 4] + self.suffix
+        if self.flag_rate and "analyst" in prompt:
+            if rng.random() < self.flag_rate:
+                content += " Some of this information is outdated.\nVERDICT: CONTINUE"
+            else:
+                content += " No significant errors or gaps.\nVERDICT: DONE"
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+
+        delay = self.latency + self.token_latency * completion_tokens
+        if self.tail_rate and rng.random() < self.tail_rate:
+            delay += self.tail_latency
+        if delay:
+            time.sleep(delay)
+        return AIMessage(
+            content=content,
+            response_metadata={"token_usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }}
+        )
+
+
+class StubSearch:
+    """
+    Offline search tool returning deterministic Tavily-shaped results
+    """
+
+    def __init__(self, max_results: int = 3, latency: float = 0.02):
+        self.max_results = max_results
+        self.latency = latency
+
+    def invoke(self, query, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        rng = random.Random(str(query))
+        return [
+            {"url": f"https://example.com/{i}", "content": synthetic_text(rng, paragraphs=2)}
+            for i in range(self.max_results)
+        ]
+
+
+def offline_clients(latency: float = 0.05, cpu_iterations: int = 20000):
+    """
+    Client factory for worker processes: (StubLLM, StubSearch)
+    """
+    return StubLLM(latency, cpu_iterations), StubSearch()
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> Dict[str, float]:
+    """
+    Time a callable and record its peak traced memory
+
+    Args:
+        fn: Zero-argument callable to measure
+        repeat: Number of timed runs (the best one is reported)
+
+    Returns:
+        Dictionary with best wall time in seconds and peak memory in MB
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": best, "peak_mb": peak / (1024 * 1024)}
+
+
+def print_table(title: str, rows: List[Dict[str, Any]]):
+    """
+    Print benchmark rows as an aligned table
+    """
+    print("\n" + "="*80)
+    print(title)
+    print("="*80)
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    widths = [max(len(h), *(len(_fmt(r[h])) for r in rows)) for h in headers]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(_fmt(row[h]).ljust(w) for h, w in zip(headers, widths)))
+    print("="*80 + "\n")
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+
+# ---------------------------------------------------------------------------
+# Export benchmark
+# ---------------------------------------------------------------------------
+
+def _legacy_markdown(result: Dict[str, Any]) -> str:
+    """Reference implementation of the original concatenating exporter"""
+    markdown_content = f"""# Research Report
+
+**Generated**: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+## Query
+
+{result.get('query', 'N/A')}
+
+## Summary
+
+{result.get('final_summary', 'N/A')}
+
+---
+
+## Research Findings
+
+"""
+    for i, research in enumerate(result.get('research_results', []), 1):
+        markdown_content += f"\n### Research Iteration {i}\n\n{research}\n\n"
+    markdown_content += "\n---\n\n## Critique Feedback\n\n"
+    for i, critique in enumerate(result.get('critique_feedback', []), 1):
+        markdown_content += f"\n### Critique Round {i}\n\n{critique}\n\n"
+    return markdown_content
+
+
+def bench_export(args: argparse.Namespace):
+    """
+    Compare the concatenating exporter against the streaming one
+    """
+    import tempfile
+    from utils import bulk_export, write_markdown_report
+
+    rng = random.Random(args.seed)
+    results = [synthetic_result(rng, args.iterations) for _ in range(args.records)]
+
+    def legacy():
+        for result in results:
+            sink = io.StringIO()
+            sink.write(_legacy_markdown(result))
+
+    def streaming():
+        for result in results:
+            write_markdown_report(result, io.StringIO())
+
+    rows = [
+        {"exporter": "concat (legacy)", **measure(legacy)},
+        {"exporter": "streaming", **measure(streaming)},
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows.append({
+            "exporter": "bulk md+html+jsonl",
+            **measure(lambda: bulk_export(results, tmp), repeat=1),
+        })
+
+    print_table(
+        f"Export: {args.records} results x {args.iterations} iterations",
+        rows
+    )
+
+
+def bench_storage(args: argparse.Namespace):
+    """
+    Compare saved-result size, write and read speed across storage formats
+    """
+    import glob
+    import tempfile
+    import utils
+
+    rng = random.Random(args.seed)
+    results = [synthetic_result(rng, args.iterations) for _ in range(args.records)]
+
+    modes = [("json", None), ("gzip", "gzip")]
+    if utils.zstd is not None:
+        modes += [("zstd", "zstd"), ("zstd + dictionary", "zstd")]
+    else:
+        print("⚠️  zstandard not installed: skipping zstd rows")
+
+    rows = []
+    cwd = os.getcwd()
+    for name, compression in modes:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            os.chdir(tmp)
+            try:
+                if name == "zstd + dictionary":
+                    for i, result in enumerate(results[:args.records // 4]):
+                        utils.save_research_result(result, f"research_result_{i:05d}.json")
+                    utils.train_zstd_dictionary("results")
+
+                extension = utils.COMPRESSION_EXTENSIONS.get(compression, ".json")
+                start = time.perf_counter()
+                paths = [
+                    utils.save_research_result(result, f"bench_{i:05d}{extension}", compression)
+                    for i, result in enumerate(results)
+                ]
+                write_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for path in paths:
+                    utils.load_research_result(path)
+                read_s = time.perf_counter() - start
+
+                size = sum(os.path.getsize(p) for p in glob.glob("results/bench_*"))
+            finally:
+                os.chdir(cwd)
+
+        rows.append({
+            "format": name,
+            "total_kb": size / 1024,
+            "bytes_per_result": size // args.records,
+            "write_s": write_s,
+            "read_s": read_s,
+        })
+
+    print_table(f"Storage: {args.records} saved results x {args.iterations} iterations", rows)
+
+
+def bench_search(args: argparse.Namespace):
+    """
+    Local index build, incremental refresh and query latency
+    """
+    import tempfile
+    from search import LocalIndex
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.documents):
+            with open(os.path.join(tmp, f"doc_{i:06d}.md"), "w", encoding="utf-8") as f:
+                f.write(synthetic_text(rng, paragraphs=4))
+
+        index = LocalIndex(tmp)
+        rows = []
+
+        start = time.perf_counter()
+        index.refresh()
+        rows.append({"operation": f"full build ({args.documents} files)", "seconds": time.perf_counter() - start})
+
+        start = time.perf_counter()
+        index.refresh()
+        rows.append({"operation": "refresh, nothing changed", "seconds": time.perf_counter() - start})
+
+        changed = max(1, args.documents // 100)
+        for i in rng.sample(range(args.documents), changed):
+            with open(os.path.join(tmp, f"doc_{i:06d}.md"), "a", encoding="utf-8") as f:
+                f.write("\n\n" + synthetic_text(rng, paragraphs=1))
+        start = time.perf_counter()
+        index.refresh()
+        rows.append({"operation": f"refresh, {changed} files changed", "seconds": time.perf_counter() - start})
+
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.choices(WORDS, k=4))
+            start = time.perf_counter()
+            index.search(query, 5)
+            latencies.append(time.perf_counter() - start)
+        rows.append({"operation": "query p50", "seconds": percentile(latencies, 50)})
+        rows.append({"operation": "query p95", "seconds": percentile(latencies, 95)})
+
+    print_table(f"Local search: {args.documents} documents, {len(index)} chunks", rows)
+
+
+# ---------------------------------------------------------------------------
+# Worker pool benchmark
+# ---------------------------------------------------------------------------
+
+def bench_workers(args: argparse.Namespace):
+    """
+    Measure batch throughput as the number of worker processes grows
+    """
+    from workers import ResearchWorkerPool
+
+    rng = random.Random(args.seed)
+    queries = [" ".join(rng.choices(WORDS, k=6)) + "?" for _ in range(args.queries)]
+    factory = functools.partial(offline_clients, args.latency, args.cpu_iterations)
+
+    rows = []
+    baseline = None
+    processes = 1
+    while processes <= args.max_processes:
+        with ResearchWorkerPool(processes, tokens_per_minute=None, client_factory=factory) as pool:
+            start = time.perf_counter()
+            pool.map(queries, max_iterations=args.iterations)
+            elapsed = time.perf_counter() - start
+
+        throughput = len(queries) / elapsed
+        baseline = baseline or throughput
+        rows.append({
+            "processes": processes,
+            "seconds": elapsed,
+            "queries_per_s": throughput,
+            "speedup": throughput / baseline,
+        })
+        processes *= 2
+
+    print_table(
+        f"Worker pool: {args.queries} queries, {os.cpu_count()} CPUs available",
+        rows
+    )
+
+
+# ---------------------------------------------------------------------------
+# Workflow topology benchmark
+# ---------------------------------------------------------------------------
+
+def bench_workflow(args: argparse.Namespace):
+    """
+    Compare per-query wall-clock time of the sequential and DAG workflows
+    """
+    from agents import create_research_workflow, run_research_assistant
+
+    model = StubLLM(args.latency, cpu_iterations=100, suffix=" VERDICT: CONTINUE")
+    search = StubSearch(latency=args.search_latency)
+    variants = [
+        ("sequential", {}),
+        ("parallel critique", {"parallel_critique": True}),
+        ("speculative search", {"speculative_search": True}),
+        ("parallel + speculative", {"parallel_critique": True, "speculative_search": True}),
+    ]
+
+    rows = []
+    for name, options in variants:
+        workflow = create_research_workflow(model, search, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for i in range(args.queries):
+                state = run_research_assistant(f"query {i}", args.iterations, workflow=workflow)
+            elapsed = time.perf_counter() - start
+        rows.append({
+            "workflow": name,
+            "s_per_query": elapsed / args.queries,
+            "llm_calls_per_query": len(state["prompt_stats"]["calls"]),
+        })
+
+    print_table(
+        f"Workflow: {args.iterations} iterations, LLM {args.latency}s, search {args.search_latency}s",
+        rows
+    )
+
+
+# ---------------------------------------------------------------------------
+# Speculative summary benchmark
+# ---------------------------------------------------------------------------
+
+def bench_speculative(args: argparse.Namespace):
+    """
+    Measure critical-path latency and draft hit rate of speculative summaries
+    """
+    from agents import create_research_workflow, run_research_assistant, speculation_stats
+
+    model = StubLLM(args.latency, cpu_iterations=100, flag_rate=args.flag_rate)
+    search = StubSearch(latency=0.05)
+
+    rows = []
+    for name, speculative in (("sequential", False), ("speculative summary", True)):
+        workflow = create_research_workflow(model, search, speculative_summary=speculative)
+        before = speculation_stats.snapshot()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for i in range(args.queries):
+                run_research_assistant(f"query {i}", args.iterations, workflow=workflow)
+            elapsed = time.perf_counter() - start
+        after = speculation_stats.snapshot()
+        accepted = after["accepted"] - before["accepted"]
+        revised = after["revised"] - before["revised"]
+        rows.append({
+            "workflow": name,
+            "s_per_query": elapsed / args.queries,
+            "drafts_accepted": accepted,
+            "drafts_revised": revised,
+            "hit_rate": accepted / (accepted + revised) if accepted + revised else 0.0,
+        })
+
+    print_table(
+        f"Speculative summary: {args.queries} queries, critique flag rate {args.flag_rate}",
+        rows
+    )
+
+
+# ---------------------------------------------------------------------------
+# Adaptive budget benchmark
+# ---------------------------------------------------------------------------
+
+BUDGET_QUERIES = [
+    "What is photosynthesis?",
+    "Who is the CEO of Nvidia?",
+    "Define machine learning",
+    "Explain recent breakthroughs in renewable energy",
+    "What are the current trends in cybersecurity?",
+    "How do large language models work?",
+    "Compare the economic policies of major countries in 2025",
+    "Analyze the impact of climate change on global agriculture and food prices",
+    "Solar versus nuclear: pros and cons for grid stability",
+]
+
+
+def bench_budget(args: argparse.Namespace):
+    """
+    Compare cost and latency per query class: fixed vs adaptive budgets
+    """
+    from agents import create_research_workflow, run_research_assistant
+    from budget import FIXED_PROFILE, classify_query
+
+    model = StubLLM(args.latency, cpu_iterations=100, suffix=" VERDICT: CONTINUE", token_latency=args.token_latency)
+    search = StubSearch(max_results=5, latency=0.05)
+    workflow = create_research_workflow(model, search)
+
+    totals: Dict[tuple, Dict[str, float]] = {}
+    for mode in ("fixed", "adaptive"):
+        for query in BUDGET_QUERIES:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                if mode == "fixed":
+                    state = run_research_assistant(query, FIXED_PROFILE.max_iterations, workflow=workflow)
+                else:
+                    state = run_research_assistant(query, workflow=workflow, adaptive=True)
+                elapsed = time.perf_counter() - start
+            stats = state["prompt_stats"]
+            row = totals.setdefault((classify_query(query), mode), {"n": 0, "tokens": 0, "seconds": 0.0})
+            row["n"] += 1
+            row["tokens"] += stats["prompt_tokens"] + stats["completion_tokens"]
+            row["seconds"] += elapsed
+
+    rows = [
+        {
+            "class": cls,
+            "mode": mode,
+            "queries": row["n"],
+            "tokens_per_query": row["tokens"] // row["n"],
+            "s_per_query": row["seconds"] / row["n"],
+        }
+        for (cls, mode), row in sorted(totals.items())
+    ]
+    print_table("Adaptive budgets: cost and latency per query class", rows)
+
+
+# ---------------------------------------------------------------------------
+# Deadline benchmark
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_deadline(args: argparse.Namespace):
+    """
+    Compare latency distributions with and without a per-run deadline
+    """
+    import agents
+    from agents import create_research_workflow, run_research_assistant
+
+    # The thresholds assume ~3s real LLM calls; scale them to the simulated latency
+    scale = args.latency / 3.0
+    for name in ("MIN_ITERATION_SECONDS", "FAST_MODE_SECONDS", "MIN_CRITIQUE_SECONDS", "DEADLINE_RESERVE_SECONDS"):
+        setattr(agents, name, getattr(agents, name) * scale)
+
+    model = StubLLM(args.latency, cpu_iterations=100, suffix=" VERDICT: CONTINUE",
+                    tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    fast = StubLLM(args.latency / 4, cpu_iterations=100)
+    workflow = create_research_workflow(model, StubSearch(latency=0.05), fast_model=fast)
+
+    rows = []
+    for name, deadline in (("no deadline", None), (f"deadline {args.deadline}s", args.deadline)):
+        latencies = []
+        partial = 0
+        for i in range(args.queries):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                state = run_research_assistant(f"query {i}", args.iterations, workflow=workflow, deadline=deadline)
+                latencies.append(time.perf_counter() - start)
+            partial += "partial" in state.get("degraded", [])
+        rows.append({
+            "mode": name,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "max_s": max(latencies),
+            "partial_results": partial,
+        })
+
+    print_table(
+        f"Deadline: {args.queries} queries, {args.tail_rate:.0%} of calls +{args.tail_latency}s",
+        rows
+    )
+
+
+def bench_schedule(args: argparse.Namespace):
+    """
+    Compare interactive latency behind a batch backlog: FIFO vs fair queuing
+    """
+    import queue
+    import threading
+    from agents import create_research_workflow, run_research_assistant
+    from scheduler import Scheduler
+
+    class FifoScheduler(Scheduler):
+        """Single queue in arrival order: every call competes equally"""
+
+        def _tag(self, flow, cost):
+            return 0.0, time.perf_counter()
+
+    rows = []
+    for name, scheduler in (("fifo", FifoScheduler(args.slots)), ("fair queue", Scheduler(args.slots))):
+        workflow = create_research_workflow(
+            StubLLM(args.latency, cpu_iterations=100), StubSearch(latency=args.latency / 2),
+            scheduler=scheduler
+        )
+        backlog = queue.Queue()
+        for i in range(args.batch):
+            backlog.put(f"batch query {i}")
+        interactive = []
+
+        def drain():
+            while True:
+                try:
+                    query = backlog.get_nowait()
+                except queue.Empty:
+                    return
+                run_research_assistant(query, args.iterations, workflow=workflow,
+                                       tenant="analytics", priority="batch")
+
+        def serve():
+            for i in range(args.interactive):
+                time.sleep(args.think_time)
+                start = time.perf_counter()
+                run_research_assistant(f"interactive query {i}", args.iterations, workflow=workflow,
+                                       tenant="web", priority="interactive")
+                interactive.append(time.perf_counter() - start)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            threads = [threading.Thread(target=drain) for _ in range(args.batch_threads)]
+            threads.append(threading.Thread(target=serve))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        waits = scheduler.wait_stats()
+        rows.append({
+            "scheduler": name,
+            "interactive_p50_s": percentile(interactive, 50),
+            "interactive_p95_s": percentile(interactive, 95),
+            "interactive_wait_p95_s": waits["interactive"]["p95"],
+            "batch_wait_p95_s": waits["batch"]["p95"],
+            "total_s": elapsed,
+        })
+
+    print_table(
+        f"Scheduling: {args.batch} batch + {args.interactive} interactive queries, {args.slots} call slots",
+        rows
+    )
+
+
+def bench_records(args: argparse.Namespace):
+    """
+    Memory held by many completed runs: state dicts vs compact RunRecords
+    """
+    from records import RunRecord
+
+    rng = random.Random(args.seed)
+    pool = [synthetic_result(rng, args.iterations) for _ in range(args.distinct)]
+    for result in pool:
+        result["query_class"] = rng.choice(("simple", "standard", "deep"))
+
+    def fresh(i: int) -> Dict[str, Any]:
+        # Independent string copies, as json.load produces for each saved file
+        result = pool[i % len(pool)]
+        copy = lambda text: text.encode("utf-8").decode("utf-8")
+        return {
+            "query": copy(result["query"]),
+            "final_summary": copy(result["final_summary"]),
+            "research_results": [copy(t) for t in result["research_results"]],
+            "critique_feedback": [copy(t) for t in result["critique_feedback"]],
+            "iteration": result["iteration"],
+            "max_iterations": result["max_iterations"],
+            "query_class": copy(result["query_class"]),
+        }
+
+    def lazy(i: int) -> RunRecord:
+        record = RunRecord.from_state(fresh(i), compress=False, source=f"results/research_result_{i:06d}.json")
+        record.unload()
+        return record
+
+    modes = (
+        ("dict state", fresh),
+        ("RunRecord", lambda i: RunRecord.from_state(fresh(i), compress=False)),
+        ("RunRecord + zlib", lambda i: RunRecord.from_state(fresh(i))),
+        ("RunRecord lazy", lazy),
+    )
+
+    rows = []
+    for name, build in modes:
+        start = time.perf_counter()
+        held = [build(i) for i in range(args.records)]
+        elapsed = time.perf_counter() - start
+        del held
+
+        tracemalloc.start()
+        held = [build(i) for i in range(args.records)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append({
+            "representation": name,
+            "memory_mb": current / (1024 * 1024),
+            "bytes_per_record": current // args.records,
+            "build_s": elapsed,
+        })
+        del held
+
+    print_table(f"Run records: {args.records} held in memory ({args.distinct} distinct queries)", rows)
+
+
+def serve_openai_stub(model, port: int = 0, rate_limit: Optional[Tuple[int, float]] = None):
+    """
+    Serve a chat model behind a minimal OpenAI-compatible HTTP endpoint
+
+    Lets the local backend (agents.LocalChatModel) be exercised end to end
+    without a llama.cpp install.
+
+    Args:
+        model: Chat model answering the requests
+        port: Port to listen on (0 picks a free one)
+        rate_limit: (requests, window_seconds) quota, reported in Groq-style
+            x-ratelimit-* headers and enforced with 429 + retry-after
+
+    Returns:
+        (server, base_url); call server.shutdown() when done. Set
+        server.status to an HTTP error code to make every request fail with it.
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    classes = {"system": SystemMessage, "assistant": AIMessage}
+    quota_lock = threading.Lock()
+    window = {"start": time.time(), "used": 0}
+
+    def take_quota() -> Tuple[bool, Dict[str, str]]:
+        if rate_limit is None:
+            return True, {}
+        requests, seconds = rate_limit
+        with quota_lock:
+            now = time.time()
+            if now - window["start"] >= seconds:
+                window["start"], window["used"] = now, 0
+            allowed = window["used"] < requests
+            window["used"] += allowed
+            reset = max(window["start"] + seconds - now, 0.001)
+            return allowed, {
+                "x-ratelimit-limit-requests": str(requests),
+                "x-ratelimit-remaining-requests": str(requests - window["used"]),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            }
+
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, status: int, payload: bytes, headers: Dict[str, str]):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if server.status != 200:
+                self.reply(server.status, b'{"error": {"message": "injected failure"}}', {})
+                return
+            allowed, headers = take_quota()
+            if not allowed:
+                headers["retry-after"] = headers["x-ratelimit-reset-requests"][:-1]
+                self.reply(429, b'{"error": {"message": "rate limit reached"}}', headers)
+                return
+            messages = [classes.get(m["role"], HumanMessage)(content=m["content"]) for m in body["messages"]]
+            response = model.invoke(messages, max_tokens=body.get("max_tokens"))
+            payload = json.dumps({
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": response.content}}],
+                "usage": response.response_metadata.get("token_usage", {}),
+            }).encode("utf-8")
+            self.reply(200, payload, headers)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.status = 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _unigram_f1(text: str, reference: str) -> float:
+    from collections import Counter
+    from extraction import tokenize
+
+    a, b = Counter(tokenize(text)), Counter(tokenize(reference))
+    overlap = sum((a & b).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(a.values()), overlap / sum(b.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def bench_providers(args: argparse.Namespace):
+    """
+    Side-by-side latency and quality of LLM backends on the critique and summary steps
+    """
+    from agents import CritiqueAgent, LocalChatModel, SummarizeAgent, get_llm, should_continue
+
+    server = None
+    names = args.providers.split(",")
+    models = {}
+    for name in names:
+        if name == "local" and args.serve_stub:
+            from agents import StubChatModel
+            server, url = serve_openai_stub(StubChatModel(latency=args.stub_latency))
+            models[name] = LocalChatModel(base_url=url)
+        else:
+            models[name] = get_llm(name)
+
+    rng = random.Random(args.seed)
+    states = []
+    for i in range(args.samples):
+        result = synthetic_result(rng, iterations=1)
+        states.append({
+            "query": result["query"],
+            "research_results": result["research_results"],
+            "critique_feedback": result["critique_feedback"],
+            "final_summary": "",
+            "iteration": 1,
+            "max_iterations": 2,
+        })
+
+    outputs = {}
+    rows = []
+    try:
+        for name in names:
+            critique_agent = CritiqueAgent(models[name])
+            summarize_agent = SummarizeAgent(models[name])
+            for step, run in (
+                ("critique", lambda s: critique_agent.execute(s)["critique_feedback"][0]),
+                ("summarize", lambda s: summarize_agent.execute(s)["final_summary"]),
+            ):
+                latencies, texts = [], []
+                for state in states:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        start = time.perf_counter()
+                        texts.append(run(state))
+                        latencies.append(time.perf_counter() - start)
+                outputs[(name, step)] = texts
+
+                reference = outputs[(names[0], step)]
+                row = {
+                    "provider": name,
+                    "step": step,
+                    "p50_s": percentile(latencies, 50),
+                    "p95_s": percentile(latencies, 95),
+                    "avg_chars": sum(map(len, texts)) / len(texts),
+                    "overlap_f1": sum(map(_unigram_f1, texts, reference)) / len(texts),
+                    "decision_agreement": "-",
+                }
+                if step == "critique":
+                    decisions = [should_continue(dict(s, critique_feedback=[t])) for s, t in zip(states, texts)]
+                    ref = [should_continue(dict(s, critique_feedback=[t])) for s, t in zip(states, reference)]
+                    row["decision_agreement"] = sum(map(operator.eq, decisions, ref)) / len(states)
+                rows.append(row)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_table(
+        f"LLM providers: {args.samples} samples, quality relative to '{names[0]}'",
+        rows
+    )
+
+
+def bench_mapreduce(args: argparse.Namespace):
+    """
+    Compare the single-prompt research call with map-reduce over many sources
+    """
+    from agents import ResearchAgent, SOURCE_CONTEXT_CHARS
+    from extraction import select_passages
+    from prompts import track_prompts
+
+    model = StubLLM(args.latency, cpu_iterations=100, token_latency=args.token_latency)
+    fast = StubLLM(args.latency, cpu_iterations=100, token_latency=args.token_latency / 4)
+
+    rows = []
+    for sources in (3, 10, 20):
+        search = StubSearch(max_results=sources, latency=0.0)
+        results = search.invoke("query")
+        for mode in ("single", "map-reduce"):
+            agent = ResearchAgent(model, search, fast, map_reduce=mode == "map-reduce")
+            if agent.map_reduce:
+                read = len({number for number, _ in agent.source_chunks(results)})
+            else:
+                read = len(select_passages("query", results, SOURCE_CONTEXT_CHARS))
+            state = {"query": "query", "iteration": 0, "max_iterations": 1, "max_results": sources}
+            with contextlib.redirect_stdout(io.StringIO()), track_prompts() as tracker:
+                start = time.perf_counter()
+                agent.execute(state)
+                elapsed = time.perf_counter() - start
+            calls = tracker.report()["calls"]
+            rows.append({
+                "sources": sources,
+                "mode": mode,
+                "sources_read": read,
+                "research_s": elapsed,
+                "llm_calls": len(calls),
+                "max_prompt_tokens": max(c["prompt_tokens"] for c in calls),
+            })
+
+    print_table(
+        f"Map-reduce research: LLM {args.latency}s + {args.token_latency}s/token "
+        f"(map model {args.token_latency / 4}s/token)",
+        rows
+    )
+
+
+def bench_followup(args: argparse.Namespace):
+    """
+    Compare a fresh research run with follow-ups answered from session state
+    """
+    from langchain_core.messages import AIMessage
+    from sessions import ANSWER_OR_SEARCH, FollowUpResearch, SessionStore
+
+    class DeltaLLM(StubLLM):
+        """Asks for a delta search whenever it is allowed to"""
+
+        def invoke(self, messages, *args, **kwargs):
+            if ANSWER_OR_SEARCH in messages[-1].content:
+                time.sleep(self.latency)
+                return AIMessage(content="SEARCH: missing detail")
+            return super().invoke(messages, *args, **kwargs)
+
+    search = StubSearch(latency=args.search_latency)
+    rows = []
+    for mode, llm in (("answered", StubLLM(args.latency, cpu_iterations=100)),
+                      ("delta search", DeltaLLM(args.latency, cpu_iterations=100))):
+        research = FollowUpResearch(SessionStore(), llm=llm, search_tool=search)
+        fresh, follow = [], []
+        for i in range(args.queries):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                research.ask(f"session-{i}", f"topic {i}", max_iterations=args.iterations)
+                fresh.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                research.ask(f"session-{i}", f"and what about cost {i}?")
+                follow.append(time.perf_counter() - start)
+        rows.append({
+            "follow_up": mode,
+            "fresh_s": sum(fresh) / len(fresh),
+            "follow_up_s": sum(follow) / len(follow),
+            "ratio": sum(follow) / sum(fresh),
+        })
+
+    print_table(
+        f"Follow-ups: {args.queries} sessions, {args.iterations} iterations, "
+        f"LLM {args.latency}s, search {args.search_latency}s",
+        rows
+    )
+
+
+def bench_history(args: argparse.Namespace):
+    """
+    History index build, per-save update and keyword query latency
+    """
+    import tempfile
+    from history import HistoryIndex
+
+    rng = random.Random(args.seed)
+    topics = [f"topic{i}" for i in range(args.topics)]
+
+    def run():
+        # The shared vocabulary appears in every run; topic words are what real queries select on
+        topic = " ".join(rng.sample(topics, 2))
+        return {
+            "timestamp": "2025-01-01T00:00:00",
+            "query": f"{topic} " + " ".join(rng.choices(WORDS, k=6)),
+            "final_summary": f"{topic}. " + synthetic_text(rng, paragraphs=2, sentences=6),
+            "research_results": [synthetic_text(rng, paragraphs=2, sentences=6)],
+            "critique_feedback": [synthetic_text(rng, paragraphs=1, sentences=4)],
+            "iterations": 1,
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = HistoryIndex(os.path.join(tmp, "history.db"))
+        rows = []
+
+        start = time.perf_counter()
+        index.add_many((f"results/research_result_{i:06d}.json", run()) for i in range(args.records))
+        rows.append({"operation": f"bulk load ({args.records} runs)", "seconds": time.perf_counter() - start})
+
+        latencies = []
+        for i in range(args.saves):
+            result = run()
+            start = time.perf_counter()
+            index.add(f"results/research_result_new_{i:04d}.json", result)
+            latencies.append(time.perf_counter() - start)
+        rows.append({"operation": "add after save p50", "seconds": percentile(latencies, 50)})
+
+        queries = [
+            ("topic", lambda: rng.choice(topics)),
+            ("topic + common word", lambda: f"{rng.choice(topics)} {rng.choice(WORDS)}"),
+            ("common words only", lambda: " ".join(rng.sample(WORDS, 2))),
+        ]
+        for name, make_query in queries:
+            latencies = []
+            for _ in range(args.queries):
+                text = make_query()
+                start = time.perf_counter()
+                index.search(text, 10)
+                latencies.append(time.perf_counter() - start)
+            rows.append({"operation": f"query p50 ({name})", "seconds": percentile(latencies, 50)})
+            rows.append({"operation": f"query p95 ({name})", "seconds": percentile(latencies, 95)})
+
+        stats = index.stats()
+        index.close()
+
+    print_table(f"History index: {stats['runs']} runs, {stats['bytes'] / 1e6:.0f} MB", rows)
+
+
+def bench_concurrency(args: argparse.Namespace):
+    """
+    Throughput and 429s of fixed concurrency limits vs the adaptive limiter
+    """
+    import threading
+    from limiter import AdaptiveLimiter
+    from scheduler import Scheduler
+
+    class RateLimitError(Exception):
+        status_code = 429
+
+    class Provider:
+        """
+        Serves `capacity` calls at full speed; beyond that calls share the
+        capacity (latency grows), and past 1.5x capacity it answers 429
+        """
+
+        def __init__(self):
+            self.in_flight = 0
+            self.lock = threading.Lock()
+
+        def invoke(self, *_):
+            with self.lock:
+                self.in_flight += 1
+                load = self.in_flight
+            try:
+                if load > args.capacity * 1.5:
+                    time.sleep(args.latency / 10)
+                    raise RateLimitError("429 Too Many Requests")
+                time.sleep(args.latency * max(1.0, load / args.capacity))
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+
+    modes = [(f"fixed {n}", n) for n in (2, args.capacity, args.capacity * 4)] + [("adaptive", None)]
+    rows = []
+    for name, slots in modes:
+        if slots is None:
+            scheduler = Scheduler(limiter=AdaptiveLimiter(initial_limit=2))
+        else:
+            scheduler = Scheduler(max_concurrent=slots)
+        provider = Provider()
+        done, rejected, latencies = [0], [0], []
+        stop = time.perf_counter() + args.duration
+
+        def client():
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    scheduler.run(provider.invoke, 100, kind="llm")
+                except RateLimitError:
+                    rejected[0] += 1
+                    time.sleep(args.latency)  # client-side retry backoff
+                    continue
+                done[0] += 1
+                latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rows.append({
+            "limit": name,
+            "final_limit": scheduler.concurrency,
+            "calls_per_s": done[0] / args.duration,
+            "429s": rejected[0],
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+        })
+
+    print_table(
+        f"Concurrency: {args.clients} clients, provider capacity {args.capacity} x {args.latency}s calls "
+        f"(best possible {args.capacity / args.latency:.0f} calls/s)",
+        rows
+    )
+
+
+def bench_keys(args: argparse.Namespace):
+    """
+    Throughput of a key pool as keys are added, each with its own request quota
+    """
+    import threading
+    from agents import LocalChatModel
+    from key_pool import KeyPool, PoolExhaustedError
+
+    model = StubLLM(latency=args.latency, cpu_iterations=0)
+    # One key failing with 500s shows failover at the largest pool size
+    setups = [(n, 0) for n in range(1, args.max_keys + 1) if n & (n - 1) == 0] + [(args.max_keys, 1)]
+    rows = []
+    for keys, down in setups:
+        servers = [serve_openai_stub(model, rate_limit=(args.quota, args.window)) for _ in range(keys)]
+        for server, _ in servers[:down]:
+            server.status = 500
+        pool = KeyPool(
+            [LocalChatModel(url, "stub", f"key-{i}", max_tokens=64) for i, (_, url) in enumerate(servers)],
+            max_wait=args.window * 2
+        )
+        done, failed, latencies = [0], [0], []
+        lock = threading.Lock()
+        stop = time.perf_counter() + args.duration
+
+        def client():
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    pool.invoke("Summarize the findings.")
+                except PoolExhaustedError:
+                    with lock:
+                        failed[0] += 1
+                    continue
+                with lock:
+                    done[0] += 1
+                    latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for server, _ in servers:
+            server.shutdown()
+
+        stats = pool.stats()
+        rows.append({
+            "keys": f"{keys} ({down} down)" if down else str(keys),
+            "calls_per_s": done[0] / args.duration,
+            "quota_per_s": (keys - down) * args.quota / args.window,
+            "429s": sum(m["rate_limited"] for m in stats),
+            "exhausted": failed[0],
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+        })
+
+    print_table(
+        f"Key pool: {args.clients} clients, {args.quota} requests per {args.window}s per key, "
+        f"{args.latency}s calls",
+        rows
+    )
+
+
+def bench_daemon(args: argparse.Namespace):
+    """
+    `python main.py` latency: cold in-process runs vs a thin client of a warm daemon
+    """
+    import shutil
+    import subprocess
+    import sys
+    import tempfile
+    from daemon import request, start_background
+
+    directory = tempfile.mkdtemp(prefix="daemon-bench-")
+    os.makedirs(os.path.join(directory, "corpus"))
+    rng = random.Random(args.seed)
+    for i in range(20):
+        with open(os.path.join(directory, "corpus", f"doc_{i}.md"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(synthetic_text(rng, 60) for _ in range(5)))
+
+    # Offline: stub LLM and local search, so the numbers are all start-up and overhead
+    env = dict(os.environ, LLM_PROVIDER="stub", RESEARCH_DAEMON_SOCKET=os.path.join(directory, "d.sock"))
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    command = [sys.executable, script, "research topic", "--search", "local", "--corpus", "corpus",
+               "--max-iterations", "1"]
+
+    def invoke(extra: List[str]) -> float:
+        start = time.perf_counter()
+        subprocess.run(command + extra, cwd=directory, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+    rows = []
+    cold = [invoke(["--no-daemon"]) for _ in range(args.invocations)]
+
+    saved = os.environ.copy()
+    cwd = os.getcwd()
+    os.environ.update(env)
+    os.chdir(directory)
+    try:
+        start = time.perf_counter()
+        start_background(env["RESEARCH_DAEMON_SOCKET"], os.path.join(directory, "daemon.log"))
+        startup = time.perf_counter() - start
+        warm = [invoke([]) for _ in range(args.invocations)]
+        request({"command": "stop"}, env["RESEARCH_DAEMON_SOCKET"])
+    finally:
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(saved)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    for name, times in (("cold (in-process)", cold), ("warm (daemon client)", warm)):
+        rows.append({
+            "mode": name,
+            "mean_s": sum(times) / len(times),
+            "p50_s": percentile(times, 50),
+            "p95_s": percentile(times, 95),
+            "speedup": (sum(cold) / len(cold)) / (sum(times) / len(times)),
+        })
+
+    print_table(
+        f"main.py invocation latency: {args.invocations} runs each "
+        f"(stub LLM, local search; daemon start-up {startup:.1f}s, paid once)",
+        rows
+    )
+
+
+def main():
+    """
+    Benchmark CLI entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Markdown/HTML/JSONL export throughput")
+    export.add_argument("--records", type=int, default=200)
+    export.add_argument("--iterations", type=int, default=5)
+    export.set_defaults(func=bench_export)
+
+    storage = sub.add_parser("storage", help="Saved-result size and speed per storage format")
+    storage.add_argument("--records", type=int, default=500)
+    storage.add_argument("--iterations", type=int, default=2)
+    storage.set_defaults(func=bench_storage)
+
+    search = sub.add_parser("search", help="Local index build, refresh and query latency")
+    search.add_argument("--documents", type=int, default=5000)
+    search.add_argument("--queries", type=int, default=200)
+    search.set_defaults(func=bench_search)
+
+    workers = sub.add_parser("workers", help="Multi-process batch throughput")
+    workers.add_argument("--queries", type=int, default=16)
+    workers.add_argument("--iterations", type=int, default=2)
+    workers.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    workers.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency (s)")
+    workers.add_argument("--cpu-iterations", type=int, default=20000, help="Simulated CPU work per call")
+    workers.set_defaults(func=bench_workers)
+
+    workflow = sub.add_parser("workflow", help="Sequential vs fan-out/fan-in workflow latency")
+    workflow.add_argument("--queries", type=int, default=3)
+    workflow.add_argument("--iterations", type=int, default=2)
+    workflow.add_argument("--latency", type=float, default=0.3, help="Simulated LLM latency (s)")
+    workflow.add_argument("--search-latency", type=float, default=0.3, help="Simulated search latency (s)")
+    workflow.set_defaults(func=bench_workflow)
+
+    speculative = sub.add_parser("speculative", help="Speculative summary latency and hit rate")
+    speculative.add_argument("--queries", type=int, default=10)
+    speculative.add_argument("--iterations", type=int, default=1)
+    speculative.add_argument("--latency", type=float, default=0.2, help="Simulated LLM latency (s)")
+    speculative.add_argument("--flag-rate", type=float, default=0.3, help="Share of critiques flagging issues")
+    speculative.set_defaults(func=bench_speculative)
+
+    budget = sub.add_parser("budget", help="Fixed vs adaptive per-query budgets")
+    budget.add_argument("--latency", type=float, default=0.05, help="Simulated LLM latency (s)")
+    budget.add_argument("--token-latency", type=float, default=0.0005, help="Seconds per completion token")
+    budget.set_defaults(func=bench_budget)
+
+    deadline = sub.add_parser("deadline", help="Tail latency with and without a deadline")
+    deadline.add_argument("--queries", type=int, default=20)
+    deadline.add_argument("--iterations", type=int, default=2)
+    deadline.add_argument("--deadline", type=float, default=2.0, help="Per-run deadline (s)")
+    deadline.add_argument("--latency", type=float, default=0.1, help="Simulated LLM latency (s)")
+    deadline.add_argument("--tail-rate", type=float, default=0.1, help="Share of slow LLM calls")
+    deadline.add_argument("--tail-latency", type=float, default=3.0, help="Extra latency of slow calls (s)")
+    deadline.set_defaults(func=bench_deadline)
+
+    schedule = sub.add_parser("schedule", help="Interactive latency behind a batch backlog")
+    schedule.add_argument("--batch", type=int, default=40, help="Queued batch queries")
+    schedule.add_argument("--batch-threads", type=int, default=8)
+    schedule.add_argument("--interactive", type=int, default=10, help="Interactive queries")
+    schedule.add_argument("--think-time", type=float, default=0.1, help="Pause between interactive queries (s)")
+    schedule.add_argument("--iterations", type=int, default=1)
+    schedule.add_argument("--slots", type=int, default=2, help="Concurrent LLM/search calls")
+    schedule.add_argument("--latency", type=float, default=0.05, help="Simulated LLM latency (s)")
+    schedule.set_defaults(func=bench_schedule)
+
+    records = sub.add_parser("records", help="Memory of many held results: dicts vs RunRecords")
+    records.add_argument("--records", type=int, default=50000)
+    records.add_argument("--distinct", type=int, default=500, help="Distinct queries in the history")
+    records.add_argument("--iterations", type=int, default=2)
+    records.set_defaults(func=bench_records)
+
+    providers = sub.add_parser("providers", help="Side-by-side LLM backend latency and quality")
+    providers.add_argument("--providers", default="stub,local",
+                           help="Comma-separated backends; the first is the quality reference")
+    providers.add_argument("--samples", type=int, default=20)
+    providers.add_argument("--serve-stub", action="store_true",
+                           help="Serve the stub model over HTTP as the 'local' backend")
+    providers.add_argument("--stub-latency", type=float, default=0.0, help="Latency of the served stub (s)")
+    providers.set_defaults(func=bench_providers)
+
+    mapreduce = sub.add_parser("mapreduce", help="Single-prompt vs map-reduce research over many sources")
+    mapreduce.add_argument("--latency", type=float, default=0.2, help="Simulated LLM latency (s)")
+    mapreduce.add_argument("--token-latency", type=float, default=0.002, help="Seconds per completion token")
+    mapreduce.set_defaults(func=bench_mapreduce)
+
+    followup = sub.add_parser("followup", help="Fresh run vs follow-up from session state")
+    followup.add_argument("--queries", type=int, default=5)
+    followup.add_argument("--iterations", type=int, default=2)
+    followup.add_argument("--latency", type=float, default=0.2, help="Simulated LLM latency (s)")
+    followup.add_argument("--search-latency", type=float, default=0.3, help="Simulated search latency (s)")
+    followup.set_defaults(func=bench_followup)
+
+    history = sub.add_parser("history", help="Full-text history index build and query latency")
+    history.add_argument("--records", type=int, default=100000)
+    history.add_argument("--saves", type=int, default=200, help="Single results indexed after the bulk load")
+    history.add_argument("--queries", type=int, default=200)
+    history.add_argument("--topics", type=int, default=20000, help="Distinct topic words across runs")
+    history.set_defaults(func=bench_history)
+
+    concurrency = sub.add_parser("concurrency", help="Fixed vs adaptive concurrency against a rate-limited provider")
+    concurrency.add_argument("--capacity", type=int, default=8, help="Calls the provider serves at full speed")
+    concurrency.add_argument("--latency", type=float, default=0.05, help="Unloaded call latency (s)")
+    concurrency.add_argument("--clients", type=int, default=64, help="Threads issuing calls")
+    concurrency.add_argument("--duration", type=float, default=5.0, help="Seconds per mode")
+    concurrency.set_defaults(func=bench_concurrency)
+
+    keys = sub.add_parser("keys", help="Key pool throughput as keys are added")
+    keys.add_argument("--max-keys", type=int, default=4)
+    keys.add_argument("--quota", type=int, default=20, help="Requests per window per key")
+    keys.add_argument("--window", type=float, default=1.0, help="Rate-limit window (s)")
+    keys.add_argument("--latency", type=float, default=0.02, help="Stub model latency (s)")
+    keys.add_argument("--clients", type=int, default=16, help="Threads issuing calls")
+    keys.add_argument("--duration", type=float, default=4.0, help="Seconds per pool size")
+    keys.set_defaults(func=bench_keys)
+
+    daemon = sub.add_parser("daemon", help="Cold vs warm (daemon) main.py invocation latency")
+    daemon.add_argument("--invocations", type=int, default=10)
+    daemon.set_defaults(func=bench_daemon)
+
+    args = parser.parse_args()
+
+    # agents.py builds its clients at import time; offline runs never call them
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "offline-benchmark")
+
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Adaptive per-query budgets for the Multi-Agent Research Assistant
+Classifies queries by complexity and picks iteration count, search depth
+and output token cap for each one, within a shared tokens-per-minute budget
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, NamedTuple, Optional
+
+
+class QueryProfile(NamedTuple):
+    """
+    Resource settings for one class of query
+    """
+    name: str
+    max_iterations: int
+    max_results: int
+    max_tokens: int
+
+
+QUERY_PROFILES: Dict[str, QueryProfile] = {
+    "simple": QueryProfile("simple", max_iterations=1, max_results=2, max_tokens=512),
+    "standard": QueryProfile("standard", max_iterations=2, max_results=3, max_tokens=1024),
+    "deep": QueryProfile("deep", max_iterations=3, max_results=5, max_tokens=1536),
+}
+
+# Settings used before adaptive budgets (agents.py defaults)
+FIXED_PROFILE = QueryProfile("fixed", max_iterations=2, max_results=3, max_tokens=1024)
+
+# Cheapest first; used when the global budget forces a downgrade
+PROFILE_ORDER = ("simple", "standard", "deep")
+
+_COMPARATIVE = re.compile(
+    r"\b(compare|comparison|versus|vs\.?|differences?|pros and cons|trade-?offs?|"
+    r"impact of|implications|relationship between|affect(s|ing)?|analy[sz]e)\b",
+    re.IGNORECASE
+)
+_FACTUAL = re.compile(
+    r"^(what|who|when|where) (is|are|was|were)\b|^(define|definition of)\b",
+    re.IGNORECASE
+)
+_RECENCY = re.compile(r"\b(latest|recent|current|trends?|news|today|20\d\d)\b", re.IGNORECASE)
+
+
+def classify_query(query: str) -> str:
+    """
+    Classify a query as 'simple', 'standard' or 'deep' using local heuristics
+
+    Args:
+        query: The user's research question
+
+    Returns:
+        Name of the matching entry in QUERY_PROFILES
+    """
+    words = query.split()
+    clauses = len(re.findall(r"\b(and|or)\b|[,;]", query, re.IGNORECASE))
+
+    if _COMPARATIVE.search(query) or len(words) > 20 or clauses >= 3:
+        return "deep"
+    if len(words) <= 8 and _FACTUAL.search(query.strip()) and not _RECENCY.search(query):
+        return "simple"
+    return "standard"
+
+
+def estimate_profile_tokens(profile: QueryProfile) -> int:
+    """
+    Rough worst-case tokens (prompt + completion) for one run of a profile
+
+    Follows the breakdown in RATE_LIMITS.md: ~125 tokens per source passage,
+    a critique of about half the research length and one summary call.
+    """
+    research = 150 + profile.max_results * 125 + profile.max_tokens
+    critique = 300 + profile.max_tokens // 2
+    summary = 550 + profile.max_tokens
+    return profile.max_iterations * (research + critique) + summary
+
+
+class TokenBudget:
+    """
+    Sliding one-minute window of tokens spent across all queries
+    """
+
+    def __init__(self, tokens_per_minute: int = 12000, window: float = 60.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+    def used(self) -> int:
+        """
+        Tokens spent within the current window
+        """
+        with self._lock:
+            self._trim(time.monotonic())
+            return sum(tokens for _, tokens in self._events)
+
+    def remaining(self) -> int:
+        """
+        Tokens still available within the current window
+        """
+        return max(0, self.tokens_per_minute - self.used())
+
+    def record(self, tokens: int):
+        """
+        Record tokens spent by a finished run
+        """
+        with self._lock:
+            self._events.append((time.monotonic(), tokens))
+
+
+def plan_query(query: str, budget: Optional[TokenBudget] = None) -> QueryProfile:
+    """
+    Choose the resource profile for a query
+
+    The classifier picks the preferred profile; if a global budget is given
+    and the profile's estimated cost does not fit what remains in the
+    window, it is downgraded to the next cheaper profile that does.
+
+    Args:
+        query: The user's research question
+        budget: Optional shared token budget
+
+    Returns:
+        The QueryProfile to run with
+    """
+    preferred = classify_query(query)
+    if budget is None:
+        return QUERY_PROFILES[preferred]
+
+    remaining = budget.remaining()
+    for name in reversed(PROFILE_ORDER[:PROFILE_ORDER.index(preferred) + 1]):
+        profile = QUERY_PROFILES[name]
+        if estimate_profile_tokens(profile) <= remaining:
+            return profile
+    return QUERY_PROFILES[PROFILE_ORDER[0]]
+
+
+# Budgets shared by every run in the process (the daemon and the Streamlit
+# server serve many), one per tokens-per-minute limit
+_shared_budgets: Dict[int, TokenBudget] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_budget(tokens_per_minute: Optional[int] = None) -> Optional[TokenBudget]:
+    """
+    Process-wide token budget for a tokens-per-minute limit
+
+    Args:
+        tokens_per_minute: Limit (defaults to the TOKEN_BUDGET environment
+            variable); 0 or unset means no budget
+
+    Returns:
+        The shared TokenBudget, or None when no limit is set
+    """
+    if tokens_per_minute is None:
+        tokens_per_minute = int(os.getenv("TOKEN_BUDGET") or 0)
+    if tokens_per_minute <= 0:
+        return None
+    with _shared_lock:
+        if tokens_per_minute not in _shared_budgets:
+            _shared_budgets[tokens_per_minute] = TokenBudget(tokens_per_minute)
+        return _shared_budgets[tokens_per_minute]
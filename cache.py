@@ -0,0 +1,211 @@
+"""
+Shared result cache for the Multi-Agent Research Assistant
+Keeps completed runs keyed by query and settings so repeated questions,
+from the same browser session or another user, are answered instantly
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Seconds a cached result is served at all, and after which it is shown as stale
+DEFAULT_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+DEFAULT_STALE_AFTER = float(os.getenv("RESULT_CACHE_STALE_AFTER", "900"))
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def normalize_query(query: str) -> str:
+    """
+    Fold case and whitespace so trivially different spellings share an entry
+    """
+    return " ".join(query.lower().split())
+
+
+def cache_key(query: str, **settings) -> str:
+    """
+    Build a cache key from a query and the settings that change its answer
+
+    Args:
+        query: The research question
+        **settings: e.g. max_iterations, adaptive; None values are ignored
+
+    Returns:
+        Hex digest identifying the (query, settings) pair
+    """
+    settings = {name: value for name, value in settings.items() if value is not None}
+    payload = json.dumps([normalize_query(query), settings], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    """
+    One cached result with its age and reuse count
+    """
+
+    __slots__ = ("result", "created", "hits")
+
+    def __init__(self, result: Dict[str, Any], created: float):
+        self.result = result
+        self.created = created
+        self.hits = 0
+
+    def age(self, now: Optional[float] = None) -> float:
+        """
+        Seconds since the result was computed
+        """
+        return (time.time() if now is None else now) - self.created
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of completed research results with a TTL
+
+    Entries older than `stale_after` are still served but reported as
+    stale so the UI can offer a refresh; entries older than `ttl` are
+    dropped. Concurrent requests for the same key run the pipeline once
+    and share the result.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        stale_after: float = DEFAULT_STALE_AFTER,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            ttl: Seconds before an entry expires
+            stale_after: Seconds before an entry is flagged as stale
+            max_entries: Least recently used entries are evicted past this size
+            clock: Time source (injectable for tests)
+        """
+        self.ttl = ttl
+        self.stale_after = min(stale_after, ttl)
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.age(self.clock()) >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Return a live entry (counted as a hit) or None (counted as a miss)
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                entry.hits += 1
+            return entry
+
+    def put(self, key: str, result: Dict[str, Any]) -> CacheEntry:
+        """
+        Store a result, evicting the least recently used entries if full
+        """
+        with self._lock:
+            entry = self._entries[key] = CacheEntry(result, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def is_stale(self, entry: CacheEntry) -> bool:
+        """
+        Whether an entry is old enough that the UI should suggest a refresh
+        """
+        return entry.age(self.clock()) >= self.stale_after
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Drop one entry; returns whether it existed
+        """
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """
+        Drop all entries and reset the hit counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def get_or_run(
+        self,
+        key: str,
+        run: Callable[[], Dict[str, Any]],
+        refresh: bool = False,
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda result: True
+    ) -> Tuple[CacheEntry, bool]:
+        """
+        Serve a cached result or compute, store and return a new one
+
+        Args:
+            key: From cache_key()
+            run: Computes the result on a miss
+            refresh: Ignore any cached entry and recompute
+            cacheable: Results failing this check are returned but not stored
+
+        Returns:
+            (entry, hit) where hit is True if no computation was needed
+        """
+        while True:
+            with self._lock:
+                entry = None if refresh else self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    entry.hits += 1
+                    return entry, True
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    self.misses += 1
+                    self._inflight[key] = threading.Event()
+                    break
+            # Someone else is computing this key; wait and re-check
+            waiting.wait()
+            refresh = False
+
+        try:
+            result = run()
+            if cacheable(result):
+                entry = self.put(key, result)
+            else:
+                entry = CacheEntry(result, self.clock())
+            return entry, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counts, hit rate and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,472 @@
+"""
+Multi-Agent Research Assistant - Warm Daemon
+Long-lived local server that keeps the heavy imports, LLM and search clients
+and compiled workflows loaded, so `python main.py` invocations skip the cold
+start. main.py connects over a Unix socket when the daemon is running and
+runs in-process otherwise.
+
+Usage:
+    python daemon.py start                  # foreground, Ctrl+C to stop
+    python daemon.py start --background
+    python daemon.py status
+    python daemon.py stop
+
+Only the standard library is imported at module level: main.py imports the
+client half of this file on every invocation.
+
+The socket lives in a directory only its user can open ($XDG_RUNTIME_DIR, or
+a 0700 directory under the temp dir), and both ends check that the other
+runs as the same user before exchanging anything.
+"""
+
+import argparse
+import contextvars
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional, TextIO
+
+
+def _uid() -> Optional[int]:
+    return os.getuid() if hasattr(os, "getuid") else None
+
+
+# One socket per user, in a directory nobody else can open (a predictable path
+# in the shared temp dir could be bound first by another user); set
+# RESEARCH_DAEMON_SOCKET to run several daemons
+DAEMON_SOCKET = os.getenv("RESEARCH_DAEMON_SOCKET") or (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "research-assistant.sock") if os.getenv("XDG_RUNTIME_DIR")
+    else os.path.join(tempfile.gettempdir(), f"research-assistant-{_uid() or 0}", "daemon.sock")
+)
+DAEMON_LOG = os.path.join("results", "daemon.log")
+
+# Environment read by a run (providers, keys, tracing, history, budgets). The
+# daemon runs with the environment it was started with, so a client whose
+# values differ is refused rather than silently served with the daemon's.
+# Values are compared as digests: keys never cross the socket
+DAEMON_ENV = (
+    "LLM_PROVIDER", "GROQ_API_KEY", "GROQ_API_KEYS", "GROQ_BASE_URL", "LLM_POOL_URLS",
+    "LOCAL_LLM_URL", "LOCAL_LLM_MODEL", "LOCAL_LLM_API_KEY",
+    "TAVILY_API_KEY", "TAVILY_API_KEYS", "SEARCH_PROVIDER", "LOCAL_CORPUS_DIR",
+    "RECORD_TRACE", "RECORD_TRACE_REQUESTS", "HISTORY_INDEX", "HISTORY_DB", "TOKEN_BUDGET",
+    "RESULT_COMPRESSION", "RESULT_CACHE_TTL", "RESULT_CACHE_STALE_AFTER",
+    "SCHEDULER_CONCURRENCY", "SCHEDULER_MAX_CONCURRENCY", "MAP_CONCURRENCY",
+)
+
+# Connecting is local; a daemon that does not accept quickly is treated as absent
+CONNECT_TIMEOUT = 1.0
+START_TIMEOUT = 60.0
+
+
+def _settings(environ=None) -> Dict[str, str]:
+    """
+    Digests of the DAEMON_ENV (and per-agent <AGENT>_LLM) variables that are set
+    """
+    environ = os.environ if environ is None else environ
+    return {
+        name: hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+        for name, value in environ.items()
+        if name in DAEMON_ENV or name.endswith("_LLM")
+    }
+
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """
+    User id of the process at the other end of a Unix socket (None where the
+    platform has no SO_PEERCRED)
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credentials)[1]
+
+
+def _private_directory(path: str):
+    """
+    Create the socket's directory if needed and check that only we can use it
+
+    Raises:
+        RuntimeError: The directory is a symlink, owned by another user, or
+            open to group/others
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode) or info.st_uid != _uid() or info.st_mode & 0o077:
+        raise RuntimeError(
+            f"{path} is not a private directory (owner uid {info.st_uid}, mode {stat.S_IMODE(info.st_mode):o}); "
+            "use a 0700 directory you own for the daemon socket"
+        )
+
+
+def _connect(socket_path: str) -> Optional[socket.socket]:
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        owner = os.stat(socket_path).st_uid
+    except OSError:
+        return None
+    uid = _uid()
+    if uid is not None and owner != uid:
+        print(f"⚠️ Ignoring {socket_path}: owned by uid {owner}, not {uid}", file=sys.stderr)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+        peer = _peer_uid(sock)
+    except OSError:
+        sock.close()
+        return None
+    if uid is not None and peer is not None and peer != uid:
+        sock.close()
+        print(f"⚠️ Ignoring {socket_path}: served by uid {peer}, not {uid}", file=sys.stderr)
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def request(message: Dict[str, Any], socket_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Send a control message (status, stop) and return the daemon's reply
+
+    Returns:
+        The reply, or None when no daemon is listening
+    """
+    sock = _connect(socket_path or DAEMON_SOCKET)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def run_remote(
+    argv: List[str],
+    socket_path: Optional[str] = None,
+    stdout: Optional[TextIO] = None,
+    stderr: Optional[TextIO] = None
+) -> Optional[int]:
+    """
+    Run main.py's arguments on the daemon, streaming its output as it is printed
+
+    Args:
+        argv: main.py command line arguments
+        socket_path: Daemon socket (defaults to DAEMON_SOCKET)
+        stdout: Where the run's output goes (defaults to sys.stdout)
+        stderr: Where its warnings go (defaults to sys.stderr)
+
+    Returns:
+        The run's exit code, or None when no daemon can take it (not running,
+        serving another directory, or started with a different environment)
+        and the caller should run in-process
+    """
+    sock = _connect(socket_path or DAEMON_SOCKET)
+    if sock is None:
+        return None
+    streams = {"stdout": stdout or sys.stdout, "stderr": stderr or sys.stderr}
+    with sock, sock.makefile("rwb") as stream:
+        run = {"command": "run", "argv": argv, "cwd": os.getcwd(), "env": _settings()}
+        stream.write(json.dumps(run).encode("utf-8") + b"\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if "refused" in message:
+                if message.get("settings"):
+                    print(f"⚠️ Research daemon not used, running in-process: {message['refused']} "
+                          "(restart it from this shell to pick them up)", file=streams["stderr"])
+                return None
+            if "exit" in message:
+                return message["exit"]
+            target = streams[message.get("stream", "stdout")]
+            target.write(message["output"])
+            target.flush()
+    # Started but never finished: do not run the query a second time
+    print("❌ Research daemon closed the connection mid-run", file=streams["stderr"])
+    return 1
+
+
+# Client stream of the request running in the current context (None: daemon's own output)
+_current_client: contextvars.ContextVar = contextvars.ContextVar("daemon_client", default=None)
+
+
+class _ClientStream:
+    """
+    Sends one request's prints to its client as JSON lines
+    """
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any]):
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except OSError:
+                # Client went away (e.g. Ctrl+C); the run finishes regardless
+                self.closed = True
+
+
+class _RoutedOutput(io.TextIOBase):
+    """
+    sys.stdout/sys.stderr replacement that sends writes to the client of the
+    request they belong to, found through a context variable so that worker
+    threads started with copy_context() route correctly too
+    """
+
+    def __init__(self, name: str, default: TextIO):
+        self.name = name
+        self.default = default
+
+    def write(self, text: str) -> int:
+        client = _current_client.get()
+        if client is None:
+            return self.default.write(text)
+        if text:
+            client.send({"stream": self.name, "output": text})
+        return len(text)
+
+    def flush(self):
+        if _current_client.get() is None:
+            self.default.flush()
+
+
+class ResearchDaemon:
+    """
+    Serves main.py runs from a process that has already paid the cold start
+
+    Workflows are compiled once per (search backend, corpus, map-reduce)
+    combination and shared by concurrent runs, which also share the process's
+    request scheduler. Runs use the daemon's environment (API keys, providers)
+    and working directory, so requests from other directories, or whose
+    DAEMON_ENV settings differ from the daemon's, are refused and run
+    in-process by the client.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None):
+        """
+        Args:
+            socket_path: Unix socket to listen on (defaults to DAEMON_SOCKET)
+        """
+        self.socket_path = socket_path or DAEMON_SOCKET
+        self.cwd = os.getcwd()
+        # Taken before warm() imports agents.py, whose load_dotenv() would add .env
+        self.settings = _settings()
+        self.started = time.time()
+        self.runs = 0
+        self.active = 0
+        self.warmup_seconds = 0.0
+        self._workflows: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def warm(self):
+        """
+        Import the workflow stack and compile the default workflow
+        """
+        import main
+
+        start = time.perf_counter()
+        self.workflow(main.parse_args(["warm-up"]))
+        self.warmup_seconds = time.perf_counter() - start
+
+    def workflow(self, args: argparse.Namespace):
+        """
+        Compiled workflow for a run's search options, built on first use
+        """
+        import main
+
+        key = (args.search, args.corpus, args.map_reduce)
+        with self._lock:
+            if key not in self._workflows:
+                self._workflows[key] = main.build_workflow(args)
+            return self._workflows[key]
+
+    def handle(self, message: Dict[str, Any], client: _ClientStream) -> Dict[str, Any]:
+        """
+        Serve one request; the returned dict is the final reply
+        """
+        command = message.get("command")
+        if command == "status":
+            return {"exit": 0, **self.status()}
+        if command == "stop":
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return {"exit": 0}
+        if command != "run":
+            return {"exit": 2, "error": f"Unknown command: {command}"}
+        if os.path.realpath(message.get("cwd", "")) != os.path.realpath(self.cwd):
+            return {"refused": f"daemon serves {self.cwd}"}
+        client_settings = message.get("env", {})
+        differing = sorted(
+            name for name in set(self.settings) | set(client_settings)
+            if self.settings.get(name) != client_settings.get(name)
+        )
+        if differing:
+            return {"refused": f"environment differs from the daemon's ({', '.join(differing)})", "settings": differing}
+
+        import main
+
+        with self._lock:
+            self.runs += 1
+            self.active += 1
+        token = _current_client.set(client)
+        try:
+            args = main.parse_args(message["argv"])
+            main.run(args, self.workflow(args))
+            return {"exit": 0}
+        except SystemExit as e:
+            return {"exit": e.code if isinstance(e.code, int) else 1}
+        except Exception:
+            traceback.print_exc()
+            return {"exit": 1}
+        finally:
+            _current_client.reset(token)
+            with self._lock:
+                self.active -= 1
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Process, uptime, runs served and compiled workflows
+        """
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "cwd": self.cwd,
+                "uptime": time.time() - self.started,
+                "runs": self.runs,
+                "active": self.active,
+                "workflows": len(self._workflows),
+                "warmup_seconds": self.warmup_seconds,
+            }
+
+    def serve_forever(self):
+        """
+        Warm up, then serve until stopped; removes the socket on exit
+
+        Raises:
+            RuntimeError: The socket's directory is not private, or another
+                daemon is listening on the socket
+        """
+        _private_directory(os.path.dirname(os.path.abspath(self.socket_path)))
+        if os.path.exists(self.socket_path):
+            if request({"command": "status"}, self.socket_path) is not None:
+                raise RuntimeError(f"A research daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            os.remove(self.socket_path)
+
+        self.warm()
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                peer = _peer_uid(self.request)
+                if peer is not None and peer != _uid():
+                    print(f"⚠️ Refused a connection from uid {peer}")
+                    return
+                line = self.rfile.readline()
+                if not line:
+                    return
+                client = _ClientStream(self.wfile)
+                client.send(daemon.handle(json.loads(line), client))
+
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = _RoutedOutput("stdout", stdout)
+        sys.stderr = _RoutedOutput("stderr", stderr)
+        umask = os.umask(0o177)  # the socket file is created 0600
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        print(f"🔥 Research daemon ready on {self.socket_path} (warm-up {self.warmup_seconds:.1f}s, pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            sys.stdout, sys.stderr = stdout, stderr
+            print("👋 Research daemon stopped")
+
+
+def start_background(socket_path: Optional[str] = None, log_path: str = DAEMON_LOG) -> Dict[str, Any]:
+    """
+    Start a daemon in a detached process and wait until it is ready
+
+    Returns:
+        Its status
+    """
+    socket_path = socket_path or DAEMON_SOCKET
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--socket", socket_path, "start"],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True
+        )
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        status = request({"command": "status"}, socket_path)
+        if status is not None:
+            return status
+        if process.poll() is not None:
+            raise RuntimeError(f"Research daemon exited during start-up (see {log_path})")
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Research daemon not ready after {START_TIMEOUT:.0f}s (see {log_path})")
+
+
+def main():
+    """
+    Daemon CLI entry point
+    """
+    parser = argparse.ArgumentParser(description="Keep the research workflow warm for main.py")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help=f"Unix socket (default: {DAEMON_SOCKET})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    start = sub.add_parser("start", help="Start the daemon")
+    start.add_argument("--background", action="store_true", help="Detach and log to --log")
+    start.add_argument("--log", default=DAEMON_LOG, help=f"Log file with --background (default: {DAEMON_LOG})")
+
+    sub.add_parser("status", help="Show whether a daemon is running")
+    sub.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "start" and not args.background:
+        try:
+            ResearchDaemon(args.socket).serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "start":
+        status = start_background(args.socket, args.log)
+        print(f"🔥 Research daemon running (pid {status['pid']}, warm-up {status['warmup_seconds']:.1f}s)")
+    elif args.command == "status":
+        status = request({"command": "status"}, args.socket)
+        if status is None:
+            print("😴 No research daemon running")
+            sys.exit(1)
+        print(f"🔥 pid {status['pid']}, up {status['uptime']:.0f}s, {status['runs']} runs "
+              f"({status['active']} active), {status['workflows']} workflows, serving {status['cwd']}")
+    else:
+        print("👋 Stopped" if request({"command": "stop"}, args.socket) is not None
+              else "😴 No research daemon running")
+
+
+if __name__ == "__main__":
+    main()
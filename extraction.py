@@ -0,0 +1,268 @@
+"""
+Source content extraction for the Research Agent
+Cleans and condenses search results before they reach the LLM: strips
+boilerplate, drops near-duplicate sources (SimHash), splits content into
+sentences and keeps the passages that score best against the query (BM25)
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence
+
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this
+to was were will with what which who how why when where do does did about into
+than then there these those their they we you your our can could should would
+""".split())
+
+# Lines that are almost always site furniture rather than content
+BOILERPLATE_PATTERNS = re.compile(
+    r"(cookie|subscribe|sign up|sign in|log in|newsletter|all rights reserved|"
+    r"privacy policy|terms of (use|service)|advertisement|share this|follow us|"
+    r"read more|click here|skip to (main )?content|copyright|©)",
+    re.IGNORECASE
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens with common stopwords removed
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def strip_boilerplate(text: str) -> str:
+    """
+    Remove navigation, cookie banners and similar furniture from page text
+
+    Args:
+        text: Raw page content
+
+    Returns:
+        Cleaned content with whitespace normalized
+    """
+    kept = []
+    seen = set()
+    for line in re.split(r"[\r\n]+", text):
+        line = re.sub(r"\s+", " ", line).strip()
+        if not line:
+            continue
+        # Short lines matching boilerplate are menus/banners; long ones may be prose
+        if BOILERPLATE_PATTERNS.search(line) and len(line) < 200:
+            continue
+        # Repeated lines (headers, bylines) only need to appear once
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """
+    Compute a SimHash fingerprint over word 3-shingles
+
+    Near-identical texts (e.g. syndicated copies of one article) produce
+    fingerprints that differ in only a few bits.
+    """
+    tokens = tokenize(text)
+    shingles = [" ".join(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2))]
+    weights = [0] * bits
+    for shingle, count in Counter(shingles).items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=bits // 8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Number of differing bits between two fingerprints
+    """
+    return bin(a ^ b).count("1")
+
+
+def dedupe_sources(results: Sequence[Dict[str, Any]], max_distance: int = 3) -> List[Dict[str, Any]]:
+    """
+    Drop search results whose content nearly duplicates an earlier result
+
+    Args:
+        results: Search results with a 'content' field
+        max_distance: SimHash bit distance at or below which two are duplicates
+
+    Returns:
+        Results in original order with near-duplicates removed
+    """
+    kept = []
+    fingerprints = []
+    for result in results:
+        content = result.get("content", "")
+        fingerprint = simhash(content)
+        if any(hamming_distance(fingerprint, f) <= max_distance for f in fingerprints):
+            continue
+        fingerprints.append(fingerprint)
+        kept.append(result)
+    return kept
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences on terminal punctuation and line breaks
+    """
+    sentences = []
+    for block in text.split("\n"):
+        sentences.extend(s.strip() for s in _SENTENCE_RE.split(block) if s.strip())
+    return sentences
+
+
+def bm25_idf(documents: int, doc_freq: int) -> float:
+    """
+    BM25 inverse document frequency of a term found in doc_freq of documents
+    """
+    return math.log(1 + (documents - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def bm25_length_norm(length: int, avg_length: float, k1: float = 1.5, b: float = 0.75) -> float:
+    """
+    BM25 document-length normalization term, shared by all terms of a document
+    """
+    return k1 * (1 - b + b * length / (avg_length or 1))
+
+
+def bm25_term_weight(freq: int, norm: float, k1: float = 1.5) -> float:
+    """
+    BM25 term-frequency component for one term in one document
+    """
+    return freq * (k1 + 1) / (freq + norm)
+
+
+class BM25:
+    """
+    Okapi BM25 scorer over a small in-memory corpus
+    """
+
+    def __init__(self, documents: Iterable[Sequence[str]], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            documents: Tokenized documents
+            k1: Term-frequency saturation
+            b: Length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(self.term_freqs)
+        self.idf = {t: bm25_idf(n, df) for t, df in doc_freqs.items()}
+
+    def score(self, query_tokens: Sequence[str], index: int) -> float:
+        """
+        BM25 score of one document for a tokenized query
+        """
+        tf = self.term_freqs[index]
+        norm = bm25_length_norm(self.lengths[index], self.avg_length, self.k1, self.b)
+        total = 0.0
+        for term in query_tokens:
+            freq = tf.get(term)
+            if freq:
+                total += self.idf[term] * bm25_term_weight(freq, norm, self.k1)
+        return total
+
+    def scores(self, query_tokens: Sequence[str]) -> List[float]:
+        """
+        BM25 scores of every document for a tokenized query
+        """
+        return [self.score(query_tokens, i) for i in range(len(self.term_freqs))]
+
+
+def select_passages(
+    query: str,
+    results: Sequence[Dict[str, Any]],
+    max_chars: int = 1500
+) -> List[Dict[str, Any]]:
+    """
+    Pick the sentences most relevant to the query across all sources
+
+    Sources are cleaned and de-duplicated, every sentence is ranked with
+    BM25 against the query, and the best sentences are kept until the
+    character budget is spent. Kept sentences are returned grouped by
+    source in their original reading order.
+
+    Args:
+        query: The research question
+        results: Search results with 'content' (and optionally 'url')
+        max_chars: Total character budget for the selected passages
+
+    Returns:
+        One entry per contributing source: {'source', 'url', 'text'}
+    """
+    sources = dedupe_sources(results)
+
+    candidates = []  # (source index, sentence index, sentence)
+    seen = set()
+    for s_idx, result in enumerate(sources):
+        for sent_idx, sentence in enumerate(split_sentences(strip_boilerplate(result.get("content", "")))):
+            key = " ".join(tokenize(sentence))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            candidates.append((s_idx, sent_idx, sentence))
+
+    if not candidates:
+        return []
+
+    bm25 = BM25(tokenize(sentence) for _, _, sentence in candidates)
+    scores = bm25.scores(tokenize(query))
+    ranked = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))
+
+    chosen = []
+    budget = max_chars
+    for i in ranked:
+        sentence = candidates[i][2]
+        if len(sentence) > budget:
+            if chosen:
+                continue
+            sentence = sentence[:budget]
+        chosen.append((candidates[i][0], candidates[i][1], sentence))
+        budget -= len(sentence) + 1
+        if budget <= 0:
+            break
+
+    passages = []
+    for s_idx in sorted({c[0] for c in chosen}):
+        sentences = [c[2] for c in sorted(c for c in chosen if c[0] == s_idx)]
+        passages.append({
+            "source": s_idx + 1,
+            "url": sources[s_idx].get("url", ""),
+            "text": " ".join(sentences),
+        })
+    return passages
+
+
+def build_research_context(query: str, results: Sequence[Dict[str, Any]], max_chars: int = 1500) -> str:
+    """
+    Format the selected passages as the Research Agent's prompt context
+
+    Args:
+        query: The research question
+        results: Raw search results
+        max_chars: Total character budget for source text
+
+    Returns:
+        Prompt-ready text with one block per source
+    """
+    return "\n\n".join(
+        f"Source {p['source']}: {p['text']}"
+        for p in select_passages(query, results, max_chars)
+    )
@@ -0,0 +1,373 @@
+"""
+Multi-Agent Research Assistant - Research History Search
+SQLite FTS5 index over saved results (queries, summaries, findings and
+critiques), updated as save_research_result writes and ranked with BM25
+
+Usage:
+    python history.py search "quantum error correction"
+    python history.py search "battery chemistry" --field summary --limit 20
+    python history.py reindex
+    python history.py stats
+"""
+
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from extraction import STOPWORDS
+from utils import load_research_result
+
+
+HISTORY_FILE = "history.db"
+# Override the index location (defaults to results/history.db next to the results)
+HISTORY_DB = os.getenv("HISTORY_DB")
+
+# Indexed text fields and their BM25 weights: a match in the question counts most
+FIELDS = ("query", "summary", "findings", "critiques")
+FIELD_WEIGHTS = (10.0, 4.0, 1.0, 0.5)
+
+SNIPPET_TOKENS = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    timestamp TEXT,
+    query TEXT,
+    iterations INTEGER,
+    mtime REAL,
+    size INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+    query, summary, findings, critiques, tokenize = 'porter unicode61'
+);
+"""
+
+
+def match_expression(text: str, any_terms: bool = False, fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Turn free-text keywords into a safe FTS5 MATCH expression
+
+    Args:
+        text: Keywords as a user typed them
+        any_terms: Match runs with any keyword instead of all of them
+        fields: Restrict matching to these FIELDS
+
+    Returns:
+        MATCH expression, or "" when the text has no searchable terms
+    """
+    # Quoting every word keeps FTS5 operators and punctuation in user text inert
+    words = (w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS)
+    terms = [f'"{word}"' for word in dict.fromkeys(words)]
+    if not terms:
+        return ""
+    expression = (" OR " if any_terms else " ").join(terms)
+    if fields:
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown history fields: {', '.join(sorted(unknown))}")
+        expression = "{" + " ".join(fields) + "} : (" + expression + ")"
+    return expression
+
+
+def _document(data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    return (
+        data.get("query", ""),
+        data.get("final_summary", ""),
+        "\n\n".join(data.get("research_results", [])),
+        "\n\n".join(data.get("critique_feedback", [])),
+    )
+
+
+class HistoryIndex:
+    """
+    Full-text index of saved research runs, one row per result file
+
+    Safe to share between threads; several processes may write to the same
+    database (SQLite serializes the writes).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        weights = ", ".join(str(w) for w in FIELD_WEIGHTS)
+        with self._conn:
+            self._conn.execute("INSERT INTO runs_fts (runs_fts, rank) VALUES ('rank', ?)", (f"bm25({weights})",))
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def _delete(self, path: str) -> bool:
+        row = self._conn.execute("SELECT id FROM runs WHERE path = ?", (path,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM runs_fts WHERE rowid = ?", row)
+            self._conn.execute("DELETE FROM runs WHERE id = ?", row)
+        return row is not None
+
+    def _put(self, path: str, data: Dict[str, Any], stat: Optional[os.stat_result]):
+        self._delete(path)
+        cursor = self._conn.execute(
+            "INSERT INTO runs (path, timestamp, query, iterations, mtime, size) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, data.get("timestamp", ""), data.get("query", ""),
+             data.get("iterations", data.get("iteration", 0)),
+             stat.st_mtime if stat else None, stat.st_size if stat else None)
+        )
+        self._conn.execute(
+            "INSERT INTO runs_fts (rowid, query, summary, findings, critiques) VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid,) + _document(data)
+        )
+
+    def add(self, path: str, data: Dict[str, Any]):
+        """
+        Index (or re-index) one saved result
+
+        Args:
+            path: File the result was saved to
+            data: The saved result dictionary
+        """
+        stat = os.stat(path) if os.path.exists(path) else None
+        with self._lock, self._conn:
+            self._put(path, data, stat)
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Index many (path, result) pairs in a single transaction
+
+        Returns:
+            Number of results indexed
+        """
+        count = 0
+        with self._lock, self._conn:
+            for path, data in items:
+                self._put(path, data, os.stat(path) if os.path.exists(path) else None)
+                count += 1
+        return count
+
+    def remove(self, path: str) -> bool:
+        """
+        Drop a result from the index; returns whether it was indexed
+        """
+        with self._lock, self._conn:
+            return self._delete(path)
+
+    def refresh(self, directory: str = "results", full: bool = False) -> Dict[str, int]:
+        """
+        Bring the index up to date with a results directory
+
+        Only files whose size or mtime changed are read again, and entries
+        for deleted files are dropped, all in one transaction.
+
+        Args:
+            directory: Result store to scan
+            full: Re-read every file
+
+        Returns:
+            Number of files added, updated and removed
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock, self._conn:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self._conn.execute("SELECT path, mtime, size FROM runs")
+            }
+            seen = set()
+            for path in sorted(glob.glob(os.path.join(directory, "research_result_*"))):
+                seen.add(path)
+                stat = os.stat(path)
+                if not full and known.get(path) == (stat.st_mtime, stat.st_size):
+                    continue
+                self._put(path, load_research_result(path), stat)
+                counts["updated" if path in known else "added"] += 1
+
+            # Entries from other directories (or a custom HISTORY_DB) are left alone
+            prefix = os.path.join(directory, "")
+            for path in set(known) - seen:
+                if path.startswith(prefix) and not os.path.exists(path):
+                    self._delete(path)
+                    counts["removed"] += 1
+        return counts
+
+    def search(
+        self,
+        text: str,
+        limit: int = 10,
+        fields: Optional[Sequence[str]] = None,
+        any_terms: bool = False,
+        raw: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank indexed runs against keywords
+
+        Args:
+            text: Keywords (or an FTS5 expression when raw=True)
+            limit: Maximum results
+            fields: Restrict matching to some of FIELDS
+            any_terms: Match any keyword instead of all
+            raw: Pass `text` to FTS5 unchanged (phrases, NEAR, prefix*)
+
+        Returns:
+            {'path', 'timestamp', 'query', 'iterations', 'score', 'snippet'} dicts, best first
+        """
+        expression = text if raw else match_expression(text, any_terms, fields)
+        if not expression:
+            return []
+        with self._lock:
+            # Rank first, then build snippets and join metadata for the top rows only
+            ranked = self._conn.execute(
+                "SELECT rowid, rank FROM runs_fts WHERE runs_fts MATCH ? ORDER BY rank LIMIT ?",
+                (expression, limit)
+            ).fetchall()
+            if not ranked:
+                return []
+            ids = ", ".join(str(rowid) for rowid, _ in ranked)
+            details = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    f"SELECT r.id, r.path, r.timestamp, r.query, r.iterations, "
+                    f"snippet(runs_fts, -1, '[', ']', '...', {SNIPPET_TOKENS}) "
+                    f"FROM runs_fts JOIN runs r ON r.id = runs_fts.rowid "
+                    f"WHERE runs_fts MATCH ? AND runs_fts.rowid IN ({ids})",
+                    (expression,)
+                )
+            }
+        return [
+            dict(zip(("path", "timestamp", "query", "iterations", "snippet"), details[rowid]), score=-rank)
+            for rowid, rank in ranked
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Indexed run count and database size
+        """
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return {"runs": len(self), "bytes": size, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Open indexes keyed by database path, shared by every save in this process
+_indexes: Dict[str, HistoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_path(directory: str) -> str:
+    return os.path.abspath(HISTORY_DB or os.path.join(directory, HISTORY_FILE))
+
+
+def get_history_index(directory: str = "results") -> HistoryIndex:
+    """
+    The history index for a results directory (HISTORY_DB overrides its location)
+    """
+    path = _index_path(directory)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = HistoryIndex(path)
+        return index
+
+
+def existing_history_index(directory: str = "results") -> Optional[HistoryIndex]:
+    """
+    The history index for a results directory, or None if none was ever created
+    """
+    return get_history_index(directory) if os.path.exists(_index_path(directory)) else None
+
+
+def index_result(path: str, data: Dict[str, Any]):
+    """
+    Add a just-saved result to its directory's history index
+
+    Indexing problems are reported but never fail the save.
+    """
+    try:
+        get_history_index(os.path.dirname(path) or ".").add(path, data)
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not index {path} in research history: {e}")
+
+
+def search_history(text: str, limit: int = 10, directory: str = "results", **options) -> List[Dict[str, Any]]:
+    """
+    Search past research runs by keyword
+
+    Args:
+        text: Keywords
+        limit: Maximum results
+        directory: Result store whose index is searched
+        **options: fields / any_terms / raw, as for HistoryIndex.search
+
+    Returns:
+        Ranked matches with snippets
+    """
+    return get_history_index(directory).search(text, limit, **options)
+
+
+def print_matches(matches: Iterable[Dict[str, Any]], elapsed: float):
+    """
+    Print ranked matches with their snippets
+    """
+    matches = list(matches)
+    for match in matches:
+        print(f"\n{match['score']:6.2f}  {match['timestamp'][:16]}  {match['query']}")
+        print(f"        {' '.join(match['snippet'].split())}")
+        print(f"        {match['path']}")
+    print(f"\n🔎 {len(matches)} matches in {elapsed * 1000:.1f} ms")
+
+
+def main():
+    """
+    History CLI entry point
+    """
+    parser = argparse.ArgumentParser(description="Search past research runs")
+    parser.add_argument("--directory", default="results", help="Result store (default: results)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    search = sub.add_parser("search", help="Ranked keyword search with snippets")
+    search.add_argument("text", nargs="+", help="Keywords")
+    search.add_argument("--limit", type=int, default=10)
+    search.add_argument("--field", action="append", choices=FIELDS, help="Only match this field (repeatable)")
+    search.add_argument("--any", action="store_true", help="Match any keyword instead of all")
+    search.add_argument("--raw", action="store_true", help="Treat the text as an FTS5 query")
+
+    reindex = sub.add_parser("reindex", help="Index new, changed and deleted result files")
+    reindex.add_argument("--full", action="store_true", help="Re-read every result file")
+
+    sub.add_parser("stats", help="Show index size")
+    args = parser.parse_args()
+
+    index = get_history_index(args.directory)
+
+    if args.command == "search":
+        start = time.perf_counter()
+        matches = index.search(" ".join(args.text), args.limit, args.field, args.any, args.raw)
+        print_matches(matches, time.perf_counter() - start)
+    elif args.command == "reindex":
+        start = time.perf_counter()
+        counts = index.refresh(args.directory, full=args.full)
+        print(f"✅ Indexed {counts['added']} new, {counts['updated']} changed, "
+              f"removed {counts['removed']} in {time.perf_counter() - start:.2f}s ({len(index)} runs)")
+    else:
+        stats = index.stats()
+        print(f"📚 {stats['runs']} runs indexed, {stats['bytes'] / 1e6:.1f} MB ({stats['path']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+API-key pooling for the Multi-Agent Research Assistant
+Spreads LLM and search calls over several keys and endpoints, balancing by
+the quota each has left (from rate-limit response headers) and failing over
+when a key is rate limited, revoked or its endpoint is down
+"""
+
+import os
+import re
+import threading
+import time
+import urllib.error
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from prompts import estimate_tokens
+
+# Groq's OpenAI-compatible endpoint, used for every key in GROQ_API_KEYS
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Cooldowns: transient failures back off exponentially up to MAX_COOLDOWN;
+# a rejected key (401/403) is retried only after REVOKED_COOLDOWN
+BASE_COOLDOWN = 1.0
+MAX_COOLDOWN = 60.0
+RATE_LIMIT_COOLDOWN = 10.0      # when a 429 carries no retry-after/reset header
+REVOKED_COOLDOWN = 15 * 60.0
+
+# When every member is cooling down, wait up to this long for the first to recover
+MAX_WAIT = 30.0
+
+RATE_LIMIT_HEADERS = ("x-ratelimit-", "retry-after")
+
+_DURATION_RE = re.compile(r"([\d.]+)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class PoolExhaustedError(RuntimeError):
+    """
+    Raised when no member of a KeyPool can take a call
+    """
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Seconds in a rate-limit reset value such as "7.66s", "2m59.56s" or "120ms"
+    """
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def mask_key(key: Optional[str]) -> str:
+    """
+    Printable form of an API key: its first and last four characters
+    """
+    if not key:
+        return "no key"
+    return key if len(key) <= 8 else f"{key[:4]}...{key[-4:]}"
+
+
+def _status(error: BaseException) -> Optional[int]:
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def _error_headers(error: BaseException) -> Dict[str, str]:
+    for source in (error, getattr(error, "response", None)):
+        headers = getattr(source, "headers", None)
+        if headers is not None and hasattr(headers, "items"):
+            return {k.lower(): v for k, v in headers.items()}
+    return {}
+
+
+class PoolMember:
+    """
+    One key/endpoint in a KeyPool, with its quota, health and usage
+    """
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.limits: Dict[str, float] = {}
+        self.remaining: Dict[str, float] = {}
+        self.resets: Dict[str, float] = {}
+        self.cooldown_until = 0.0
+        self.failures = 0
+        self.revoked = False
+        self.in_flight = 0
+        self.reserved = 0
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.tokens = 0
+        self.latency = 0.0
+
+    def update(self, headers: Dict[str, str], now: float):
+        """
+        Take the quota left from x-ratelimit-* headers (OpenAI/Groq style)
+        """
+        for kind in ("requests", "tokens"):
+            for field, target in (("limit", self.limits), ("remaining", self.remaining)):
+                value = headers.get(f"x-ratelimit-{field}-{kind}")
+                if value is not None:
+                    try:
+                        target[kind] = float(value)
+                    except ValueError:
+                        pass
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+            if reset is not None:
+                self.resets[kind] = now + reset
+
+    def headroom(self, now: float) -> float:
+        """
+        Tokens (or requests) this member can still take before its quota resets
+
+        Quota that has reset counts as full again; members that have not
+        reported any quota yet rank first so they get tried.
+        """
+        left = []
+        for kind in ("tokens", "requests"):
+            if kind not in self.remaining:
+                continue
+            remaining = self.remaining[kind]
+            if now >= self.resets.get(kind, 0.0):
+                remaining = self.limits.get(kind, remaining)
+            if kind == "tokens":
+                remaining -= self.reserved
+            else:
+                remaining -= self.in_flight
+            left.append(remaining)
+        return min(left) if left else float("inf")
+
+    def available(self, now: float) -> bool:
+        if now < self.cooldown_until:
+            return False
+        # Out of requests until the window resets
+        if self.remaining.get("requests", 1) <= 0 and now < self.resets.get("requests", 0.0):
+            return False
+        return True
+
+    def state(self, now: float) -> str:
+        if self.revoked and now < self.cooldown_until:
+            return "revoked"
+        if not self.available(now):
+            return "cooling"
+        return "healthy"
+
+
+class KeyPool:
+    """
+    Load-balancing, failover wrapper over several equivalent clients
+
+    Each call goes to the available member with the most quota left
+    (remaining tokens/requests from its last response headers, minus what
+    is already in flight), then the fewest in-flight calls. On failure:
+
+    - 429: the member cools down until its retry-after/reset, call moves on
+    - 401/403: the key is treated as revoked and left out for REVOKED_COOLDOWN
+    - 5xx, timeouts, connection errors: exponential cooldown, call moves on
+    - anything else (e.g. 400) is the request's fault and is raised at once
+
+    Works for chat models (invoke(messages, **kwargs), reading headers that
+    LocalChatModel puts in response_metadata["rate_limits"]) and for search
+    tools, which have no headers and are balanced by in-flight calls.
+    """
+
+    def __init__(self, clients: Sequence[Any], names: Optional[Sequence[str]] = None, max_wait: float = MAX_WAIT):
+        """
+        Args:
+            clients: Equivalent clients, one per key/endpoint
+            names: Display names (e.g. masked keys) for stats
+            max_wait: Longest to wait for a member when all are cooling down
+        """
+        if not clients:
+            raise ValueError("A KeyPool needs at least one client")
+        names = names or [f"member-{i}" for i in range(len(clients))]
+        self.members = [PoolMember(client, name) for client, name in zip(clients, names)]
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._turn = 0
+
+    def _acquire(self, tried: set, cost: int) -> Optional[PoolMember]:
+        with self._lock:
+            now = time.time()
+            candidates = [m for m in self.members if id(m) not in tried and m.available(now)]
+            if not candidates:
+                return None
+            # Rotate the starting point so ties spread evenly
+            self._turn = (self._turn + 1) % len(self.members)
+            order = {id(m): (i - self._turn) % len(self.members) for i, m in enumerate(self.members)}
+            member = max(candidates, key=lambda m: (m.headroom(now), -m.in_flight, -order[id(m)]))
+            member.in_flight += 1
+            member.reserved += cost
+            return member
+
+    def _next_recovery(self, tried: set) -> Optional[float]:
+        with self._lock:
+            now = time.time()
+            waits = [
+                max(m.cooldown_until, m.resets.get("requests", 0.0)) - now
+                for m in self.members if id(m) not in tried
+            ]
+        return min(waits, default=None)
+
+    def _settle(self, member: PoolMember, cost: int, latency: float, response=None, error=None) -> bool:
+        """
+        Record a finished call; returns whether the error should fail over
+        """
+        with self._lock:
+            now = time.time()
+            member.in_flight -= 1
+            member.reserved -= cost
+            member.calls += 1
+            member.latency += latency
+            if error is None:
+                metadata = getattr(response, "response_metadata", None) or {}
+                member.update({k.lower(): v for k, v in (metadata.get("rate_limits") or {}).items()}, now)
+                used = (metadata.get("token_usage") or {}).get("total_tokens")
+                member.tokens += used if isinstance(used, int) else 0
+                member.failures = 0
+                member.revoked = False
+                return False
+
+            member.errors += 1
+            status = _status(error)
+            headers = _error_headers(error)
+            member.update(headers, now)
+            if status == 429:
+                member.rate_limited += 1
+                retry = parse_duration(headers.get("retry-after", ""))
+                if retry is None:
+                    retry = max(
+                        [reset - now for reset in member.resets.values() if reset > now] or [RATE_LIMIT_COOLDOWN]
+                    )
+                member.cooldown_until = now + retry
+                return True
+            if status in (401, 403):
+                member.revoked = True
+                member.cooldown_until = now + REVOKED_COOLDOWN
+                return True
+            transient = (status is not None and status >= 500) or (
+                status is None and isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError, OSError))
+            )
+            if transient:
+                member.failures += 1
+                member.cooldown_until = now + min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (member.failures - 1))
+                return True
+            return False
+
+    def _call(self, method: str, cost: int, *args, **kwargs):
+        tried: set = set()
+        last_error: Optional[BaseException] = None
+        deadline = time.time() + self.max_wait
+        while True:
+            member = self._acquire(tried, cost)
+            if member is None:
+                if len(tried) == len(self.members):
+                    # Every member failed this call once already
+                    break
+                wait = self._next_recovery(tried)
+                if wait is None or time.time() + wait > deadline:
+                    break
+                time.sleep(max(wait, 0.01))
+                continue
+
+            start = time.perf_counter()
+            try:
+                response = getattr(member.client, method)(*args, **kwargs)
+            except Exception as e:
+                if not self._settle(member, cost, time.perf_counter() - start, error=e):
+                    raise
+                tried.add(id(member))
+                last_error = e
+                continue
+            self._settle(member, cost, time.perf_counter() - start, response=response)
+            return response
+
+        message = f"No key in the pool could take the call ({len(self.members)} members)"
+        if last_error is not None:
+            raise PoolExhaustedError(f"{message}; last error: {last_error}") from last_error
+        raise PoolExhaustedError(message)
+
+    def invoke(self, *args, **kwargs):
+        """
+        Call invoke on the best available member, failing over on errors
+        """
+        # Reserve the prompt plus the output cap against the member's token quota
+        max_tokens = kwargs.get("max_tokens") or getattr(self.members[0].client, "max_tokens", None)
+        cost = estimate_tokens(args[0] if args else "") + (max_tokens if isinstance(max_tokens, int) else 0)
+        return self._call("invoke", cost, *args, **kwargs)
+
+    def model_copy(self, update: Dict[str, Any] = None, **kwargs) -> "KeyPool":
+        """
+        Copy every member (e.g. to change max_results of Tavily tools); stats start fresh
+        """
+        return KeyPool(
+            [m.client.model_copy(update=update, **kwargs) for m in self.members],
+            [m.name for m in self.members],
+            self.max_wait
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Per-member health, quota left and usage
+        """
+        with self._lock:
+            now = time.time()
+            return [
+                {
+                    "name": m.name,
+                    "state": m.state(now),
+                    "calls": m.calls,
+                    "errors": m.errors,
+                    "rate_limited": m.rate_limited,
+                    "tokens": m.tokens,
+                    "in_flight": m.in_flight,
+                    "remaining_requests": m.remaining.get("requests"),
+                    "remaining_tokens": m.remaining.get("tokens"),
+                    "avg_latency": m.latency / m.calls if m.calls else 0.0,
+                }
+                for m in self.members
+            ]
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __getattr__(self, name):
+        if name == "members":
+            raise AttributeError(name)
+        return getattr(self.members[0].client, name)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def build_llm_pool(
+    client_factory: Callable[..., Any],
+    model: str,
+    max_tokens: int = 1024,
+    temperature: float = 0.7
+) -> Optional[KeyPool]:
+    """
+    Chat model pool from GROQ_API_KEYS and LLM_POOL_URLS
+
+    GROQ_API_KEYS is a comma-separated list of Groq keys, all used against
+    Groq's OpenAI-compatible endpoint. LLM_POOL_URLS adds other
+    OpenAI-compatible endpoints as "url" or "url|api_key" entries serving the
+    same model.
+
+    Args:
+        client_factory: Builds one client from (base_url, model, api_key,
+            temperature, max_tokens), e.g. agents.LocalChatModel
+        model: Model name sent to every endpoint
+        max_tokens: Default output cap
+        temperature: Sampling temperature
+
+    Returns:
+        The pool, or None when no pool is configured
+    """
+    clients, names = [], []
+    base_url = os.getenv("GROQ_BASE_URL", GROQ_BASE_URL)
+    for key in _split(os.getenv("GROQ_API_KEYS")):
+        clients.append(client_factory(base_url, model, key, temperature, max_tokens))
+        names.append(f"groq {mask_key(key)}")
+    for entry in _split(os.getenv("LLM_POOL_URLS")):
+        url, _, key = entry.partition("|")
+        clients.append(client_factory(url, model, key or None, temperature, max_tokens))
+        names.append(url if not key else f"{url} {mask_key(key)}")
+    return KeyPool(clients, names) if clients else None
+
+
+def build_search_pool(max_results: int = 3) -> Optional[KeyPool]:
+    """
+    Tavily tool pool from TAVILY_API_KEYS (comma-separated), or None
+    """
+    keys = _split(os.getenv("TAVILY_API_KEYS"))
+    if not keys:
+        return None
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    return KeyPool(
+        [TavilySearchResults(max_results=max_results, tavily_api_key=key) for key in keys],
+        [f"tavily {mask_key(key)}" for key in keys]
+    )
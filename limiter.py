@@ -0,0 +1,264 @@
+"""
+Adaptive concurrency limiting for the Multi-Agent Research Assistant
+AIMD (additive increase, multiplicative decrease) control of how many LLM
+and search calls are in flight, driven by observed latency and 429s
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Starting point and bounds of the limit
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+
+# Multiplicative decreases: sharp on a 429, gentler on a latency spike
+RATE_LIMIT_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.8
+
+# A spike is recent latency above LATENCY_TOLERANCE x the long-run baseline,
+# and at least MIN_SPIKE_SECONDS above it (ignores jitter on very fast calls)
+LATENCY_TOLERANCE = 2.0
+MIN_SPIKE_SECONDS = 0.05
+BASELINE_SMOOTHING = 0.02
+RECENT_SMOOTHING = 0.3
+
+# (time, limit) points kept for plotting how the limit moved
+HISTORY_SAMPLES = 1000
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    Whether an exception from an LLM or search client is an HTTP 429
+    """
+    for source in (error, getattr(error, "response", None)):
+        if getattr(source, "status_code", None) == 429 or getattr(source, "status", None) == 429:
+            return True
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "too many requests" in text
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit, as in TCP congestion control
+
+    Every successful call that ran while the limit was at least half used
+    and whose latency is in line with the baseline raises the limit: by one
+    per call until the first backoff (slow start), then by 1/limit per call,
+    i.e. about one per limit's worth of calls. A 429 halves it and a latency
+    spike cuts it by a fifth. Only one cut happens per "epoch": calls that
+    started before the last cut cannot cut again, so a burst of 429s from
+    the same overloaded window counts once. The limit settles just below
+    the point where the provider starts pushing back.
+
+    Use it as a gate on its own (run / acquire / release), or hand it to a
+    Scheduler, which then sizes its slot pool by the current limit.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = DEFAULT_MIN_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        rate_limit_backoff: float = RATE_LIMIT_BACKOFF,
+        latency_backoff: float = LATENCY_BACKOFF,
+        latency_tolerance: float = LATENCY_TOLERANCE,
+        min_spike: float = MIN_SPIKE_SECONDS
+    ):
+        """
+        Args:
+            initial_limit: Concurrency to start from
+            min_limit: Floor the limit never drops below
+            max_limit: Ceiling the limit never grows beyond
+            rate_limit_backoff: Factor applied to the limit on a 429
+            latency_backoff: Factor applied to the limit on a latency spike
+            latency_tolerance: Recent/baseline latency ratio that counts as a spike
+            min_spike: Seconds recent latency must also exceed the baseline by
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.rate_limit_backoff = rate_limit_backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.min_spike = min_spike
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._slow_start = True
+        self._epoch = 0
+        self._in_flight = 0
+        self._baseline: Dict[str, float] = {}
+        self._recent: Dict[str, float] = {}
+        self._counts = {"calls": 0, "increases": 0, "rate_limited": 0, "latency_spikes": 0, "errors": 0}
+        self._cond = threading.Condition(threading.RLock())
+        self.history = deque([(time.time(), self.limit)], maxlen=HISTORY_SAMPLES)
+
+    @property
+    def limit(self) -> int:
+        """
+        Calls currently allowed in flight
+        """
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def epoch(self) -> int:
+        """
+        Number of cuts so far; pass the value seen at call start to record()
+        """
+        return self._epoch
+
+    def _cut(self, factor: float, epoch: int) -> bool:
+        if epoch < self._epoch:
+            return False
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        self._epoch += 1
+        self._slow_start = False
+        # Latency seen before the cut says nothing about the new limit
+        self._recent = dict(self._baseline)
+        return True
+
+    def record(
+        self,
+        epoch: int,
+        latency: float,
+        error: Optional[BaseException] = None,
+        in_flight: Optional[int] = None,
+        kind: str = "call"
+    ) -> str:
+        """
+        Feed one finished call into the controller
+
+        Args:
+            epoch: Value of `epoch` when the call started
+            latency: Seconds the call took
+            error: Exception the call raised, if any
+            in_flight: Calls in flight when it finished, itself included
+            kind: Latency baselines are kept per kind ("llm", "search")
+
+        Returns:
+            "increase", "decrease" or "hold"
+        """
+        with self._cond:
+            self._counts["calls"] += 1
+            before = self.limit
+            action = "hold"
+            if error is not None:
+                if is_rate_limited(error):
+                    self._counts["rate_limited"] += 1
+                    action = "decrease" if self._cut(self.rate_limit_backoff, epoch) else "hold"
+                else:
+                    # Other failures say nothing about capacity
+                    self._counts["errors"] += 1
+            else:
+                baseline = self._baseline.get(kind, latency)
+                recent = self._recent.get(kind, latency)
+                recent += RECENT_SMOOTHING * (latency - recent)
+                self._recent[kind] = recent
+                self._baseline[kind] = baseline + BASELINE_SMOOTHING * (latency - baseline)
+
+                spike = recent > baseline * self.latency_tolerance and recent - baseline > self.min_spike
+                in_flight = self._in_flight if in_flight is None else in_flight
+                if spike:
+                    self._counts["latency_spikes"] += 1
+                    action = "decrease" if self._cut(self.latency_backoff, epoch) else "hold"
+                elif in_flight * 2 >= self.limit and self._limit < self.max_limit:
+                    # Only a limit that is actually being used has earned growth
+                    self._limit = min(float(self.max_limit), self._limit + (1 if self._slow_start else 1 / self._limit))
+                    self._counts["increases"] += 1
+                    action = "increase"
+
+            if self.limit != before:
+                self.history.append((time.time(), self.limit))
+                self._cond.notify_all()
+            return action
+
+    def acquire(self) -> int:
+        """
+        Block until the number of calls in flight is below the limit
+
+        Returns:
+            The epoch to pass to release()
+        """
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+            return self._epoch
+
+    def release(self, epoch: int, latency: float, error: Optional[BaseException] = None, kind: str = "call"):
+        """
+        Record a call started with acquire() and free its slot
+        """
+        with self._cond:
+            self.record(epoch, latency, error, self._in_flight, kind)
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def run(self, fn: Callable[[], Any], kind: str = "call") -> Any:
+        """
+        Call fn within the limit and learn from how it went
+        """
+        epoch = self.acquire()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.release(epoch, time.perf_counter() - start, e, kind)
+            raise
+        self.release(epoch, time.perf_counter() - start, kind=kind)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current limit, calls in flight, latency baselines and event counts
+        """
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "slow_start": self._slow_start,
+                "baseline_latency": dict(self._baseline),
+                **self._counts,
+            }
+
+
+class LimitedLLM:
+    """
+    Wraps a chat model so every invoke runs within an AdaptiveLimiter
+    """
+
+    def __init__(self, llm, limiter: AdaptiveLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    def invoke(self, messages, *args, **kwargs):
+        return self.limiter.run(lambda: self.llm.invoke(messages, *args, **kwargs), "llm")
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+class LimitedSearch:
+    """
+    Wraps a search tool so every invoke runs within an AdaptiveLimiter
+    """
+
+    def __init__(self, tool, limiter: AdaptiveLimiter):
+        self.tool = tool
+        self.limiter = limiter
+
+    def invoke(self, query, *args, **kwargs):
+        return self.limiter.run(lambda: self.tool.invoke(query, *args, **kwargs), "search")
+
+    def model_copy(self, update: Dict[str, Any] = None, **kwargs) -> "LimitedSearch":
+        """
+        Copy the wrapped pydantic tool (e.g. to change max_results), keeping the limiter
+        """
+        return LimitedSearch(self.tool.model_copy(update=update, **kwargs), self.limiter)
+
+    def __getattr__(self, name):
+        if name == "tool":
+            raise AttributeError(name)
+        return getattr(self.tool, name)
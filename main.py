@@ -1,27 +1,97 @@
 """
 Multi-Agent Research Assistant - Command Line Interface
 Run research queries from the command line
+
+When a daemon (daemon.py) is running, queries are sent to it and only this
+module, search.py and daemon.py are imported here; otherwise the workflow is
+built and run in this process.
 """
 
+import argparse
+import contextlib
+import os
 import sys
-from agents import run_research_assistant
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from daemon import run_remote
+from search import SEARCH_PROVIDERS
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
     """
-    Main CLI entry point
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Run a research query through the multi-agent workflow",
+        epilog='Example:\n  python main.py "What are the latest developments in quantum computing?"',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("query", nargs="+", help="Your research question")
+    parser.add_argument("--max-iterations", type=int, default=2,
+                        help="Maximum research-critique cycles (default: 2)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Pick iterations, search depth and output tokens from the query")
+    parser.add_argument("--budget", type=int, default=None, metavar="TPM",
+                        help="Tokens-per-minute budget shared by runs in this process (default: "
+                             "TOKEN_BUDGET); heavy queries are downgraded when it runs low. Implies --adaptive")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="Return the best available answer within this many seconds")
+    parser.add_argument("--map-reduce", action="store_true",
+                        help="Condense each source with a parallel LLM call (10+ sources per iteration)")
+    parser.add_argument("--search", choices=SEARCH_PROVIDERS, default=None,
+                        help="Search backend (default: SEARCH_PROVIDER or tavily)")
+    parser.add_argument("--corpus", default=None, metavar="DIR",
+                        help="Document folder for local/hybrid search (default: corpus/)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time nodes and LLM/search calls and write a speedscope flame graph")
+    parser.add_argument("--profile-sample", action="store_true",
+                        help="With --profile, also sample Python stacks every 5 ms")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Run in this process even if a daemon is running (also RESEARCH_DAEMON=0)")
+    return parser.parse_args(argv)
+
+
+def build_workflow(args: argparse.Namespace):
+    """
+    Compile the workflow around the search backend chosen on the command line
+    """
+    from agents import create_research_workflow, request_scheduler, tavily_search
+    from search import get_search_provider
+    
+    search_tool = get_search_provider(args.search, args.corpus, tavily_client=tavily_search)
+    return create_research_workflow(search_tool=search_tool, scheduler=request_scheduler,
+                                    map_reduce=args.map_reduce)
+
+
+def run(args: argparse.Namespace, workflow=None) -> Dict[str, Any]:
+    """
+    Run one query and print its summary and statistics
+    
+    Args:
+        args: Parsed command line arguments
+        workflow: Compiled workflow to reuse (the daemon keeps one per search backend)
+    
+    Returns:
+        The final research state
     """
-    if len(sys.argv) < 2:
-        print("Usage: python main.py \"Your research question here\"")
-        print("\nExample:")
-        print('  python main.py "What are the latest developments in quantum computing?"')
-        sys.exit(1)
+    from agents import run_research_assistant
+    from budget import shared_budget
+    from profiling import format_summary, profile_run
     
     # Get query from command line arguments
-    query = " ".join(sys.argv[1:])
+    query = " ".join(args.query)
+    workflow = workflow or build_workflow(args)
+    # Only adaptive planning can act on a budget, so a budget turns it on
+    budget = shared_budget(args.budget)
+    
+    profiling = profile_run(query, sample=args.profile_sample) if args.profile else contextlib.nullcontext()
     
     # Run the research assistant
-    result = run_research_assistant(query, max_iterations=2)
+    with profiling as profiler:
+        result = run_research_assistant(query, max_iterations=args.max_iterations, workflow=workflow,
+                                        adaptive=args.adaptive or budget is not None, budget=budget,
+                                        deadline=args.deadline)
     
     # Display results
     print("\n" + "="*80)
@@ -30,10 +100,48 @@ def main():
     print(result["final_summary"])
     print("\n" + "="*80)
     print(f"📈 Statistics:")
+    if result.get("query_class"):
+        print(f"  - Query class: {result['query_class']}")
+    if budget is not None:
+        print(f"  - Token budget: {budget.used():,} of {budget.tokens_per_minute:,} used this minute")
     print(f"  - Research iterations: {result['iteration']}")
     print(f"  - Research findings: {len(result['research_results'])}")
     print(f"  - Critique rounds: {len(result['critique_feedback'])}")
+    if result.get("speculation"):
+        print(f"  - Speculative summary: {result['speculation']}")
+    if result.get("degraded"):
+        print(f"  - Degraded steps: {', '.join(result['degraded'])}")
+    prompt_stats = result.get("prompt_stats")
+    if prompt_stats:
+        print(f"  - Prompt tokens: {prompt_stats['prompt_tokens']} "
+              f"({prompt_stats['duplicated_tokens']} duplicated, "
+              f"{prompt_stats['cached_prefix_tokens']} cacheable prefix)")
     print("="*80 + "\n")
+    
+    if profiler is not None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = profiler.save(f"results/profile_{timestamp}.speedscope.json")
+        print("⏱️ Profile")
+        print(format_summary(profiler.summary()))
+        print(f"\n🔥 Flame graph: {path} (open at https://www.speedscope.app)\n")
+    
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Main CLI entry point
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    
+    # A warm daemon skips the imports, client setup and graph compilation
+    if not args.no_daemon and os.getenv("RESEARCH_DAEMON", "1") != "0":
+        code = run_remote(argv)
+        if code is not None:
+            sys.exit(code)
+    
+    run(args)
 
 
 if __name__ == "__main__":
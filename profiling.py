@@ -0,0 +1,280 @@
+"""
+Run profiling for the Multi-Agent Research Assistant
+Records timing spans around graph nodes, LLM/search calls and other hot
+paths, optionally samples Python stacks, and writes speedscope files
+(open at https://www.speedscope.app) for flame-graph views of a run
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Span categories that count as waiting on the outside world
+IO_CATEGORIES = frozenset({"llm", "search"})
+
+# Default stack sampling interval (seconds) and per-run sample cap
+SAMPLE_INTERVAL = 0.005
+MAX_SAMPLES = 200000
+
+
+def _union_ms(intervals: List[Tuple[float, float]]) -> float:
+    """
+    Total length of a set of (start, end) intervals, overlaps counted once
+    """
+    total, reach = 0.0, float("-inf")
+    for start, end in sorted(intervals):
+        if end > reach:
+            total += end - max(start, reach)
+            reach = end
+    return total
+
+
+class Profiler:
+    """
+    Collects spans (and optionally stack samples) for one run
+
+    Spans are recorded as open/close events per thread, which maps directly
+    onto speedscope's evented profiles; LangGraph runs nodes on worker
+    threads, so each thread becomes its own lane.
+    """
+
+    def __init__(self, name: str = "run", sample_interval: Optional[float] = None):
+        """
+        Args:
+            name: Profile name shown in speedscope
+            sample_interval: Seconds between stack samples; None disables sampling
+        """
+        self.name = name
+        self.sample_interval = sample_interval
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._frame_list: List[Dict[str, Any]] = []
+        self._events: Dict[int, List[Tuple[str, int, float]]] = {}
+        self._open: Dict[int, List[int]] = {}
+        self._spans: List[Tuple[str, str, float, float]] = []
+        self._samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self._sample_count = 0
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.started = self.ended = None
+
+    def _frame(self, name: str, file: str = "", line: int = 0) -> int:
+        key = (name, file, line)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frame_list)
+            frame = {"name": name}
+            if file:
+                frame.update(file=file, line=line)
+            self._frame_list.append(frame)
+        return index
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def start(self):
+        """
+        Start the clock (and the sampler thread, if enabled)
+        """
+        self.started = time.perf_counter()
+        if self.sample_interval:
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """
+        Stop the clock and the sampler
+        """
+        self.ended = self._now()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    @contextmanager
+    def span(self, name: str, category: str = "python") -> Iterator[None]:
+        """
+        Time a block of code as a named span
+        """
+        thread = threading.get_ident()
+        with self._lock:
+            frame = self._frame(f"{category}:{name}")
+            opened = self._now()
+            self._events.setdefault(thread, []).append(("O", frame, opened))
+            self._open.setdefault(thread, []).append(frame)
+        try:
+            yield
+        finally:
+            with self._lock:
+                closed = self._now()
+                self._events[thread].append(("C", frame, closed))
+                self._open[thread].pop()
+                self._spans.append((name, category, opened, closed))
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            at = self._now()
+            for thread, frame in sys._current_frames().items():
+                if thread == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                    frame = frame.f_back
+                with self._lock:
+                    if self._sample_count >= MAX_SAMPLES:
+                        return
+                    self._sample_count += 1
+                    indices = [self._frame(*entry) for entry in reversed(stack)]
+                    self._samples.setdefault(thread, []).append((indices, at))
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Wall time split into I/O waits and everything else
+
+        Time per category and per span name is the union of its spans'
+        intervals across all threads: nested spans and spans running
+        concurrently (map/critique workers) are counted once, so io_ms
+        never exceeds wall_ms.
+        """
+        wall = self.ended if self.ended is not None else self._now()
+        by_category: Dict[str, List[Tuple[float, float]]] = {}
+        by_name: Dict[str, List[Tuple[float, float]]] = {}
+        with self._lock:
+            spans = list(self._spans)
+        for name, category, opened, closed in spans:
+            by_category.setdefault(category, []).append((opened, closed))
+            by_name.setdefault(f"{category}:{name}", []).append((opened, closed))
+        io = [interval for category, intervals in by_category.items() if category in IO_CATEGORIES
+              for interval in intervals]
+        names_ms = {key: _union_ms(intervals) for key, intervals in by_name.items()}
+        return {
+            "wall_ms": wall,
+            "io_ms": _union_ms(io),
+            "categories_ms": {category: _union_ms(intervals) for category, intervals in by_category.items()},
+            "spans_ms": dict(sorted(names_ms.items(), key=lambda item: -item[1])),
+            "samples": self._sample_count,
+        }
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """
+        Build a speedscope document: one evented lane per thread for spans,
+        plus one sampled lane per thread when sampling was enabled
+        """
+        end = self.ended if self.ended is not None else self._now()
+        profiles = []
+        with self._lock:
+            for lane, (thread, events) in enumerate(sorted(self._events.items())):
+                events = [{"type": kind, "frame": frame, "at": at} for kind, frame, at in events]
+                # Spans still open (e.g. an abandoned run past its deadline) end with the profile
+                for frame in reversed(self._open.get(thread, [])):
+                    events.append({"type": "C", "frame": frame, "at": end})
+                profiles.append({
+                    "type": "evented",
+                    "name": f"{self.name} spans (thread {lane})",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": end,
+                    "events": events,
+                })
+            for lane, (thread, samples) in enumerate(sorted(self._samples.items())):
+                weight = (self.sample_interval or 0) * 1000.0
+                profiles.append({
+                    "type": "sampled",
+                    "name": f"{self.name} samples (thread {lane})",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": end,
+                    "samples": [stack for stack, _ in samples],
+                    "weights": [weight] * len(samples),
+                })
+            frames = list(self._frame_list)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "exporter": "research-assistant-profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def save(self, filepath: str) -> str:
+        """
+        Write the run as a .speedscope.json file
+        """
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(self.to_speedscope(), f)
+        return filepath
+
+
+_current_profiler: contextvars.ContextVar = contextvars.ContextVar("profiler", default=None)
+
+
+@contextmanager
+def profile_run(name: str = "run", sample: bool = False, interval: float = SAMPLE_INTERVAL) -> Iterator[Profiler]:
+    """
+    Profile everything inside the block
+
+    Args:
+        name: Profile name
+        sample: Also sample Python stacks of all threads
+        interval: Seconds between samples
+    """
+    profiler = Profiler(name, interval if sample else None)
+    token = _current_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _current_profiler.reset(token)
+
+
+@contextmanager
+def profile_span(name: str, category: str = "python") -> Iterator[None]:
+    """
+    Record a span on the active profiler (no-op outside profile_run)
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name, category):
+        yield
+
+
+def traced(name: str, category: str = "node") -> Callable[[Callable], Callable]:
+    """
+    Decorator form of profile_span, used to wrap graph nodes
+    """
+    def decorate(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_span(name, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def format_summary(summary: Dict[str, Any], top: int = 8) -> str:
+    """
+    Render a profiler summary as a few lines of text
+    """
+    wall = summary["wall_ms"] or 1.0
+    lines = [
+        f"Wall time: {summary['wall_ms']:.0f} ms  |  waiting on LLM/search: {summary['io_ms']:.0f} ms "
+        f"({summary['io_ms'] / wall:.0%})  |  other: {max(0.0, wall - summary['io_ms']):.0f} ms"
+    ]
+    for name, ms in list(summary["spans_ms"].items())[:top]:
+        lines.append(f"  {name:<28} {ms:>9.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,307 @@
+"""
+Prompt templates for the Multi-Agent Research Assistant
+Precompiled, compact templates with a stable prefix order, plus per-run
+tracking of prompt tokens that repeat content from earlier calls
+"""
+
+import contextvars
+import hashlib
+import os
+import re
+import string
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+
+# Rough characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Shared by every agent so all calls in a run start with identical tokens
+BASE_SYSTEM_PROMPT = "You are one agent in a multi-agent research assistant."
+
+
+def estimate_tokens(messages) -> int:
+    """
+    Estimate the prompt tokens of a list of chat messages
+
+    Args:
+        messages: Chat messages (objects with .content) or a plain string
+
+    Returns:
+        Approximate token count
+    """
+    if isinstance(messages, str):
+        return len(messages) // CHARS_PER_TOKEN + 1
+    return sum(len(getattr(m, "content", "") or "") for m in messages) // CHARS_PER_TOKEN + 1
+
+
+def _compact(text: str) -> str:
+    """Collapse indentation and runs of spaces left by triple-quoted strings"""
+    return re.sub(r"[ \t]*\n[ \t]*", "\n", re.sub(r"[ \t]+", " ", text)).strip()
+
+
+class PromptTemplate:
+    """
+    A precompiled system + human prompt
+
+    The system message is built once. The human message is parsed once into
+    literal and field pieces, so rendering is a single join. Fields should be
+    ordered from most stable (the query) to most volatile (fresh research),
+    with the instruction last, so repeated calls share the longest prefix.
+    """
+
+    def __init__(self, name: str, system: str, human: str):
+        """
+        Args:
+            name: Short identifier used in prompt statistics
+            system: Role-specific system instructions
+            human: Human message template using {field} placeholders
+        """
+        self.name = name
+        self.system = f"{BASE_SYSTEM_PROMPT} {_compact(system)}"
+        self._pieces: List[Tuple[str, Optional[str]]] = []
+        for literal, field, _, _ in string.Formatter().parse(human):
+            if literal:
+                self._pieces.append((literal, None))
+            if field is not None:
+                self._pieces.append(("", field))
+        self.fields = [field for _, field in self._pieces if field]
+
+    def render(self, **values: Any) -> str:
+        """
+        Render the human message text
+
+        Raises:
+            KeyError: If a template field is missing from `values`
+        """
+        return "".join(literal if field is None else str(values[field]) for literal, field in self._pieces)
+
+    def format_messages(self, **values: Any) -> List[Any]:
+        """
+        Build the chat messages for an LLM call
+        """
+        return [
+            SystemMessage(content=self.system),
+            HumanMessage(content=self.render(**values)),
+        ]
+
+
+RESEARCH_PROMPT = PromptTemplate(
+    "research",
+    """You are a research specialist. Analyze the search results and extract
+    the most relevant and accurate information. Focus on facts, recent developments, and credible sources.
+    Be concise but comprehensive.""",
+    "Query: {query}\n\nSearch Results:\n{search_results}\n\nProvide a detailed research summary:"
+)
+
+# Map step of map-reduce research: one short call per source chunk
+EXTRACT_PROMPT = PromptTemplate(
+    "extract",
+    """You are a research assistant reading a single source. Extract only the facts relevant
+    to the query as a few short bullet points. If nothing in the source is relevant, reply NONE.""",
+    "Query: {query}\n\nSource:\n{source}\n\nRelevant facts:"
+)
+
+# Every critique ends with a machine-readable verdict; the workflow branches on
+# it instead of on wording ("no significant gaps" must not mean "gap")
+CRITIQUE_VERDICT_INSTRUCTION = (
+    "End with a final line that is exactly VERDICT: CONTINUE if the research needs another round "
+    "to fix errors or fill gaps that matter for the query, or VERDICT: DONE if it is good enough to answer."
+)
+VERDICT_PATTERN = re.compile(r"VERDICT\W{0,4}(CONTINUE|DONE)\b", re.IGNORECASE)
+
+
+def parse_verdict(critique: str) -> Optional[str]:
+    """
+    Read the verdict token(s) from a critique
+
+    Merged parallel critiques hold one verdict per focus; any CONTINUE wins.
+
+    Args:
+        critique: Critique text
+
+    Returns:
+        "continue", "done", or None when the critique has no verdict
+    """
+    verdicts = {match.lower() for match in VERDICT_PATTERN.findall(critique or "")}
+    if not verdicts:
+        return None
+    return "continue" if "continue" in verdicts else "done"
+
+
+CRITIQUE_PROMPT = PromptTemplate(
+    "critique",
+    f"""You are a critical analyst. Briefly evaluate the research for accuracy, completeness, and relevance.
+    Be concise. {CRITIQUE_VERDICT_INSTRUCTION}""",
+    "Query: {query}\n\nResearch:\n{research}\n\nProvide brief critique:"
+)
+
+# Specialized critiques run in parallel and share the general critique's human template
+CRITIQUE_FOCUS_PROMPTS = {
+    "factuality": PromptTemplate(
+        "critique_factuality",
+        f"""You are a fact-checker. Briefly flag claims in the research that look inaccurate, unsupported,
+        or contradictory. Be concise. {CRITIQUE_VERDICT_INSTRUCTION}""",
+        "Query: {query}\n\nResearch:\n{research}\n\nProvide brief critique:"
+    ),
+    "recency": PromptTemplate(
+        "critique_recency",
+        f"""You are a currency analyst. Briefly flag information in the research that may be outdated
+        or that misses recent developments. Be concise. {CRITIQUE_VERDICT_INSTRUCTION}""",
+        "Query: {query}\n\nResearch:\n{research}\n\nProvide brief critique:"
+    ),
+    "coverage": PromptTemplate(
+        "critique_coverage",
+        f"""You are a coverage analyst. Briefly identify aspects of the query the research does not
+        address. Be concise. {CRITIQUE_VERDICT_INSTRUCTION}""",
+        "Query: {query}\n\nResearch:\n{research}\n\nProvide brief critique:"
+    ),
+}
+
+SUMMARIZE_PROMPT = PromptTemplate(
+    "summarize",
+    "You are a synthesis expert. Create a clear, well-structured response that directly answers the query using the research findings.",
+    "Query: {query}\n\nResearch:\n{research}\n\nCritique:\n{critique}\n\nCreate final response:"
+)
+
+# Folds one research/critique round into the run's rolling summary
+ROLLING_SUMMARY_PROMPT = PromptTemplate(
+    "rolling_summary",
+    """You are a synthesis expert maintaining a running summary of an ongoing research process.
+    Merge the new research and critique into the summary. Keep it concise and keep every important fact.""",
+    "Query: {query}\n\nSummary so far:\n{summary}\n\nNew research:\n{research}\n\nCritique:\n{critique}\n\nUpdated summary:"
+)
+
+# Watch mode: refresh a stored summary with only the sources that are new
+WATCH_UPDATE_PROMPT = PromptTemplate(
+    "watch_update",
+    """You are a synthesis expert keeping a standing research summary current. If the new sources
+    add nothing material to the summary, reply exactly UNCHANGED. Otherwise return the full updated summary.""",
+    "Query: {query}\n\nCurrent summary:\n{summary}\n\nNew sources:\n{sources}\n\nUpdated summary:"
+)
+
+# Follow-up questions in a session: answer from earlier findings, or ask for a delta search
+FOLLOW_UP_PROMPT = PromptTemplate(
+    "follow_up",
+    """You are a research assistant continuing a conversation. Answer the new question from the
+    findings and sources gathered so far. Be clear and well-structured.""",
+    "Earlier questions: {history}\n\nFindings so far:\n{findings}\n\nSources:\n{sources}\n\n"
+    "Question: {question}\n\n{instruction}"
+)
+
+REVISE_PROMPT = PromptTemplate(
+    "revise",
+    "You are a synthesis expert. Revise the draft response to address the critique. Keep what is correct and change only what the critique requires.",
+    "Query: {query}\n\nDraft:\n{draft}\n\nCritique:\n{critique}\n\nRevised final response:"
+)
+
+
+class PromptTracker:
+    """
+    Records every prompt sent during one run and measures redundancy
+
+    For each call it reports the prompt tokens, the tokens in the longest
+    prefix shared with an earlier prompt (what provider prompt caching can
+    reuse) and the tokens in lines already seen in an earlier prompt or
+    response (content that was resent). Safe to share between the worker
+    threads of one run (map_sources, parallel critiques).
+    """
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self._prompts: List[str] = []
+        self._seen: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _segments(text: str) -> List[str]:
+        return [s for s in (line.strip() for line in text.splitlines()) if s]
+
+    @staticmethod
+    def _key(segment: str) -> bytes:
+        return hashlib.blake2b(segment.encode("utf-8"), digest_size=12).digest()
+
+    def record(self, name: str, messages: List[Any], response: str = ""):
+        """
+        Record one LLM call
+
+        Args:
+            name: Agent or template name
+            messages: Messages sent to the model
+            response: Text returned by the model
+        """
+        prompt = "\n\n".join(getattr(m, "content", "") or "" for m in messages)
+        with self._lock:
+            self._record(name, prompt, response or "")
+
+    def _record(self, name: str, prompt: str, response: str):
+        prefix_chars = max(
+            (len(os.path.commonprefix([prompt, earlier])) for earlier in self._prompts),
+            default=0
+        )
+
+        duplicated_chars = 0
+        new_keys = []
+        for segment in self._segments(prompt):
+            key = self._key(segment)
+            if key in self._seen:
+                duplicated_chars += len(segment)
+            else:
+                new_keys.append(key)
+
+        self.calls.append({
+            "agent": name,
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(response),
+            "cached_prefix_tokens": prefix_chars // CHARS_PER_TOKEN,
+            "duplicated_tokens": duplicated_chars // CHARS_PER_TOKEN,
+        })
+
+        self._prompts.append(prompt)
+        self._seen.update(new_keys)
+        self._seen.update(self._key(s) for s in self._segments(response))
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the run's prompt usage
+
+        Returns:
+            Totals plus the per-call breakdown
+        """
+        with self._lock:
+            calls = list(self.calls)
+        return {
+            "calls": calls,
+            "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+            "completion_tokens": sum(c["completion_tokens"] for c in calls),
+            "cached_prefix_tokens": sum(c["cached_prefix_tokens"] for c in calls),
+            "duplicated_tokens": sum(c["duplicated_tokens"] for c in calls),
+        }
+
+
+_current_tracker: contextvars.ContextVar = contextvars.ContextVar("prompt_tracker", default=None)
+
+
+@contextmanager
+def track_prompts() -> Iterator[PromptTracker]:
+    """
+    Collect prompt statistics for every call made inside the block
+    """
+    tracker = PromptTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def record_prompt(name: str, messages: List[Any], response: str = ""):
+    """
+    Record a call on the active tracker (no-op outside track_prompts)
+    """
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(name, messages, response)
@@ -0,0 +1,227 @@
+"""
+Compact run records for the Multi-Agent Research Assistant
+Holds completed research results in memory with __slots__ classes, interned
+short strings and optionally zlib-compressed text, and can defer loading
+the large text fields until they are read
+"""
+
+import glob
+import os
+import sys
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from utils import load_research_result
+
+
+# Separator between findings packed into one blob (ASCII record separator)
+RECORD_SEPARATOR = "\x1e"
+
+# Texts shorter than this are kept as plain strings; zlib would not pay off
+MIN_COMPRESS_CHARS = 256
+
+COMPRESSION_LEVEL = 6
+
+Blob = Union[str, bytes, None]
+
+
+def pack_text(text: str, compress: bool = True) -> Blob:
+    """
+    Store text as a plain string or, if long enough, as zlib-compressed UTF-8
+    """
+    if not compress or len(text) < MIN_COMPRESS_CHARS:
+        return text
+    return zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def unpack_text(blob: Blob) -> str:
+    """
+    Inverse of pack_text
+    """
+    if blob is None:
+        return ""
+    if isinstance(blob, bytes):
+        return zlib.decompress(blob).decode("utf-8")
+    return blob
+
+
+def pack_list(items: List[str], compress: bool = True) -> Blob:
+    """
+    Pack a list of texts into a single blob, so N findings cost one object
+    """
+    return pack_text(RECORD_SEPARATOR.join(items), compress) if items else None
+
+
+def unpack_list(blob: Blob) -> List[str]:
+    """
+    Inverse of pack_list
+    """
+    text = unpack_text(blob)
+    return text.split(RECORD_SEPARATOR) if text else []
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class RunRecord:
+    """
+    One completed research run
+
+    Queries and query classes are interned, since dashboards hold many runs
+    of the same question; the summary, findings and critiques are each
+    packed into one (optionally compressed) blob. A record created with a
+    source path and lazy=True keeps only the metadata until one of the
+    large fields is first read.
+    """
+
+    __slots__ = (
+        "query", "timestamp", "iteration", "max_iterations", "query_class",
+        "compress", "source", "_summary", "_findings", "_critiques", "_loaded"
+    )
+
+    def __init__(
+        self,
+        query: str,
+        final_summary: str = "",
+        research_results: Optional[List[str]] = None,
+        critique_feedback: Optional[List[str]] = None,
+        iteration: int = 0,
+        max_iterations: int = 0,
+        query_class: Optional[str] = None,
+        timestamp: Optional[str] = None,
+        compress: bool = True,
+        source: Optional[str] = None
+    ):
+        self.query = _intern(query)
+        self.timestamp = timestamp
+        self.iteration = iteration
+        self.max_iterations = max_iterations
+        self.query_class = _intern(query_class)
+        self.compress = compress
+        self.source = source
+        self._set_text(final_summary, research_results or [], critique_feedback or [])
+
+    def _set_text(self, final_summary: str, research_results: List[str], critique_feedback: List[str]):
+        self._summary = pack_text(final_summary, self.compress)
+        self._findings = pack_list(research_results, self.compress)
+        self._critiques = pack_list(critique_feedback, self.compress)
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            data = load_research_result(self.source)
+            self._set_text(
+                data.get("final_summary", ""),
+                data.get("research_results", []),
+                data.get("critique_feedback", [])
+            )
+
+    def unload(self):
+        """
+        Drop the large text fields; they are re-read from `source` on access
+        """
+        if self.source is None:
+            raise ValueError("Only records with a source file can be unloaded")
+        self._summary = self._findings = self._critiques = None
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Whether the large text fields are currently held in memory
+        """
+        return self._loaded
+
+    @property
+    def final_summary(self) -> str:
+        self._ensure_loaded()
+        return unpack_text(self._summary)
+
+    @property
+    def research_results(self) -> List[str]:
+        self._ensure_loaded()
+        return unpack_list(self._findings)
+
+    @property
+    def critique_feedback(self) -> List[str]:
+        self._ensure_loaded()
+        return unpack_list(self._critiques)
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], compress: bool = True, **kwargs) -> "RunRecord":
+        """
+        Build a record from a final AgentState (or a saved result dictionary)
+
+        Args:
+            state: run_research_assistant output or load_research_result data
+            compress: Compress long text fields
+            **kwargs: Extra attributes such as timestamp or source
+
+        Returns:
+            A new RunRecord
+        """
+        return cls(
+            query=state.get("query", ""),
+            final_summary=state.get("final_summary", ""),
+            research_results=list(state.get("research_results", [])),
+            critique_feedback=list(state.get("critique_feedback", [])),
+            iteration=state.get("iteration", state.get("iterations", 0)),
+            max_iterations=state.get("max_iterations", 0),
+            query_class=state.get("query_class"),
+            timestamp=kwargs.pop("timestamp", state.get("timestamp")),
+            compress=compress,
+            **kwargs
+        )
+
+    @classmethod
+    def from_file(cls, filepath: str, lazy: bool = True, compress: bool = True) -> "RunRecord":
+        """
+        Load a record from a saved result file
+
+        Args:
+            filepath: Path written by save_research_result
+            lazy: Keep only metadata in memory until a text field is read
+            compress: Compress long text fields once loaded
+
+        Returns:
+            A new RunRecord
+        """
+        data = load_research_result(filepath)
+        record = cls.from_state(data, compress=compress and not lazy, source=filepath)
+        if lazy:
+            record.unload()
+            record.compress = compress
+        return record
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Expand the record back into an AgentState-shaped dictionary
+        """
+        state = {
+            "query": self.query,
+            "research_results": self.research_results,
+            "critique_feedback": self.critique_feedback,
+            "final_summary": self.final_summary,
+            "iteration": self.iteration,
+            "max_iterations": self.max_iterations,
+        }
+        if self.query_class is not None:
+            state["query_class"] = self.query_class
+        return state
+
+    def __repr__(self) -> str:
+        return f"RunRecord(query={self.query!r}, iteration={self.iteration}, loaded={self._loaded})"
+
+
+def iter_records(directory: str = "results", lazy: bool = True, compress: bool = True) -> Iterator[RunRecord]:
+    """
+    Yield a RunRecord for every saved result in a directory, oldest first
+
+    Args:
+        directory: Result store written by save_research_result
+        lazy: Defer loading of the large text fields
+        compress: Compress long text fields once loaded
+    """
+    for filepath in sorted(glob.glob(os.path.join(directory, "research_result_*.json*"))):
+        yield RunRecord.from_file(filepath, lazy=lazy, compress=compress)
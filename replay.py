@@ -0,0 +1,461 @@
+"""
+Record and replay of LLM and search traffic for offline performance testing
+Captures every llm.invoke / search_tool.invoke made by the agents and by
+follow-up sessions, with timings, into a gzip-compressed JSONL trace, and
+serves the recorded responses back with the original (or scaled) latencies
+and no network
+
+Usage:
+    RECORD_TRACE=traces/prod.jsonl.gz streamlit run app.py
+    python replay.py traces/prod.jsonl.gz --speed 10
+"""
+
+import argparse
+import atexit
+import contextlib
+import contextvars
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+
+# Per-call kwargs that depend on wall-clock state rather than on the request
+VOLATILE_KWARGS = ("timeout",)
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar("replay_run", default=None)
+_current_session: contextvars.ContextVar = contextvars.ContextVar("replay_session", default=None)
+
+
+class ReplayMissError(LookupError):
+    """
+    Raised in strict replay when a request has no recorded response
+    """
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _stable_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in sorted(kwargs.items()) if k not in VOLATILE_KWARGS}
+
+
+def llm_request_key(messages, kwargs: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    (key, label) for a chat request
+
+    The key identifies the exact request; the label identifies the prompt
+    it came from (its system message), used to match requests whose text
+    changed between recording and replay.
+    """
+    parts = [(getattr(m, "type", ""), getattr(m, "content", str(m))) for m in messages]
+    key = _digest(json.dumps([parts, _stable_kwargs(kwargs)], default=str))
+    label = _digest(parts[0][1]) if parts and parts[0][0] == "system" else "llm"
+    return key, label
+
+
+def search_request_key(query) -> Tuple[str, str]:
+    """
+    (key, label) for a search request
+
+    Only the query counts: result counts are applied by slicing, so a
+    recording made with more results can answer a request for fewer.
+    """
+    return _digest(str(query)), "search"
+
+
+class Recorder:
+    """
+    Appends a trace of runs and their LLM/search calls to a .jsonl.gz file
+
+    Each call entry holds the request key, the response and its latency.
+    Full request text is only stored with include_requests=True; keys are
+    enough to replay. Entries are buffered and appended as one gzip member
+    when a run ends (so a run's similar prompts compress together), and
+    several sessions can extend one trace.
+    """
+
+    def __init__(self, path: str, include_requests: bool = False):
+        """
+        Args:
+            path: Trace file, normally ending in .jsonl.gz
+            include_requests: Also store prompts and queries (larger file)
+        """
+        self.path = path
+        self.include_requests = include_requests
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._started = time.time()
+        self._pending: List[str] = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        atexit.register(self.flush)
+
+    def _write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._pending.append(line)
+
+    def flush(self):
+        """
+        Append buffered entries to the trace file
+        """
+        with self._lock:
+            lines, self._pending = self._pending, []
+            if lines:
+                with gzip.open(self.path, "at", encoding="utf-8") as f:
+                    f.writelines(lines)
+
+    @contextmanager
+    def run(self, query: str, **settings) -> Iterator[str]:
+        """
+        Group the calls made inside the block under one recorded run
+        """
+        run_id = f"{os.getpid()}-{int(self._started)}-{next(self._ids)}"
+        token = _current_run.set(run_id)
+        start = time.time()
+        try:
+            yield run_id
+        finally:
+            _current_run.reset(token)
+            entry = {
+                "type": "run", "id": run_id, "query": query, "settings": settings,
+                "start": start, "duration": time.time() - start,
+            }
+            if _current_session.get() is not None:
+                entry["session"] = _current_session.get()
+            self._write(entry)
+            self.flush()
+
+    def record(self, kind: str, key: str, label: str, request: Any, response: Any, start: float, latency: float):
+        """
+        Append one call
+        """
+        entry = {
+            "type": kind, "run": _current_run.get(), "key": key, "label": label,
+            "start": start, "latency": round(latency, 6), "response": response,
+        }
+        if self.include_requests:
+            entry["request"] = request
+        self._write(entry)
+
+
+@contextmanager
+def recording_session(session_id: str) -> Iterator[str]:
+    """
+    Mark the runs recorded inside the block as one conversation, so replay
+    re-issues them in order against the same session
+    """
+    token = _current_session.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _current_session.reset(token)
+
+
+class RecordingLLM:
+    """
+    Wraps a chat model and records every invoke
+    """
+
+    def __init__(self, llm, recorder: Recorder):
+        self.llm = llm
+        self.recorder = recorder
+
+    def invoke(self, messages, *args, **kwargs):
+        start = time.time()
+        began = time.perf_counter()
+        response = self.llm.invoke(messages, *args, **kwargs)
+        latency = time.perf_counter() - began
+        key, label = llm_request_key(messages, kwargs)
+        metadata = getattr(response, "response_metadata", None)
+        self.recorder.record(
+            "llm", key, label,
+            [getattr(m, "content", str(m)) for m in messages],
+            {"content": response.content, "response_metadata": metadata if isinstance(metadata, dict) else {}},
+            start, latency
+        )
+        return response
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+class RecordingSearch:
+    """
+    Wraps a search tool and records every invoke
+    """
+
+    def __init__(self, tool, recorder: Recorder):
+        self.tool = tool
+        self.recorder = recorder
+
+    def invoke(self, query, *args, **kwargs):
+        start = time.time()
+        began = time.perf_counter()
+        results = self.tool.invoke(query, *args, **kwargs)
+        latency = time.perf_counter() - began
+        key, label = search_request_key(query)
+        self.recorder.record("search", key, label, query, list(results), start, latency)
+        return results
+
+    def model_copy(self, update: Dict[str, Any] = None, **kwargs) -> "RecordingSearch":
+        """
+        Copy the wrapped pydantic tool (e.g. to change max_results), keeping the recorder
+        """
+        return RecordingSearch(self.tool.model_copy(update=update, **kwargs), self.recorder)
+
+    def __getattr__(self, name):
+        if name == "tool":
+            raise AttributeError(name)
+        return getattr(self.tool, name)
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the entries of a trace file
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Trace:
+    """
+    Recorded responses indexed for replay
+
+    A request is answered by the next recorded response with the same key
+    (an exact match). If the request changed, it gets the next response
+    recorded for the same prompt (label), then for the same kind of call.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], speed: float = 1.0, strict: bool = False):
+        """
+        Args:
+            entries: Trace entries from read_trace
+            speed: Latency divisor; 10 replays ten times faster, 0 skips waiting
+            strict: Raise ReplayMissError instead of falling back on a changed request
+        """
+        self.speed = speed
+        self.strict = strict
+        self.runs = [e for e in entries if e["type"] == "run"]
+        calls = [e for e in entries if e["type"] in ("llm", "search")]
+        self._by_key: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._by_label: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._by_kind: Dict[str, Deque[Dict[str, Any]]] = {}
+        for entry in calls:
+            for index, name in ((self._by_key, entry["key"]), (self._by_label, entry["label"]),
+                                (self._by_kind, entry["type"])):
+                index.setdefault(name, deque()).append(entry)
+        self._lock = threading.Lock()
+        self.stats = {"exact": 0, "fallback": 0, "miss": 0}
+
+    @classmethod
+    def load(cls, path: str, speed: float = 1.0, strict: bool = False) -> "Trace":
+        """
+        Read a trace file for replay
+        """
+        return cls(list(read_trace(path)), speed, strict)
+
+    @staticmethod
+    def _take(queue: Optional[Deque[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        # Rotate rather than pop, so a trace can be replayed more times than recorded
+        if not queue:
+            return None
+        entry = queue[0]
+        queue.rotate(-1)
+        return entry
+
+    def match(self, kind: str, key: str, label: str) -> Dict[str, Any]:
+        """
+        Find the recorded call that answers a request
+        """
+        with self._lock:
+            entry = self._take(self._by_key.get(key))
+            if entry is not None:
+                self.stats["exact"] += 1
+                return entry
+            entry = None if self.strict else (
+                self._take(self._by_label.get(label)) or self._take(self._by_kind.get(kind))
+            )
+            if entry is None:
+                self.stats["miss"] += 1
+                raise ReplayMissError(f"No recorded {kind} response for request {key}")
+            self.stats["fallback"] += 1
+            return entry
+
+    def wait(self, entry: Dict[str, Any]):
+        """
+        Sleep for the call's recorded latency, scaled by the replay speed
+        """
+        if self.speed > 0:
+            time.sleep(entry["latency"] / self.speed)
+
+
+class ReplayLLM:
+    """
+    Chat model that answers from a trace
+    """
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+
+    def invoke(self, messages, *args, **kwargs):
+        entry = self.trace.match("llm", *llm_request_key(messages, kwargs))
+        self.trace.wait(entry)
+        response = entry["response"]
+        return AIMessage(content=response["content"], response_metadata=response.get("response_metadata", {}))
+
+
+class ReplaySearch:
+    """
+    Search tool that answers from a trace
+    """
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+
+    def invoke(self, query, *args, **kwargs):
+        entry = self.trace.match("search", *search_request_key(query))
+        self.trace.wait(entry)
+        return [dict(result) for result in entry["response"]]
+
+
+def replay_trace(
+    path: str,
+    speed: float = 1.0,
+    concurrency: int = 8,
+    preserve_arrivals: bool = True,
+    strict: bool = False,
+    **workflow_options
+) -> Dict[str, Any]:
+    """
+    Re-run every recorded query against the current code, served from the trace
+
+    Args:
+        path: Trace file written by Recorder
+        speed: Latency and arrival-time divisor (10 = ten times faster)
+        concurrency: Runs replayed at once
+        preserve_arrivals: Start runs at their recorded (scaled) offsets
+        strict: Fail on requests that are not in the trace
+        **workflow_options: Passed to create_research_workflow (e.g. map_reduce=True)
+
+    Returns:
+        Per-run recorded vs replayed durations plus match statistics
+    """
+    from agents import create_research_workflow, run_research_assistant
+    from sessions import FollowUpResearch, SessionStore
+
+    trace = Trace.load(path, speed, strict)
+    llm, search = ReplayLLM(trace), ReplaySearch(trace)
+    workflow = create_research_workflow(llm, search, **workflow_options)
+    follow_ups = FollowUpResearch(SessionStore(), llm, search, workflow)
+    runs = sorted(trace.runs, key=lambda run: run["start"])
+    origin = runs[0]["start"] if runs else 0.0
+    began = time.perf_counter()
+
+    # A conversation's runs (web-app sessions) are replayed in order, as one task
+    conversations: Dict[str, List[Dict[str, Any]]] = {}
+    for run in runs:
+        conversations.setdefault(run.get("session") or run["id"], []).append(run)
+
+    def replay(run: Dict[str, Any]) -> Dict[str, Any]:
+        if preserve_arrivals and speed > 0:
+            delay = (run["start"] - origin) / speed - (time.perf_counter() - began)
+            if delay > 0:
+                time.sleep(delay)
+        settings = {k: v for k, v in run["settings"].items() if v is not None}
+        if settings.get("deadline") and speed > 0:
+            settings["deadline"] /= speed
+        start = time.perf_counter()
+        error = None
+        try:
+            if run.get("session"):
+                settings.pop("follow_up", None)
+                follow_ups.ask(run["session"], run["query"], **settings)
+            else:
+                run_research_assistant(run["query"], workflow=workflow, **settings)
+        except Exception as e:
+            error = str(e)
+        return {
+            "query": run["query"],
+            "recorded_s": run["duration"],
+            "replayed_s": time.perf_counter() - start,
+            "error": error,
+        }
+
+    def replay_conversation(conversation: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [replay(run) for run in conversation]
+
+    # sys.stdout is process-wide: silence the runs once here, not per worker
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, replay_conversation, conversation)
+                       for conversation in conversations.values()]
+            replayed = {run["id"]: result for future, conversation in zip(futures, conversations.values())
+                        for run, result in zip(conversation, future.result())}
+    return {"runs": [replayed[run["id"]] for run in runs], "matches": dict(trace.stats), "speed": speed}
+
+
+def main():
+    """
+    Replay CLI entry point
+    """
+    from benchmark import percentile, print_table
+
+    parser = argparse.ArgumentParser(description="Replay a recorded trace against the current code")
+    parser.add_argument("trace", help="Trace file (.jsonl.gz) written with RECORD_TRACE")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor; 0 skips all waiting")
+    parser.add_argument("--concurrency", type=int, default=8, help="Runs replayed at once")
+    parser.add_argument("--no-arrivals", action="store_true", help="Start all runs immediately")
+    parser.add_argument("--strict", action="store_true", help="Fail on requests missing from the trace")
+    parser.add_argument("--map-reduce", action="store_true", help="Replay with map-reduce research")
+    parser.add_argument("--parallel-critique", action="store_true", help="Replay with parallel critiques")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "replay")
+    os.environ.setdefault("TAVILY_API_KEY", "replay")
+    # Never record the replay itself
+    os.environ.pop("RECORD_TRACE", None)
+
+    report = replay_trace(
+        args.trace, args.speed, args.concurrency, not args.no_arrivals, args.strict,
+        map_reduce=args.map_reduce, parallel_critique=args.parallel_critique
+    )
+    runs = report["runs"]
+    if not runs:
+        print("⚠️ Trace has no recorded runs")
+        return
+
+    rows = []
+    scale = args.speed if args.speed > 0 else 1.0
+    for name, values in (("recorded", [r["recorded_s"] for r in runs]),
+                         (f"replayed x{scale:g} (scaled back)", [r["replayed_s"] * scale for r in runs])):
+        rows.append({"latency": name, "p50_s": percentile(values, 50),
+                     "p95_s": percentile(values, 95), "max_s": max(values)})
+    print_table(f"Replay of {len(runs)} runs at {args.speed:g}x", rows)
+
+    matches = report["matches"]
+    total = sum(matches.values()) or 1
+    print(f"🎯 Responses: {matches['exact']} exact, {matches['fallback']} by prompt, "
+          f"{matches['miss']} missing ({matches['exact'] / total:.0%} exact)")
+    errors = [r for r in runs if r["error"]]
+    if errors:
+        print(f"❌ {len(errors)} runs failed, e.g. {errors[0]['query']!r}: {errors[0]['error']}")
+
+
+if __name__ == "__main__":
+    main()
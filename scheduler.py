@@ -0,0 +1,297 @@
+"""
+Request scheduling for the Multi-Agent Research Assistant
+Puts a priority-aware, per-tenant weighted fair queue in front of LLM and
+search calls, so batch jobs cannot starve interactive users of the shared
+rate limit
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from budget import TokenBudget
+from limiter import AdaptiveLimiter
+from prompts import estimate_tokens
+
+
+# Priority classes and their share of dispatches when both are waiting
+PRIORITY_CLASSES = ("interactive", "batch")
+CLASS_WEIGHTS: Dict[str, float] = {"interactive": 8.0, "batch": 1.0}
+
+DEFAULT_TENANT = "default"
+DEFAULT_PRIORITY = "interactive"
+
+# Token-equivalent cost charged for one search call (~2 source passages)
+SEARCH_COST = 250
+
+# Queue-wait samples kept per class for the percentile stats
+WAIT_SAMPLES = 1000
+
+
+class QuotaExceededError(RuntimeError):
+    """
+    Raised when a tenant has used its token quota for the current window
+    """
+
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar(
+    "scheduled_job", default=(DEFAULT_TENANT, DEFAULT_PRIORITY)
+)
+
+
+@contextmanager
+def scheduling(tenant: Optional[str] = None, priority: Optional[str] = None) -> Iterator[None]:
+    """
+    Attribute every scheduled call made inside the block to a tenant and class
+
+    Args:
+        tenant: Team or user the calls are billed to
+        priority: One of PRIORITY_CLASSES
+    """
+    current_tenant, current_priority = _current_job.get()
+    priority = priority or current_priority
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority}")
+    token = _current_job.set((tenant or current_tenant, priority))
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def current_job() -> Tuple[str, str]:
+    """
+    The (tenant, priority) that calls in this context are attributed to
+    """
+    return _current_job.get()
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Scheduler:
+    """
+    Weighted fair queue with a limited number of concurrent call slots
+
+    Each (priority, tenant) pair is a flow with weight
+    class_weight * tenant_weight. A call is tagged with a virtual finish
+    time of max(virtual_now, flow's last finish) + cost / weight, and free
+    slots go to the smallest tag. Interactive calls therefore jump ahead of
+    a long batch backlog, while batch flows keep draining at their share,
+    and tenants within a class split capacity by weight rather than by how
+    many calls they queue.
+
+    The slot count is fixed, or follows an AdaptiveLimiter that learns it
+    from call latency and 429s.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        class_weights: Optional[Dict[str, float]] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        tenant_quotas: Optional[Dict[str, int]] = None,
+        window: float = 60.0,
+        limiter: Optional[AdaptiveLimiter] = None
+    ):
+        """
+        Args:
+            max_concurrent: Calls allowed in flight at once
+            class_weights: Weight per priority class (defaults to CLASS_WEIGHTS)
+            tenant_weights: Weight per tenant (default 1.0)
+            tenant_quotas: Tokens per window per tenant; tenants not listed are unlimited
+            window: Quota window in seconds
+            limiter: Adaptive limit that replaces max_concurrent
+        """
+        self.max_concurrent = max_concurrent
+        self.limiter = limiter
+        self.class_weights = dict(class_weights or CLASS_WEIGHTS)
+        self.tenant_weights = dict(tenant_weights or {})
+        self._quotas = {
+            tenant: TokenBudget(tokens, window) for tenant, tokens in (tenant_quotas or {}).items()
+        }
+        self._cond = threading.Condition()
+        self._pending = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._active = 0
+        self._waits = {cls: deque(maxlen=WAIT_SAMPLES) for cls in PRIORITY_CLASSES}
+        self._usage: Dict[str, int] = {}
+
+    def _tag(self, flow: Tuple[str, str], cost: float) -> Tuple[float, float]:
+        priority, tenant = flow
+        weight = self.class_weights.get(priority, 1.0) * self.tenant_weights.get(tenant, 1.0)
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + cost / weight
+        self._last_finish[flow] = finish
+        return start, finish
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Calls currently allowed in flight
+        """
+        return self.limiter.limit if self.limiter is not None else self.max_concurrent
+
+    def _dispatch(self):
+        while self._pending and self._active < self.concurrency:
+            _, _, ticket = heapq.heappop(self._pending)
+            self._virtual_time = max(self._virtual_time, ticket["start"])
+            self._active += 1
+            ticket["granted"] = True
+        self._cond.notify_all()
+
+    def run(
+        self,
+        fn: Callable[[], Any],
+        cost: int,
+        usage: Callable[[Any], Optional[int]] = None,
+        kind: str = "call"
+    ) -> Any:
+        """
+        Wait for a slot under the current tenant and priority, then call fn
+
+        Args:
+            fn: The call to make
+            cost: Estimated tokens the call will use
+            usage: Optional function returning actual tokens from fn's result
+            kind: "llm" or "search"; the limiter keeps a latency baseline per kind
+
+        Returns:
+            Whatever fn returns
+        """
+        tenant, priority = current_job()
+        quota = self._quotas.get(tenant)
+        if quota is not None and quota.remaining() < cost:
+            raise QuotaExceededError(
+                f"Tenant '{tenant}' has {quota.remaining()} of {quota.tokens_per_minute} tokens left"
+            )
+
+        enqueued = time.perf_counter()
+        with self._cond:
+            start, finish = self._tag((priority, tenant), cost)
+            ticket = {"start": start, "granted": False}
+            heapq.heappush(self._pending, (finish, next(self._sequence), ticket))
+            self._dispatch()
+            while not ticket["granted"]:
+                self._cond.wait()
+            self._waits[priority].append(time.perf_counter() - enqueued)
+            epoch = self.limiter.epoch if self.limiter is not None else 0
+
+        used = cost
+        error = None
+        started = time.perf_counter()
+        try:
+            result = fn()
+            actual = usage(result) if usage is not None else None
+            used = actual if isinstance(actual, int) else cost
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._cond:
+                if self.limiter is not None:
+                    self.limiter.record(epoch, time.perf_counter() - started, error, self._active, kind)
+                self._active -= 1
+                self._usage[tenant] = self._usage.get(tenant, 0) + used
+                self._dispatch()
+            if quota is not None:
+                quota.record(used)
+
+    def wait_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Queue-wait statistics per priority class, in seconds
+        """
+        with self._cond:
+            samples = {cls: list(waits) for cls, waits in self._waits.items()}
+        return {
+            cls: {
+                "count": len(waits),
+                "p50": _percentile(waits, 50),
+                "p95": _percentile(waits, 95),
+                "max": max(waits, default=0.0),
+            }
+            for cls, waits in samples.items()
+        }
+
+    def concurrency_stats(self) -> Dict[str, Any]:
+        """
+        Current slot count and calls in flight, plus the limiter's state if adaptive
+        """
+        with self._cond:
+            stats = {"limit": self.concurrency, "in_flight": self._active, "adaptive": self.limiter is not None}
+        if self.limiter is not None:
+            stats.update(self.limiter.stats(), in_flight=stats["in_flight"])
+        return stats
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Tokens used per tenant since the scheduler was created
+        """
+        with self._cond:
+            return dict(self._usage)
+
+
+def _token_usage(response) -> Optional[int]:
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    return usage.get("total_tokens")
+
+
+class ScheduledLLM:
+    """
+    Wraps a chat model so every invoke waits its turn in a Scheduler
+
+    The cost is the estimated prompt size plus the output cap; tenant usage
+    is settled from the provider's token usage when it is reported.
+    """
+
+    def __init__(self, llm, scheduler: Scheduler, output_tokens: int = None):
+        self.llm = llm
+        self.scheduler = scheduler
+        max_tokens = getattr(llm, "max_tokens", None)
+        self.output_tokens = output_tokens or (max_tokens if isinstance(max_tokens, int) else 1024)
+
+    def invoke(self, messages, *args, **kwargs):
+        cost = estimate_tokens(messages) + kwargs.get("max_tokens", self.output_tokens)
+        return self.scheduler.run(lambda: self.llm.invoke(messages, *args, **kwargs), cost, _token_usage, "llm")
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+class ScheduledSearch:
+    """
+    Wraps a search tool so every invoke waits its turn in a Scheduler
+    """
+
+    def __init__(self, tool, scheduler: Scheduler, cost: int = SEARCH_COST):
+        self.tool = tool
+        self.scheduler = scheduler
+        self.cost = cost
+
+    def invoke(self, query, *args, **kwargs):
+        return self.scheduler.run(lambda: self.tool.invoke(query, *args, **kwargs), self.cost, kind="search")
+
+    def model_copy(self, update: Dict[str, Any] = None, **kwargs) -> "ScheduledSearch":
+        """
+        Copy the wrapped pydantic tool (e.g. to change max_results), keeping the scheduler
+        """
+        return ScheduledSearch(self.tool.model_copy(update=update, **kwargs), self.scheduler, self.cost)
+
+    def __getattr__(self, name):
+        if name == "tool":
+            raise AttributeError(name)
+        return getattr(self.tool, name)
@@ -0,0 +1,392 @@
+"""
+Search providers for the Research Agent
+A common interface over Tavily web search, a local BM25 inverted index over
+a directory of documents, and a hybrid that fuses both rankings
+"""
+
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from extraction import bm25_idf, bm25_length_norm, bm25_term_weight, dedupe_sources, tokenize
+
+
+SEARCH_PROVIDERS = ("tavily", "local", "hybrid")
+
+# File types picked up by the local index
+CORPUS_EXTENSIONS = (".txt", ".md")
+
+# Target characters per indexed chunk (paragraphs are never split)
+CHUNK_CHARS = 800
+
+# Reciprocal rank fusion constant (Cormack et al. use 60)
+RRF_K = 60
+
+
+class SearchProvider:
+    """
+    Base class: subclasses implement search(query, max_results)
+
+    invoke() mirrors the LangChain tool interface the agents already use,
+    so a provider can stand in anywhere tavily_search did.
+    """
+
+    name = "base"
+
+    def __init__(self, max_results: int = 3):
+        self.max_results = max_results
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def invoke(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search and return up to max_results {'url', 'title', 'content', 'score'} dicts
+        """
+        return self.search(query, max_results or self.max_results)
+
+
+class TavilyProvider(SearchProvider):
+    """
+    Web search through the Tavily API
+    """
+
+    name = "tavily"
+
+    def __init__(self, client=None, max_results: int = 3):
+        """
+        Args:
+            client: A TavilySearchResults tool (built from TAVILY_API_KEY if omitted)
+            max_results: Default number of results
+        """
+        super().__init__(max_results)
+        if client is None:
+            from langchain_community.tools.tavily_search import TavilySearchResults
+            client = TavilySearchResults(max_results=max_results, tavily_api_key=os.getenv("TAVILY_API_KEY"))
+        self.client = client
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        client = self.client
+        if getattr(client, "max_results", max_results) != max_results and hasattr(type(client), "model_copy"):
+            client = client.model_copy(update={"max_results": max_results})
+        results = client.invoke(query)
+        if not isinstance(results, list):
+            return []
+        return [
+            {
+                "url": r.get("url", ""),
+                "title": r.get("title", ""),
+                "content": r.get("content", ""),
+                "score": r.get("score", 0.0),
+            }
+            for r in results[:max_results]
+        ]
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Group paragraphs into chunks of roughly chunk_chars characters
+    """
+    chunks, current, size = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and size + len(paragraph) > chunk_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class LocalIndex:
+    """
+    Incremental BM25 inverted index over a directory of text documents
+
+    Files are split into paragraph chunks; each chunk is an indexed
+    document. refresh() re-reads only files whose size or mtime changed and
+    drops deleted ones, and the index can be saved and reloaded so restarts
+    skip unchanged files as well. Queries only touch the postings of their
+    own terms.
+    """
+
+    def __init__(self, directory: str, chunk_chars: int = CHUNK_CHARS, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            directory: Folder of .txt/.md documents (searched recursively)
+            chunk_chars: Target characters per indexed chunk
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization strength
+        """
+        self.directory = directory
+        self.chunk_chars = chunk_chars
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._total_length = 0
+        self._norms: Optional[Dict[int, float]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _add_chunk(self, url: str, title: str, content: str, term_freqs: Counter = None) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+        term_freqs = term_freqs if term_freqs is not None else Counter(tokenize(content))
+        length = sum(term_freqs.values())
+        self._docs[doc_id] = {
+            "url": url, "title": title, "content": content, "length": length, "terms": term_freqs
+        }
+        self._total_length += length
+        self._norms = None
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+        return doc_id
+
+    def _remove_chunk(self, doc_id: int):
+        doc = self._docs.pop(doc_id)
+        self._total_length -= doc["length"]
+        self._norms = None
+        for term in doc["terms"]:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def add_document(self, url: str, text: str, title: str = "") -> List[int]:
+        """
+        Index a document that does not come from the directory
+        """
+        with self._lock:
+            return [self._add_chunk(url, title, chunk) for chunk in chunk_text(text, self.chunk_chars)]
+
+    def _index_file(self, path: str, stat: os.stat_result):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        title = os.path.splitext(os.path.basename(path))[0]
+        url = "file://" + os.path.abspath(path)
+        doc_ids = [
+            self._add_chunk(f"{url}#{i}" if i else url, title, chunk)
+            for i, chunk in enumerate(chunk_text(text, self.chunk_chars))
+        ]
+        self._files[path] = {"mtime": stat.st_mtime, "size": stat.st_size, "docs": doc_ids}
+
+    def _scan(self) -> Iterable[Tuple[str, os.stat_result]]:
+        for root, _, names in os.walk(self.directory):
+            for name in sorted(names):
+                if name.lower().endswith(CORPUS_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield path, os.stat(path)
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the directory
+
+        Returns:
+            Number of files added, updated and removed
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            seen = set()
+            for path, stat in self._scan():
+                seen.add(path)
+                known = self._files.get(path)
+                if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size:
+                    continue
+                if known:
+                    for doc_id in known["docs"]:
+                        self._remove_chunk(doc_id)
+                self._index_file(path, stat)
+                counts["updated" if known else "added"] += 1
+
+            for path in set(self._files) - seen:
+                for doc_id in self._files.pop(path)["docs"]:
+                    self._remove_chunk(doc_id)
+                counts["removed"] += 1
+        return counts
+
+    def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank indexed chunks against a query with BM25
+
+        Returns:
+            Up to max_results {'url', 'title', 'content', 'score'} dicts, best first
+        """
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            if self._norms is None:
+                # Length norms depend on the average length; recompute after changes
+                avg_length = self._total_length / n
+                self._norms = {
+                    doc_id: bm25_length_norm(doc["length"], avg_length, self.k1, self.b)
+                    for doc_id, doc in self._docs.items()
+                }
+            norms = self._norms
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = bm25_idf(n, len(postings))
+                for doc_id, freq in postings.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * bm25_term_weight(freq, norms[doc_id], self.k1)
+
+            best = heapq.nlargest(max_results, scores.items(), key=lambda item: (item[1], -item[0]))
+            return [
+                {
+                    "url": self._docs[doc_id]["url"],
+                    "title": self._docs[doc_id]["title"],
+                    "content": self._docs[doc_id]["content"],
+                    "score": score,
+                }
+                for doc_id, score in best
+            ]
+
+    def save(self, path: str):
+        """
+        Write the index to a JSON file
+        """
+        with self._lock:
+            data = {
+                "directory": self.directory,
+                "chunk_chars": self.chunk_chars,
+                "files": self._files,
+                "docs": {
+                    str(doc_id): {k: (dict(v) if k == "terms" else v) for k, v in doc.items()}
+                    for doc_id, doc in self._docs.items()
+                },
+                "next_id": self._next_id,
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LocalIndex":
+        """
+        Read an index written by save(); call refresh() to pick up changes
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["directory"], chunk_chars=data["chunk_chars"], **kwargs)
+        for doc_id, doc in sorted(data["docs"].items(), key=lambda item: int(item[0])):
+            index._next_id = int(doc_id)
+            index._add_chunk(doc["url"], doc["title"], doc["content"], Counter(doc["terms"]))
+        index._files = data["files"]
+        index._next_id = data["next_id"]
+        return index
+
+
+class LocalSearchProvider(SearchProvider):
+    """
+    Offline search over a LocalIndex
+    """
+
+    name = "local"
+
+    def __init__(self, index, max_results: int = 3, refresh_interval: Optional[float] = None):
+        """
+        Args:
+            index: A LocalIndex, or a directory to build one from
+            max_results: Default number of results
+            refresh_interval: Re-scan the directory before a search if this
+                many seconds have passed since the last scan (None: never)
+        """
+        super().__init__(max_results)
+        if isinstance(index, str):
+            index = LocalIndex(index)
+            index.refresh()
+        self.index = index
+        self.refresh_interval = refresh_interval
+        self._refreshed_at = time.monotonic()
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        if self.refresh_interval is not None and time.monotonic() - self._refreshed_at > self.refresh_interval:
+            self.index.refresh()
+            self._refreshed_at = time.monotonic()
+        return self.index.search(query, max_results)
+
+
+class HybridSearchProvider(SearchProvider):
+    """
+    Queries several providers at once and fuses their rankings
+
+    Each provider's list is combined with reciprocal rank fusion
+    (score = sum of 1 / (RRF_K + rank)), so providers with incomparable
+    score scales can be mixed. Near-duplicate results across providers are
+    then collapsed with SimHash.
+    """
+
+    name = "hybrid"
+
+    def __init__(self, providers: Sequence[SearchProvider], max_results: int = 3, rrf_k: int = RRF_K):
+        super().__init__(max_results)
+        self.providers = list(providers)
+        self.rrf_k = rrf_k
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        depth = max_results * 2
+        with ThreadPoolExecutor(max_workers=len(self.providers)) as pool:
+            rankings = list(pool.map(lambda p: p.search(query, depth), self.providers))
+
+        fused: Dict[str, Dict[str, Any]] = {}
+        for provider, ranking in zip(self.providers, rankings):
+            for rank, result in enumerate(ranking, 1):
+                key = result.get("url") or result.get("content", "")
+                entry = fused.setdefault(key, dict(result, score=0.0, providers=[]))
+                entry["score"] += 1.0 / (self.rrf_k + rank)
+                entry["providers"].append(provider.name)
+
+        ranked = sorted(fused.values(), key=lambda r: -r["score"])
+        return dedupe_sources(ranked)[:max_results]
+
+
+# Local providers by corpus directory, reused so each index is built once
+_local_providers: Dict[str, LocalSearchProvider] = {}
+
+
+def get_search_provider(
+    name: Optional[str] = None,
+    corpus_dir: Optional[str] = None,
+    tavily_client=None,
+    max_results: int = 3
+) -> SearchProvider:
+    """
+    Build the configured search provider
+
+    Args:
+        name: 'tavily', 'local' or 'hybrid' (defaults to SEARCH_PROVIDER, then tavily)
+        corpus_dir: Document folder for local search (defaults to LOCAL_CORPUS_DIR, then corpus/)
+        tavily_client: Existing TavilySearchResults tool to wrap
+        max_results: Default number of results
+
+    Returns:
+        A SearchProvider
+    """
+    name = name or os.getenv("SEARCH_PROVIDER") or "tavily"
+    corpus_dir = corpus_dir or os.getenv("LOCAL_CORPUS_DIR") or "corpus"
+    if name not in SEARCH_PROVIDERS:
+        raise ValueError(f"Unknown search provider: {name}")
+
+    if name == "tavily":
+        return TavilyProvider(tavily_client, max_results)
+    if corpus_dir not in _local_providers:
+        _local_providers[corpus_dir] = LocalSearchProvider(corpus_dir, max_results, refresh_interval=30.0)
+    local = _local_providers[corpus_dir]
+    if name == "local":
+        return local
+    return HybridSearchProvider([TavilyProvider(tavily_client, max_results), local], max_results)
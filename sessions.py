@@ -0,0 +1,297 @@
+"""
+Conversational research sessions for the Multi-Agent Research Assistant
+Keeps each session's completed runs and gathered sources so follow-up
+questions are answered from existing findings first, searching only for
+what is missing
+"""
+
+import contextlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from agents import (
+    create_research_workflow, get_llm, get_search_provider, run_research_assistant, search_sources,
+    tavily_search, trace_recorder
+)
+from extraction import build_research_context
+from prompts import FOLLOW_UP_PROMPT, record_prompt, track_prompts
+from replay import Recorder, RecordingLLM, RecordingSearch, recording_session
+from scheduler import ScheduledLLM, ScheduledSearch, Scheduler, scheduling
+
+
+# Bounds on what one session keeps, and on the number of live sessions
+MAX_SESSIONS = 200
+SESSION_TTL = 2 * 3600.0
+MAX_SESSION_SOURCES = 40
+MAX_SESSION_TURNS = 10
+
+# Context sent with a follow-up question
+FOLLOW_UP_FINDINGS_CHARS = 2000
+FOLLOW_UP_SOURCE_CHARS = 1500
+FOLLOW_UP_HISTORY_TURNS = 3
+FOLLOW_UP_MAX_RESULTS = 3
+
+SEARCH_PREFIX = "SEARCH:"
+ANSWER_OR_SEARCH = (
+    f"Answer the question. If the findings and sources lack information the answer needs, "
+    f"reply with only '{SEARCH_PREFIX} <a standalone web search query for the missing part>'."
+)
+ANSWER_ONLY = "Answer the question:"
+
+
+class Session:
+    """
+    One conversation: its questions, answers and the sources seen so far
+
+    Sources are keyed by URL and the oldest are dropped past max_sources;
+    only the last max_turns turns are kept.
+    """
+
+    def __init__(self, session_id: str, max_sources: int = MAX_SESSION_SOURCES, max_turns: int = MAX_SESSION_TURNS):
+        self.session_id = session_id
+        self.max_sources = max_sources
+        self.max_turns = max_turns
+        self.turns: List[Dict[str, Any]] = []
+        self.sources: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.state: Optional[Dict[str, Any]] = None
+        self.updated = time.time()
+
+    def add_sources(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keep search results, returning the ones not seen before in this session
+        """
+        new = []
+        for result in results:
+            key = result.get("url") or result.get("content", "")[:200]
+            if key not in self.sources:
+                new.append(result)
+            self.sources[key] = result
+            self.sources.move_to_end(key)
+        while len(self.sources) > self.max_sources:
+            self.sources.popitem(last=False)
+        return new
+
+    def add_turn(self, query: str, answer: str, state: Optional[Dict[str, Any]] = None):
+        """
+        Record a completed question; a full run's final state replaces the last one
+        """
+        self.turns.append({"query": query, "answer": answer})
+        del self.turns[:-self.max_turns]
+        if state is not None:
+            self.state = state
+        self.updated = time.time()
+
+    def findings(self, limit: int = FOLLOW_UP_FINDINGS_CHARS) -> str:
+        """
+        Answers and research gathered so far, newest first, within `limit` characters
+        """
+        parts = [turn["answer"] for turn in reversed(self.turns)]
+        if self.state:
+            parts.extend(reversed(self.state.get("research_results", [])))
+        text = "\n\n".join(part for part in parts if part)
+        return text[:limit]
+
+
+class SessionStore:
+    """
+    Thread-safe, bounded map of session id to Session
+
+    Sessions idle for longer than `ttl` expire, and the least recently used
+    are evicted beyond `max_sessions`.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL, **session_options):
+        """
+        Args:
+            max_sessions: Live sessions kept at most
+            ttl: Seconds of inactivity before a session expires
+            **session_options: max_sources / max_turns for new sessions
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.session_options = session_options
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """
+        Return a live session, creating it (with a new id if none is given)
+        """
+        session_id = session_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            for key in [k for k, s in self._sessions.items() if now - s.updated > self.ttl]:
+                del self._sessions[key]
+                self.evicted += 1
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id, **self.session_options)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return session
+
+    def end(self, session_id: str) -> bool:
+        """
+        Drop a session; returns whether it existed
+        """
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class FollowUpResearch:
+    """
+    Answers questions within sessions
+
+    A session's first question is a normal research run. A follow-up is
+    answered in one call from the session's findings and stored sources;
+    if the model says they are missing something, only that delta is
+    searched, unseen sources are added, and it answers again.
+    """
+
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        llm=None,
+        search_tool=None,
+        workflow=None,
+        scheduler: Optional[Scheduler] = None,
+        recorder: Optional[Recorder] = None
+    ):
+        """
+        Args:
+            store: Session store (a new bounded store by default)
+            llm: Model for follow-up answers (defaults to the summarize agent's)
+            search_tool: Search tool (defaults to SEARCH_PROVIDER)
+            workflow: Compiled workflow for first questions
+            scheduler: Optional fair queue for follow-up calls
+            recorder: Records follow-up calls and groups each session's runs
+                for replay.py (defaults to the RECORD_TRACE recorder, if set)
+        """
+        self.store = store if store is not None else SessionStore()
+        self.recorder = recorder or trace_recorder
+        search_tool = search_tool if search_tool is not None else get_search_provider(tavily_client=tavily_search)
+        self.workflow = workflow if workflow is not None else create_research_workflow(
+            llm, search_tool, scheduler=scheduler, recorder=self.recorder
+        )
+        llm = llm if llm is not None else get_llm(agent="summarize")
+        if self.recorder is not None:
+            # Innermost, as in create_research_workflow
+            llm = RecordingLLM(llm, self.recorder)
+            search_tool = RecordingSearch(search_tool, self.recorder)
+        if scheduler is not None:
+            llm = ScheduledLLM(llm, scheduler)
+            search_tool = ScheduledSearch(search_tool, scheduler)
+        self.llm = llm
+        self.search_tool = search_tool
+
+    def ask(
+        self,
+        session_id: str,
+        query: str,
+        max_iterations: int = 2,
+        tenant: Optional[str] = None,
+        priority: Optional[str] = None,
+        **run_options
+    ) -> Dict[str, Any]:
+        """
+        Answer a question in a session
+
+        Args:
+            session_id: Conversation id (created on first use)
+            query: The question
+            max_iterations: Research iterations for a session's first question
+            tenant: Scheduler tenant
+            priority: Scheduler class
+            **run_options: Passed to run_research_assistant for first questions
+                (a `workflow` here replaces the one given to the constructor)
+
+        Returns:
+            A final state; first questions carry the run's search results as
+            `sources`, follow-ups carry follow_up=True, searched and new_sources
+        """
+        session = self.store.get(session_id)
+        with recording_session(session.session_id):
+            if not session.turns:
+                return self._first(session, query, max_iterations, tenant, priority, **run_options)
+            return self._follow_up(session, query, tenant, priority)
+
+    def adopt(self, session_id: str, state: Dict[str, Any]) -> Session:
+        """
+        Start a session from a finished first run, e.g. a cached answer
+
+        Args:
+            session_id: Conversation id (created on first use)
+            state: Final state returned by ask() for a first question; its
+                `sources` seed the session so follow-ups can rank them
+        """
+        session = self.store.get(session_id)
+        session.add_sources(state.get("sources") or [])
+        session.add_turn(state["query"], state["final_summary"], state)
+        return session
+
+    def _first(self, session: Session, query: str, max_iterations: int, tenant, priority, **run_options):
+        run_options.setdefault("workflow", self.workflow)
+        if self.recorder is not None:
+            run_options.setdefault("recorder", self.recorder)
+        # The workflow searches with the run's depth (adaptive, map-reduce) and
+        # inside its deadline; its `sources` travel with the state, so a cached
+        # copy can seed another session
+        state = run_research_assistant(
+            query, max_iterations=max_iterations, tenant=tenant, priority=priority, **run_options
+        )
+        state = dict(state, follow_up=False)
+        self.adopt(session.session_id, state)
+        return state
+
+    def _answer(self, session: Session, query: str, instruction: str) -> str:
+        history = "; ".join(turn["query"] for turn in session.turns[-FOLLOW_UP_HISTORY_TURNS:])
+        messages = FOLLOW_UP_PROMPT.format_messages(
+            history=history,
+            findings=session.findings(),
+            sources=build_research_context(query, list(session.sources.values()), FOLLOW_UP_SOURCE_CHARS),
+            question=query,
+            instruction=instruction
+        )
+        response = self.llm.invoke(messages)
+        record_prompt(FOLLOW_UP_PROMPT.name, messages, response.content)
+        return response.content.strip()
+
+    def _follow_up(self, session: Session, query: str, tenant, priority) -> Dict[str, Any]:
+        print(f"\n💬 Follow-up in session {session.session_id[:8]}: {query}")
+        delta_query, new_sources = None, []
+        recording = self.recorder.run(
+            query, follow_up=True, tenant=tenant, priority=priority
+        ) if self.recorder is not None else contextlib.nullcontext()
+        with recording, scheduling(tenant, priority), track_prompts() as tracker:
+            answer = self._answer(session, query, ANSWER_OR_SEARCH)
+            if answer.upper().startswith(SEARCH_PREFIX):
+                delta_query = answer[len(SEARCH_PREFIX):].strip() or query
+                print(f"🔍 Searching only for the missing part: {delta_query}")
+                results = search_sources(self.search_tool, delta_query, FOLLOW_UP_MAX_RESULTS)
+                new_sources = session.add_sources(results)
+                answer = self._answer(session, query, ANSWER_ONLY)
+        print(f"✅ Follow-up answered{' after a delta search' if delta_query else ' from session findings'}")
+
+        session.add_turn(query, answer)
+        return {
+            "query": query,
+            "research_results": [],
+            "critique_feedback": [],
+            "final_summary": answer,
+            "iteration": 0,
+            "max_iterations": 0,
+            "follow_up": True,
+            "searched": delta_query is not None,
+            "delta_query": delta_query,
+            "new_sources": len(new_sources),
+            "prompt_stats": tracker.report(),
+        }
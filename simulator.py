@@ -0,0 +1,507 @@
+"""
+Multi-Agent Research Assistant - Capacity-Planning Simulator
+Discrete-event model of the research workflow against provider rate limits.
+Predicts throughput, queueing delay and 429 rate for a given arrival rate,
+key count and concurrency setting, using per-call token and latency
+distributions fitted from recorded traces (RECORD_TRACE, see replay.py)
+
+Usage:
+    python simulator.py --trace traces/prod.jsonl.gz --arrivals 2 --keys 1 --concurrency 8
+    python simulator.py --trace traces/prod.jsonl.gz --arrivals 1,2,4,8 --keys 1,2 --concurrency 4,auto
+    python simulator.py --trace traces/prod.jsonl.gz --describe
+"""
+
+import argparse
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+from limiter import AdaptiveLimiter
+from prompts import CRITIQUE_FOCUS_PROMPTS, CRITIQUE_PROMPT, ROLLING_SUMMARY_PROMPT, RESEARCH_PROMPT, SUMMARIZE_PROMPT
+from replay import llm_request_key, read_trace
+
+# Groq free tier, per key (RATE_LIMITS.md); RPM is unlimited unless given
+DEFAULT_TPM = 12000
+DEFAULT_MAX_CONCURRENCY = 32
+
+# A 429 is retried once the key's bucket should hold the call, but not sooner than this
+MIN_RETRY_SECONDS = 1.0
+
+# Agents (workflow nodes) whose LLM calls the model distinguishes
+AGENTS = ("research", "critique", "update_summary", "summarize")
+
+# Calls of a typical iteration when no trace is given (RATE_LIMITS.md token budget)
+DEFAULT_CALLS = {
+    "search": (1.0, 0, 0),
+    "research": (1.5, 1750, 800),
+    "critique": (0.8, 1200, 400),
+    "update_summary": (0.8, 1500, 400),
+    "summarize": (1.5, 2000, 800),
+}
+DEFAULT_CONTINUE_PROBABILITY = 0.5
+
+
+class CallSample(NamedTuple):
+    """
+    One recorded LLM or search call
+    """
+    latency: float
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class RateLimited(Exception):
+    """
+    A simulated 429, as the adaptive limiter sees it
+    """
+    status_code = 429
+
+
+def _agent_labels() -> Dict[str, str]:
+    # Trace labels are digests of the system prompt, so each prompt maps back to its node
+    prompts = [(RESEARCH_PROMPT, "research"), (CRITIQUE_PROMPT, "critique"),
+               (ROLLING_SUMMARY_PROMPT, "update_summary"), (SUMMARIZE_PROMPT, "summarize")]
+    prompts += [(prompt, "critique") for prompt in CRITIQUE_FOCUS_PROMPTS.values()]
+    return {
+        llm_request_key(prompt.format_messages(**{field: "" for field in prompt.fields}), {})[1]: agent
+        for prompt, agent in prompts
+    }
+
+
+def _sample(entry: Dict[str, Any]) -> CallSample:
+    # Search responses are result lists and carry no token usage
+    response = entry.get("response")
+    metadata = (response.get("response_metadata") if isinstance(response, dict) else None) or {}
+    usage = metadata.get("token_usage") or {}
+    prompt = usage.get("prompt_tokens") or 0
+    completion = usage.get("completion_tokens") or max(0, (usage.get("total_tokens") or 0) - prompt)
+    return CallSample(entry["latency"], prompt, completion)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Nearest-rank percentile (0 for no values)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Workload:
+    """
+    What a research run asks of the providers
+
+    Holds empirical per-node call samples (latency with its prompt and
+    completion tokens, drawn jointly) and the probability that should_continue
+    loops back to research after a critique, given iterations remain.
+    """
+
+    def __init__(
+        self,
+        calls: Dict[str, List[CallSample]],
+        continue_probability: float = DEFAULT_CONTINUE_PROBABILITY,
+        max_iterations: int = 2,
+        runs: int = 0,
+        ignored: int = 0
+    ):
+        """
+        Args:
+            calls: Samples per node ("search" and AGENTS); missing nodes use DEFAULT_CALLS
+            continue_probability: Chance of another research round after a critique
+            max_iterations: Research-critique cycles allowed per run
+            runs: Recorded runs the samples came from (0 for defaults)
+            ignored: Recorded calls outside the modelled workflow
+        """
+        self.calls = {
+            node: list(calls.get(node) or [CallSample(*DEFAULT_CALLS[node])])
+            for node in ("search",) + AGENTS
+        }
+        self.continue_probability = continue_probability
+        self.max_iterations = max_iterations
+        self.runs = runs
+        self.ignored = ignored
+
+    @classmethod
+    def fit(cls, entries: Sequence[Dict[str, Any]], max_iterations: Optional[int] = None) -> "Workload":
+        """
+        Fit a workload to trace entries (from replay.read_trace)
+
+        Args:
+            entries: Recorded runs and calls
+            max_iterations: Override the iterations recorded with the runs
+
+        Returns:
+            The fitted workload
+        """
+        labels = _agent_labels()
+        calls: Dict[str, List[CallSample]] = {node: [] for node in ("search",) + AGENTS}
+        rounds: Dict[str, int] = {}
+        ignored = 0
+        for entry in entries:
+            if entry["type"] == "search":
+                calls["search"].append(_sample(entry))
+            elif entry["type"] == "llm":
+                agent = labels.get(entry["label"])
+                if agent is None:
+                    ignored += 1
+                    continue
+                calls[agent].append(_sample(entry))
+                if agent == "research":
+                    rounds[entry.get("run")] = rounds.get(entry.get("run"), 0) + 1
+
+        # Session follow-ups are recorded as runs too, but are not workflow runs
+        runs = [e for e in entries if e["type"] == "run" and not (e.get("settings") or {}).get("follow_up")]
+        limits = {run["id"]: (run.get("settings") or {}).get("max_iterations") for run in runs}
+        continued = decided = 0
+        for run_id, iterations in rounds.items():
+            limit = limits.get(run_id) or iterations
+            # Each critique before the last round chose to continue; the last one
+            # chose to stop, which was only a choice if iterations remained
+            continued += iterations - 1
+            decided += iterations - 1 + (iterations < limit)
+
+        if max_iterations is None:
+            recorded = [limit for limit in limits.values() if limit]
+            max_iterations = max(set(recorded), key=recorded.count) if recorded else 2
+        return cls(
+            calls,
+            continued / decided if decided else DEFAULT_CONTINUE_PROBABILITY,
+            max_iterations,
+            runs=len(runs),
+            ignored=ignored
+        )
+
+    @classmethod
+    def load(cls, path: str, max_iterations: Optional[int] = None) -> "Workload":
+        """
+        Fit a workload to a trace file
+        """
+        return cls.fit(list(read_trace(path)), max_iterations)
+
+    def sample(self, node: str, rng: random.Random) -> CallSample:
+        return rng.choice(self.calls[node])
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Fitted parameters: per-node sample count, latency and token means
+        """
+        nodes = {}
+        for node, samples in self.calls.items():
+            nodes[node] = {
+                "samples": len(samples),
+                "p50_latency": percentile([s.latency for s in samples], 50),
+                "p95_latency": percentile([s.latency for s in samples], 95),
+                "mean_tokens": sum(s.prompt_tokens + s.completion_tokens for s in samples) / len(samples),
+            }
+        return {
+            "runs": self.runs,
+            "ignored_calls": self.ignored,
+            "max_iterations": self.max_iterations,
+            "continue_probability": self.continue_probability,
+            "nodes": nodes,
+        }
+
+
+class _Key:
+    """
+    One API key: token and request buckets that refill continuously
+    """
+
+    def __init__(self, tpm: float, rpm: Optional[float]):
+        self.tpm = tpm
+        self.rpm = rpm
+        self.tokens = float(tpm)
+        self.requests = float(rpm) if rpm else float("inf")
+        self.updated = 0.0
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        if self.rpm:
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.updated = now
+
+    def wait_for(self, tokens: float) -> float:
+        """
+        Seconds until this key could take a call of `tokens`
+        """
+        waits = [max(0.0, (tokens - self.tokens) * 60 / self.tpm)]
+        if self.rpm:
+            waits.append(max(0.0, (1 - self.requests) * 60 / self.rpm))
+        return max(waits)
+
+
+class _Call:
+    __slots__ = ("run", "node", "rest", "sample", "queued", "started", "epoch")
+
+    def __init__(self, run, branch: List[str], sample: CallSample, now: float):
+        self.run = run
+        self.node, self.rest = branch[0], branch[1:]
+        self.sample = sample
+        self.queued = now
+        self.started = 0.0
+        self.epoch = 0
+
+
+class _Run:
+    __slots__ = ("arrival", "steps", "pending", "finished", "iterations")
+
+    def __init__(self, arrival: float):
+        self.arrival = arrival
+        self.steps: Optional[Iterator[List[List[str]]]] = None
+        self.pending = 0
+        self.finished: Optional[float] = None
+        self.iterations = 0
+
+
+class Simulator:
+    """
+    Discrete-event simulation of research runs sharing keys and a scheduler
+
+    Runs arrive as a Poisson process and walk the nodes of
+    create_research_workflow: research (search, then LLM), critique, and
+    either another round (research alongside update_summary) with the fitted
+    probability, or summarize. Every call waits for a scheduler slot (fixed,
+    or sized by the real AdaptiveLimiter for "auto"); LLM calls then go to the
+    key with the most tokens left, as KeyPool does. A call the key cannot
+    take is a 429 and retries, holding its slot, once the bucket has refilled.
+    """
+
+    def __init__(
+        self,
+        workload: Workload,
+        keys: int = 1,
+        concurrency: Union[int, str] = "auto",
+        tpm: float = DEFAULT_TPM,
+        rpm: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        seed: int = 42
+    ):
+        """
+        Args:
+            workload: Fitted call distributions and loop probability
+            keys: API keys sharing the load
+            concurrency: Scheduler slots, or "auto" for the adaptive limiter
+            tpm: Tokens per minute per key
+            rpm: Requests per minute per key (None: unlimited)
+            max_iterations: Override the workload's iterations per run
+            seed: Random seed; equal seeds give identical results
+        """
+        self.workload = workload
+        self.keys = keys
+        self.concurrency = concurrency
+        self.tpm = tpm
+        self.rpm = rpm
+        self.max_iterations = max_iterations or workload.max_iterations
+        self.seed = seed
+
+    def _steps(self, rng: random.Random, run: _Run) -> Iterator[List[List[str]]]:
+        # Each step is a list of branches that run in parallel; a branch is a call sequence
+        yield [["search", "research"]]
+        run.iterations = 1
+        while True:
+            yield [["critique"]]
+            if run.iterations < self.max_iterations and rng.random() < self.workload.continue_probability:
+                run.iterations += 1
+                yield [["search", "research"], ["update_summary"]]
+            else:
+                yield [["summarize"]]
+                return
+
+    def run(self, arrivals_per_minute: float, minutes: float = 60.0, warmup_minutes: float = 5.0) -> Dict[str, Any]:
+        """
+        Simulate a period of steady arrivals
+
+        Args:
+            arrivals_per_minute: Mean research runs started per minute
+            minutes: Measured period (simulated time)
+            warmup_minutes: Simulated time before measuring, so queues reach steady state
+
+        Returns:
+            Throughput, run latency, queueing delay, 429 rate, key utilization
+            and backlog over the measured period
+        """
+        rng = random.Random(self.seed)
+        limiter = AdaptiveLimiter(max_limit=DEFAULT_MAX_CONCURRENCY) if self.concurrency == "auto" else None
+        keys = [_Key(self.tpm, self.rpm) for _ in range(self.keys)]
+        events: List[tuple] = []
+        order = itertools.count()
+        queue: Deque[_Call] = deque()
+        now = [0.0]
+        in_flight = [0]
+        start, end = warmup_minutes * 60, (warmup_minutes + minutes) * 60
+        runs: List[_Run] = []
+        counts = {"llm_attempts": 0, "rate_limited": 0, "tokens": 0}
+        waits: List[float] = []
+        limits: List[int] = []
+
+        def at(when: float, action: Callable[[], None]):
+            heapq.heappush(events, (when, next(order), action))
+
+        def limit() -> int:
+            return limiter.limit if limiter is not None else int(self.concurrency)
+
+        def dispatch():
+            while queue and in_flight[0] < limit():
+                call = queue.popleft()
+                in_flight[0] += 1
+                call.started = now[0]
+                call.epoch = limiter.epoch if limiter is not None else 0
+                if start <= call.queued < end:
+                    waits.append(now[0] - call.queued)
+                if call.node == "search":
+                    at(now[0] + call.sample.latency, lambda c=call: finish(c))
+                else:
+                    attempt(call)
+
+        def attempt(call: _Call):
+            # A call bigger than a whole minute's quota would never fit; count it as a full minute
+            needed = min(call.sample.prompt_tokens + call.sample.completion_tokens, self.tpm)
+            for key in keys:
+                key.refill(now[0])
+            # The key that can take the call soonest, then the one with the most tokens left
+            key = min(keys, key=lambda k: (k.wait_for(needed), -k.tokens))
+            measured = start <= call.queued < end
+            counts["llm_attempts"] += measured
+            if key.tokens >= needed and key.requests >= 1:
+                key.tokens -= needed
+                key.requests -= 1
+                counts["tokens"] += needed if measured else 0
+                at(now[0] + call.sample.latency, lambda: finish(call))
+                return
+            counts["rate_limited"] += measured
+            if limiter is not None:
+                limiter.record(call.epoch, now[0] - call.started + 0.01, RateLimited(), in_flight[0], "llm")
+                call.epoch = limiter.epoch
+            retry = max(MIN_RETRY_SECONDS, min(k.wait_for(needed) for k in keys))
+            at(now[0] + retry, lambda: attempt(call))
+
+        def finish(call: _Call):
+            if limiter is not None:
+                kind = "search" if call.node == "search" else "llm"
+                limiter.record(call.epoch, now[0] - call.started, None, in_flight[0], kind)
+            in_flight[0] -= 1
+            if call.rest:
+                submit(call.run, call.rest)
+            else:
+                call.run.pending -= 1
+                if call.run.pending == 0:
+                    advance(call.run)
+            dispatch()
+
+        def submit(run: _Run, branch: List[str]):
+            queue.append(_Call(run, branch, self.workload.sample(branch[0], rng), now[0]))
+
+        def advance(run: _Run):
+            branches = next(run.steps, None)
+            if branches is None:
+                run.finished = now[0]
+                return
+            run.pending = len(branches)
+            for branch in branches:
+                submit(run, branch)
+            dispatch()
+
+        def arrive():
+            run = _Run(now[0])
+            run.steps = self._steps(rng, run)
+            runs.append(run)
+            advance(run)
+            if arrivals_per_minute > 0:
+                at(now[0] + rng.expovariate(arrivals_per_minute / 60), arrive)
+
+        def sample_limit():
+            limits.append(limit())
+            at(now[0] + 1.0, sample_limit)
+
+        if arrivals_per_minute > 0:
+            at(rng.expovariate(arrivals_per_minute / 60), arrive)
+        at(start, sample_limit)
+        while events and events[0][0] <= end:
+            now[0], _, action = heapq.heappop(events)
+            action()
+
+        finished = [r for r in runs if r.finished is not None and start <= r.finished <= end]
+        latencies = [r.finished - r.arrival for r in finished]
+        window = end - start
+        return {
+            "runs_per_min": len(finished) * 60 / window,
+            "p50_run_s": percentile(latencies, 50),
+            "p95_run_s": percentile(latencies, 95),
+            "p50_wait_s": percentile(waits, 50),
+            "p95_wait_s": percentile(waits, 95),
+            "rate_429": counts["rate_limited"] / counts["llm_attempts"] if counts["llm_attempts"] else 0.0,
+            "key_util": counts["tokens"] * 60 / window / (self.tpm * self.keys),
+            "iterations": sum(r.iterations for r in finished) / len(finished) if finished else 0.0,
+            "backlog": sum(1 for r in runs if r.finished is None),
+            "mean_limit": sum(limits) / len(limits) if limits else float(limit()),
+        }
+
+
+def _parse_list(value: str, cast: Callable[[str], Any]) -> List[Any]:
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def _concurrency(value: str) -> Union[int, str]:
+    return value if value == "auto" else int(value)
+
+
+def print_results(title: str, rows: List[Dict[str, Any]]):
+    """
+    Print simulation rows as an aligned table
+    """
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print(f"\n{title}")
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in cells:
+        print("  ".join(value.ljust(w) for value, w in zip(row, widths)))
+
+
+def main():
+    """
+    Simulator CLI entry point
+    """
+    parser = argparse.ArgumentParser(description="Predict throughput, queueing and 429s of research runs")
+    parser.add_argument("--trace", help="Recorded trace to fit (default: RATE_LIMITS.md token budget)")
+    parser.add_argument("--arrivals", default="1,2,4", help="Runs started per minute (comma-separated to sweep)")
+    parser.add_argument("--keys", default="1", help="API keys (comma-separated to sweep)")
+    parser.add_argument("--concurrency", default="auto", help="Scheduler slots or 'auto' (comma-separated to sweep)")
+    parser.add_argument("--tpm", type=float, default=DEFAULT_TPM, help="Tokens per minute per key")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute per key (default: unlimited)")
+    parser.add_argument("--max-iterations", type=int, default=None, help="Override the recorded iterations")
+    parser.add_argument("--minutes", type=float, default=60.0, help="Simulated minutes measured")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Simulated minutes before measuring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--describe", action="store_true", help="Only print the fitted workload")
+    args = parser.parse_args()
+
+    workload = Workload.load(args.trace, args.max_iterations) if args.trace else Workload({})
+    fitted = workload.describe()
+    source = f"{args.trace} ({fitted['runs']} runs)" if args.trace else "RATE_LIMITS.md defaults"
+    print(f"📈 Workload from {source}: continue probability {fitted['continue_probability']:.2f}, "
+          f"max {workload.max_iterations} iterations")
+    if args.describe:
+        print_results("Fitted calls", [{"node": node, **stats} for node, stats in fitted["nodes"].items()])
+        return
+
+    rows = []
+    began = time.perf_counter()
+    for keys, concurrency, arrivals in itertools.product(
+        _parse_list(args.keys, int), _parse_list(args.concurrency, _concurrency), _parse_list(args.arrivals, float)
+    ):
+        simulator = Simulator(workload, keys, concurrency, args.tpm, args.rpm, args.max_iterations, args.seed)
+        rows.append({"keys": keys, "concurrency": concurrency, "arrivals_per_min": arrivals,
+                     **simulator.run(arrivals, args.minutes, args.warmup)})
+    print_results(f"{args.minutes:g} simulated minutes per row, {args.tpm:g} TPM per key", rows)
+    print(f"\n⏱️ Simulated {len(rows)} scenarios in {time.perf_counter() - began:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,10 @@ Run with: python -m pytest test_agents.py
 
 import pytest
 from unittest.mock import Mock, patch
-from agents import AgentState, ResearchAgent, CritiqueAgent, SummarizeAgent, should_continue
+from agents import (
+    AgentState, ResearchAgent, CritiqueAgent, SummarizeAgent, should_continue,
+    create_research_workflow, join_truncated, merge_critiques, run_research_assistant
+)
 
 
 class TestAgentState:
@@ -122,6 +125,49 @@ class TestSummarizeAgent:
         
         # Assertions
         assert result["final_summary"] == "Final summary"
+    
+    def test_final_prompt_uses_running_summary(self):
+        """Test that earlier rounds come from the running summary, not the raw results"""
+        agent = SummarizeAgent(Mock())
+        agent.llm.invoke.return_value = Mock(content="Final summary")
+        state = {
+            "query": "Test query",
+            "research_results": ["First round", "Second round", "Third round"],
+            "critique_feedback": ["First critique", "Second critique", "Third critique"],
+            "running_summary": "Rolling summary",
+            "iteration": 3,
+            "max_iterations": 3
+        }
+        
+        agent.execute(state)
+        
+        prompt = agent.llm.invoke.call_args[0][0][1].content
+        assert "Rolling summary" in prompt and "Third round" in prompt and "Third critique" in prompt
+        assert "First round" not in prompt and "Second critique" not in prompt
+    
+    def test_running_summary_keeps_final_cost_flat(self):
+        """Test that the final prompt does not grow with the number of iterations"""
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="There is a gap. " * 40)
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        workflow = create_research_workflow(mock_llm, mock_search)
+        
+        final_tokens = []
+        for iterations in (2, 4):
+            result = run_research_assistant("Test query", max_iterations=iterations, workflow=workflow)
+            calls = result["prompt_stats"]["calls"]
+            assert [c["agent"] for c in calls].count("rolling_summary") == iterations - 1
+            final_tokens.append(calls[-1]["prompt_tokens"])
+        
+        assert final_tokens[0] == final_tokens[1]
+    
+    def test_join_truncated_matches_join_then_slice(self):
+        """Test that truncated joins equal slicing the full join"""
+        parts = ["a" * 10, "b" * 10, "c" * 10]
+        
+        for limit in (0, 5, 11, 12, 25, 100):
+            assert join_truncated(parts, limit) == "\n\n".join(parts)[:limit]
 
 
 class TestWorkflowLogic:
@@ -168,6 +214,344 @@ class TestWorkflowLogic:
         
         result = should_continue(state)
         assert result == "summarize"
+    
+    def test_should_continue_verdict_overrides_wording(self):
+        """Test that a VERDICT line decides over gap wording, in both directions"""
+        state = {
+            "query": "Test",
+            "research_results": [],
+            "critique_feedback": ["No significant gaps; more research is not needed.\nVERDICT: DONE"],
+            "final_summary": "",
+            "iteration": 1,
+            "max_iterations": 3
+        }
+        assert should_continue(state) == "summarize"
+        
+        state["critique_feedback"] = ["The cost figures contradict the sources.\nVERDICT: CONTINUE"]
+        assert should_continue(state) == "research"
+
+
+class TestParallelWorkflow:
+    """Test the fan-out/fan-in workflow variants"""
+    
+    def _clients(self, critique_text="Needs more research."):
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content=critique_text)
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        return mock_llm, mock_search
+    
+    def test_merge_critiques_orders_parts(self):
+        """Test that focused critiques merge into one feedback entry"""
+        state = {"critique_parts": ["Coverage: c", "Factuality: f", "Recency: r"]}
+        
+        result = merge_critiques(state)
+        
+        assert result["critique_feedback"] == ["Factuality: f\n\nRecency: r\n\nCoverage: c"]
+        assert result["critique_parts"] is None
+    
+    def test_parallel_critique_workflow(self):
+        """Test that parallel critiques produce one merged entry per round"""
+        mock_llm, mock_search = self._clients()
+        workflow = create_research_workflow(mock_llm, mock_search, parallel_critique=True)
+        
+        result = run_research_assistant("Test query", max_iterations=2, workflow=workflow)
+        
+        assert len(result["research_results"]) == 2
+        assert len(result["critique_feedback"]) == 2
+        assert result["critique_feedback"][0].startswith("Factuality:")
+        assert "critique_parts" not in result
+        # 2 research + 2 x 3 critiques + 1 running summary update + 1 summary
+        assert mock_llm.invoke.call_count == 10
+    
+    def test_speculative_search_reuses_prefetch(self):
+        """Test that a prefetched search replaces the next iteration's search"""
+        mock_llm, mock_search = self._clients()
+        workflow = create_research_workflow(mock_llm, mock_search, speculative_search=True)
+        
+        result = run_research_assistant("Test query", max_iterations=2, workflow=workflow)
+        
+        assert result["iteration"] == 2
+        # Initial search + one prefetch consumed by iteration 2; none after the last round
+        assert mock_search.invoke.call_count == 2
+        assert "prefetched_results" not in result
+    
+    def test_speculative_summary_accepts_clean_draft(self):
+        """Test that a draft is used directly when the critique raises no issues"""
+        mock_llm, mock_search = self._clients("Looks good")
+        workflow = create_research_workflow(mock_llm, mock_search, speculative_summary=True)
+        
+        result = run_research_assistant("Test query", max_iterations=1, workflow=workflow)
+        
+        assert result["speculation"] == "accepted"
+        assert result["final_summary"] == "Looks good"
+        # research + critique + draft, no separate summarize call
+        assert mock_llm.invoke.call_count == 3
+    
+    def test_speculative_summary_revises_on_issues(self):
+        """Test that a flagged critique triggers the short revise pass"""
+        agent = SummarizeAgent(Mock())
+        agent.llm.invoke.return_value = Mock(content="Revised summary")
+        state = {
+            "query": "Test query",
+            "research_results": ["Research result"],
+            "critique_feedback": ["Some figures are outdated.\nVERDICT: CONTINUE"],
+            "draft_summary": "Draft summary",
+            "iteration": 1,
+            "max_iterations": 1
+        }
+        
+        result = agent.execute(state)
+        
+        assert result == {"final_summary": "Revised summary", "speculation": "revised"}
+        prompt = agent.llm.invoke.call_args[0][0][1].content
+        assert "Draft summary" in prompt and "Research result" not in prompt
+    
+    def test_speculation_hit_rate_on_realistic_critiques(self):
+        """Test that critiques discussing errors or gaps keep the draft unless their verdict says otherwise"""
+        critiques = [
+            "The research is accurate and well sourced. No claims look inaccurate, unsupported, or "
+            "contradictory, and there are no significant gaps.\nVERDICT: DONE",
+            "Mostly accurate. One minor error: the 2023 figure is rounded. Nothing important is "
+            "missing for this query.\nVERDICT: DONE",
+            "Coverage is good; the only gap is historical background, which the query does not ask "
+            "about.\n\n**Verdict:** DONE",
+            "The efficiency figures are outdated and contradict the cited 2024 study; the cost "
+            "comparison is missing.\nVERDICT: CONTINUE",
+        ]
+        outcomes = []
+        for critique in critiques:
+            def respond(messages, **kwargs):
+                is_critique = "critical analyst" in messages[0].content
+                return Mock(content=critique if is_critique else "Draft summary")
+            mock_llm, mock_search = self._clients()
+            mock_llm.invoke.side_effect = respond
+            workflow = create_research_workflow(mock_llm, mock_search, speculative_summary=True)
+            
+            outcomes.append(run_research_assistant("Test query", max_iterations=1, workflow=workflow)["speculation"])
+        
+        assert outcomes == ["accepted", "accepted", "accepted", "revised"]
+    
+    def test_speculation_agrees_with_should_continue(self):
+        """Test that a critique without a verdict revises the draft exactly when it would have looped"""
+        agent = SummarizeAgent(Mock())
+        agent.llm.invoke.return_value = Mock(content="Revised summary")
+        for critique, outcome in (("There is a gap in coverage.", "revised"), ("Looks good", "accepted")):
+            state = {
+                "query": "Test query",
+                "research_results": ["Research result"],
+                "critique_feedback": [critique],
+                "draft_summary": "Draft summary",
+                "iteration": 1,
+                "max_iterations": 2
+            }
+            expected = "research" if outcome == "revised" else "summarize"
+            assert should_continue(state) == expected
+            assert agent.execute(dict(state, iteration=2))["speculation"] == outcome
+
+
+class TestDeadline:
+    """Test deadline-aware execution"""
+    
+    def test_should_continue_stops_when_time_is_short(self):
+        """Test that no further iteration starts close to the deadline"""
+        import time
+        state = {
+            "query": "Test",
+            "research_results": [],
+            "critique_feedback": ["More research needed"],
+            "final_summary": "",
+            "iteration": 1,
+            "max_iterations": 3,
+            "deadline_at": time.monotonic() + 1
+        }
+        
+        assert should_continue(state) == "summarize"
+    
+    def test_fast_mode_switches_model(self):
+        """Test that the research agent uses the fast model near the deadline"""
+        import time
+        slow_llm, fast_llm = Mock(), Mock()
+        fast_llm.invoke.return_value = Mock(content="Fast research")
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        agent = ResearchAgent(slow_llm, mock_search, fast_llm)
+        state = {
+            "query": "Test query",
+            "research_results": [],
+            "critique_feedback": [],
+            "iteration": 0,
+            "max_iterations": 2,
+            "deadline_at": time.monotonic() + 5
+        }
+        
+        result = agent.execute(state)
+        
+        assert result["research_results"] == ["Fast research"]
+        assert result["degraded"] == ["research_fast_mode"]
+        assert slow_llm.invoke.call_count == 0
+        assert "timeout" in fast_llm.invoke.call_args.kwargs
+    
+    def test_deadline_returns_partial_summary(self):
+        """Test that a slow run returns its best partial result on time"""
+        import threading
+        import time
+        release = threading.Event()
+        
+        def slow_invoke(messages, **kwargs):
+            if "synthesis expert" in messages[0].content:
+                release.wait(3)
+            return Mock(content="Partial research")
+        
+        mock_llm = Mock()
+        mock_llm.invoke.side_effect = slow_invoke
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        workflow = create_research_workflow(mock_llm, mock_search)
+        
+        threads = set(threading.enumerate())
+        start = time.monotonic()
+        result = run_research_assistant("Test query", max_iterations=1, workflow=workflow, deadline=1.0)
+        
+        assert time.monotonic() - start < 1.5
+        assert result["final_summary"] == "Partial research"
+        assert "partial" in result["degraded"]
+        
+        # Let the abandoned run finish now, so its prints do not land in a later test's output
+        release.set()
+        for thread in set(threading.enumerate()) - threads:
+            thread.join(timeout=2)
+
+
+class TestMapReduce:
+    """Test map-reduce research over many sources"""
+    
+    TOPICS = ["solar panels", "wind turbines", "battery storage", "hydrogen fuel", "nuclear fusion",
+              "geothermal wells", "tidal energy", "biomass plants", "grid software", "heat pumps",
+              "carbon capture", "electric ferries"]
+    
+    def _search(self):
+        mock_search = Mock()
+        mock_search.invoke.return_value = [
+            {"url": f"https://example.com/{i}", "content": f"Report {i} covers {topic} in depth with new data."}
+            for i, topic in enumerate(self.TOPICS)
+        ]
+        return mock_search
+    
+    def _state(self):
+        return {
+            "query": "Test query",
+            "research_results": [],
+            "critique_feedback": [],
+            "iteration": 0,
+            "max_iterations": 1
+        }
+    
+    def test_sources_condensed_then_reduced(self):
+        """Test that each source gets a capped map call and irrelevant ones are dropped"""
+        main_llm, map_llm = Mock(), Mock()
+        main_llm.invoke.return_value = Mock(content="Merged research")
+        map_llm.invoke.side_effect = lambda messages, **kwargs: Mock(
+            content="NONE" if "Report 3 " in messages[1].content else "- key fact"
+        )
+        agent = ResearchAgent(main_llm, self._search(), map_llm, map_reduce=True)
+        
+        result = agent.execute(self._state())
+        
+        assert result["research_results"] == ["Merged research"]
+        # Ten sources by default, each in its own short call
+        assert map_llm.invoke.call_count == 10
+        assert all(call.kwargs["max_tokens"] == 200 for call in map_llm.invoke.call_args_list)
+        prompt = main_llm.invoke.call_args[0][0][1].content
+        assert "Source 1: - key fact" in prompt and "Source 4:" not in prompt
+    
+    def test_map_calls_run_in_parallel(self):
+        """Test that ten slow map calls take about as long as one"""
+        import time
+        
+        def slow_invoke(messages, **kwargs):
+            time.sleep(0.1)
+            return Mock(content="- key fact")
+        
+        mock_llm = Mock()
+        mock_llm.invoke.side_effect = slow_invoke
+        agent = ResearchAgent(mock_llm, self._search(), map_reduce=True)
+        
+        start = time.monotonic()
+        agent.execute(self._state())
+        
+        # 10 map calls + 1 reduce call at 0.1s each
+        assert time.monotonic() - start < 0.6
+    
+    def test_map_calls_tracked_in_workflow(self):
+        """Test that map calls made in pool threads are still tracked for the run"""
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="Test response")
+        workflow = create_research_workflow(mock_llm, self._search(), map_reduce=True)
+        
+        result = run_research_assistant("Test query", max_iterations=1, workflow=workflow)
+        
+        agents = [call["agent"] for call in result["prompt_stats"]["calls"]]
+        assert agents.count("extract") == 10
+        assert agents[-1] == "summarize"
+
+
+class TestLLMProviders:
+    """Test pluggable LLM backends"""
+    
+    def test_stub_model_is_deterministic(self):
+        """Test that the stub returns the same answer for the same prompt"""
+        from agents import StubChatModel
+        
+        model = StubChatModel()
+        first = model.invoke("Explain quantum computing in detail.", max_tokens=2)
+        
+        assert first.content == model.invoke("Explain quantum computing in detail.").content[:len(first.content)]
+        assert len(first.content) <= len("[stub 00000000] ") + 8
+        assert first.response_metadata["token_usage"]["total_tokens"] > 0
+    
+    def test_local_model_speaks_openai_protocol(self):
+        """Test the OpenAI-compatible client against a local HTTP server"""
+        from langchain_core.messages import HumanMessage, SystemMessage
+        from agents import LocalChatModel, StubChatModel
+        from benchmark import serve_openai_stub
+        
+        server, url = serve_openai_stub(StubChatModel())
+        try:
+            response = LocalChatModel(base_url=url).invoke(
+                [SystemMessage(content="You are terse."), HumanMessage(content="Hello there")],
+                max_tokens=64
+            )
+        finally:
+            server.shutdown()
+        
+        assert response.content.startswith("[stub ")
+        assert response.content.endswith("Hello there")
+        assert response.response_metadata["token_usage"]["total_tokens"] > 0
+    
+    def test_provider_selected_per_agent(self, monkeypatch):
+        """Test that <AGENT>_LLM picks the backend for one agent only"""
+        from agents import StubChatModel, get_llm, llm
+        monkeypatch.setenv("CRITIQUE_LLM", "stub")
+        monkeypatch.delenv("LLM_PROVIDER", raising=False)
+        
+        assert isinstance(get_llm(agent="critique"), StubChatModel)
+        assert get_llm(agent="research") is llm
+        with pytest.raises(ValueError):
+            get_llm("openai")
+    
+    def test_workflow_model_overrides(self):
+        """Test that a per-agent override replaces only that agent's model"""
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="Test response")
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        
+        workflow = create_research_workflow(mock_llm, mock_search, models={"critique": "stub"})
+        result = run_research_assistant("Test query", max_iterations=1, workflow=workflow)
+        
+        assert result["critique_feedback"][0].startswith("[stub ")
+        assert mock_llm.invoke.call_count == 2
 
 
 class TestUtils:
@@ -183,6 +567,171 @@ class TestUtils:
         assert isinstance(validation, dict)
         assert "groq" in validation
         assert "tavily" in validation
+    
+    def test_markdown_report_streams_sections(self):
+        """Test streaming Markdown export matches the report layout"""
+        import io
+        from utils import iter_markdown_report, write_markdown_report
+        
+        result = {
+            "query": "Test query",
+            "final_summary": "Final summary",
+            "research_results": ["Finding one", "Finding two"],
+            "critique_feedback": ["Critique one"],
+            "iteration": 2,
+            "max_iterations": 2
+        }
+        
+        chunks = list(iter_markdown_report(result))
+        assert len(chunks) > 1
+        
+        buffer = io.StringIO()
+        written = write_markdown_report(result, buffer)
+        report = buffer.getvalue()
+        
+        assert written == len(report)
+        assert "### Research Iteration 2\n\nFinding two" in report
+        assert "### Critique Round 1\n\nCritique one" in report
+        assert "- **Research Rounds**: 2" in report
+    
+    def test_bulk_export_all_formats(self, tmp_path):
+        """Test bulk export writes Markdown, HTML and JSONL in one pass"""
+        import json
+        from utils import bulk_export
+        
+        results = [
+            {"query": f"Query {i}", "final_summary": "<b>Summary</b>",
+             "research_results": ["Finding"], "critique_feedback": ["Critique"]}
+            for i in range(3)
+        ]
+        
+        summary = bulk_export(results, output_dir=str(tmp_path))
+        
+        assert summary["count"] == 3
+        assert len(summary["md"]) == 3
+        assert len(summary["html"]) == 3
+        assert "&lt;b&gt;Summary&lt;/b&gt;" in open(summary["html"][0], encoding="utf-8").read()
+        
+        with open(summary["jsonl"], encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["query"] for line in lines] == ["Query 0", "Query 1", "Query 2"]
+    
+    def test_bulk_export_never_overwrites(self, tmp_path):
+        """Test that same-stem inputs and repeated exports get unique filenames"""
+        import json
+        from utils import bulk_export
+        
+        for directory, name in (("a", "research_result_1.json"), ("b", "research_result_1.json.gz")):
+            tmp_path.joinpath(directory).mkdir()
+            tmp_path.joinpath(directory, name).write_text(json.dumps({"query": f"Query from {directory}"}))
+        paths = [str(tmp_path / "a" / "research_result_1.json"), str(tmp_path / "b" / "research_result_1.json.gz")]
+        
+        first = bulk_export(paths, output_dir=str(tmp_path / "out"))
+        second = bulk_export(paths, output_dir=str(tmp_path / "out"))
+        
+        written = first["md"] + second["md"]
+        assert len(set(written)) == 4
+        assert ["Query from b" in open(p, encoding="utf-8").read() for p in first["md"]] == [False, True]
+        assert first["jsonl"] != second["jsonl"]
+    
+    def test_bulk_export_rejects_unknown_format(self, tmp_path):
+        """Test bulk export validates requested formats"""
+        from utils import bulk_export
+        
+        with pytest.raises(ValueError):
+            bulk_export([], output_dir=str(tmp_path), formats=("pdf",))
+
+
+
+class TestStorage:
+    """Test compressed result storage"""
+    
+    RESULT = {
+        "query": "Test query",
+        "final_summary": "Summary sentence. " * 50,
+        "research_results": ["Finding sentence. " * 50],
+        "critique_feedback": ["Critique"],
+        "iteration": 1,
+        "max_iterations": 2
+    }
+    
+    def test_gzip_round_trip(self, tmp_path, monkeypatch):
+        """Test that gzip results are smaller and load transparently"""
+        from utils import GZIP_MAGIC, load_research_result, save_research_result
+        monkeypatch.chdir(tmp_path)
+        
+        plain = save_research_result(self.RESULT, "research_result_1.json")
+        packed = save_research_result(self.RESULT, "research_result_2.json.gz", compression="gzip")
+        
+        assert open(packed, "rb").read(2) == GZIP_MAGIC
+        assert tmp_path.joinpath(packed).stat().st_size < tmp_path.joinpath(plain).stat().st_size / 5
+        assert load_research_result(packed)["final_summary"] == self.RESULT["final_summary"]
+    
+    def test_zstd_with_dictionary(self, tmp_path, monkeypatch):
+        """Test zstd saves with a trained dictionary"""
+        pytest.importorskip("zstandard")
+        from utils import load_research_result, save_research_result, train_zstd_dictionary
+        monkeypatch.chdir(tmp_path)
+        
+        for i in range(100):
+            save_research_result(dict(self.RESULT, query=f"Query {i} about topic {i * 7}"),
+                                 f"research_result_{i:03d}.json")
+        train_zstd_dictionary("results", size=4096)
+        path = save_research_result(self.RESULT, "research_result_new.json.zst", compression="zstd")
+        
+        assert load_research_result(path)["final_summary"] == self.RESULT["final_summary"]
+        assert load_research_result(path)["iterations"] == 1
+    
+    def test_retrained_dictionary_keeps_old_files_readable(self, tmp_path, monkeypatch):
+        """Test that files saved with an earlier dictionary load, and migrate moves them to the new one"""
+        zstd = pytest.importorskip("zstandard")
+        from utils import load_research_result, migrate_results, save_research_result, train_zstd_dictionary
+        monkeypatch.chdir(tmp_path)
+        
+        def train(topic):
+            for i in range(100):
+                save_research_result(dict(self.RESULT, query=f"{topic} question {i} about {i * 7}"),
+                                     f"research_result_{topic}_{i:03d}.json")
+            train_zstd_dictionary("results", size=4096)
+        
+        train("solar")
+        old = save_research_result(self.RESULT, "research_result_old.json.zst", compression="zstd")
+        old_id = zstd.get_frame_parameters(open(old, "rb").read()).dict_id
+        train("battery")
+        
+        assert load_research_result(old)["final_summary"] == self.RESULT["final_summary"]
+        
+        stats = migrate_results("results", "zstd", keep=True)
+        new_id = zstd.get_frame_parameters(open(old, "rb").read()).dict_id
+        assert old_id and new_id and new_id != old_id
+        assert stats["files"] == 201  # 200 .json copies plus the re-encoded .zst
+        assert load_research_result(old)["query"] == "Test query"
+        assert migrate_results("results", "zstd", keep=True)["files"] == 200
+    
+    def test_migrate_results(self, tmp_path, monkeypatch):
+        """Test that migration re-encodes files and removes the originals"""
+        from utils import load_research_result, migrate_results, save_research_result
+        monkeypatch.chdir(tmp_path)
+        save_research_result(self.RESULT, "research_result_1.json")
+        
+        stats = migrate_results("results", "gzip")
+        
+        assert stats["files"] == 1
+        assert stats["bytes_after"] < stats["bytes_before"]
+        assert [p.name for p in tmp_path.joinpath("results").glob("research_result_*")] == ["research_result_1.json.gz"]
+        assert load_research_result("results/research_result_1.json.gz")["query"] == "Test query"
+    
+    def test_bulk_export_compressed_jsonl(self, tmp_path):
+        """Test gzip-compressed JSONL exports"""
+        import gzip
+        import json
+        from utils import bulk_export
+        
+        summary = bulk_export([self.RESULT], output_dir=str(tmp_path), formats=("jsonl",), compression="gzip")
+        
+        assert summary["jsonl"].endswith(".jsonl.gz")
+        with gzip.open(summary["jsonl"], "rt", encoding="utf-8") as f:
+            assert json.loads(f.readline())["query"] == "Test query"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""
+Tests for adaptive per-query budgets
+Run with: python -m pytest test_budget.py
+"""
+
+from unittest.mock import Mock
+from budget import (
+    QUERY_PROFILES, TokenBudget, classify_query, estimate_profile_tokens, plan_query, shared_budget
+)
+
+
+class TestClassifier:
+    """Test query complexity classification"""
+
+    def test_simple_factual_query(self):
+        """Test that short definitional questions are simple"""
+        assert classify_query("What is photosynthesis?") == "simple"
+        assert classify_query("Define machine learning") == "simple"
+
+    def test_recent_query_is_not_simple(self):
+        """Test that recency questions need at least a standard budget"""
+        assert classify_query("What are the latest AI breakthroughs?") == "standard"
+
+    def test_comparative_query_is_deep(self):
+        """Test that comparative questions get the deep budget"""
+        assert classify_query("Compare renewable energy adoption across continents") == "deep"
+        assert classify_query("Solar versus nuclear for grid stability") == "deep"
+
+
+class TestPlanning:
+    """Test budget-aware profile selection"""
+
+    def test_plan_without_budget_uses_classifier(self):
+        """Test that planning without a budget returns the preferred profile"""
+        assert plan_query("Compare GPUs and TPUs") == QUERY_PROFILES["deep"]
+
+    def test_plan_downgrades_when_budget_is_low(self):
+        """Test that a nearly exhausted budget forces a cheaper profile"""
+        budget = TokenBudget(tokens_per_minute=12000)
+        budget.record(12000 - estimate_profile_tokens(QUERY_PROFILES["standard"]))
+
+        assert plan_query("Compare GPUs and TPUs", budget).name == "standard"
+
+    def test_profile_costs_are_ordered(self):
+        """Test that deeper profiles are estimated to cost more"""
+        costs = [estimate_profile_tokens(QUERY_PROFILES[n]) for n in ("simple", "standard", "deep")]
+
+        assert costs == sorted(costs)
+
+
+class TestAdaptiveRun:
+    """Test adaptive settings flowing into the agents"""
+
+    def test_adaptive_run_applies_profile(self):
+        """Test that an adaptive run caps iterations, sources and output tokens"""
+        from agents import create_research_workflow, run_research_assistant
+
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="There is a gap.")
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": f"Result {i}"} for i in range(5)]
+        budget = TokenBudget()
+
+        workflow = create_research_workflow(mock_llm, mock_search)
+        result = run_research_assistant("What is AI?", workflow=workflow, adaptive=True, budget=budget)
+
+        assert result["query_class"] == "simple"
+        assert result["iteration"] == 1
+        assert mock_llm.invoke.call_args.kwargs == {"max_tokens": 512}
+        assert "Source 3" not in mock_llm.invoke.call_args_list[0][0][0][1].content
+        assert budget.used() > 0
+
+    def test_shared_budget(self, monkeypatch):
+        """Test that runs in one process share a budget, set by argument or TOKEN_BUDGET"""
+        monkeypatch.delenv("TOKEN_BUDGET", raising=False)
+        assert shared_budget() is None and shared_budget(0) is None
+
+        monkeypatch.setenv("TOKEN_BUDGET", "9000")
+        assert shared_budget() is shared_budget(9000)
+        assert shared_budget().tokens_per_minute == 9000
+
+    def test_cli_budget_downgrades(self, tmp_path, monkeypatch, capsys):
+        """Test that main.py --budget plans the run against the budget"""
+        import main
+        (tmp_path / "corpus").mkdir()
+        (tmp_path / "corpus" / "notes.md").write_text("GPUs train models.\n\nTPUs run matrix maths.\n")
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("LLM_PROVIDER", "stub")
+
+        budget = estimate_profile_tokens(QUERY_PROFILES["simple"]) + 100
+        result = main.run(main.parse_args(
+            ["Compare GPUs and TPUs", "--search", "local", "--corpus", str(tmp_path / "corpus"), "--budget", str(budget)]
+        ))
+
+        assert result["query_class"] == "simple"
+        assert shared_budget(budget).used() > 0
+        assert f"of {budget:,} used this minute" in capsys.readouterr().out
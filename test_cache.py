@@ -0,0 +1,103 @@
+"""
+Tests for the shared result cache
+Run with: python -m pytest test_cache.py
+"""
+
+import threading
+import time
+from cache import ResultCache, cache_key
+
+
+class FakeClock:
+    """Manually advanced time source"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKeys:
+    """Test cache key construction"""
+
+    def test_query_spelling_is_normalized(self):
+        """Test that case and whitespace differences share a key"""
+        assert cache_key("What is  X?", max_iterations=2) == cache_key("what is x?", max_iterations=2)
+
+    def test_settings_change_the_key(self):
+        """Test that answer-changing settings are part of the key"""
+        assert cache_key("q", max_iterations=2) != cache_key("q", max_iterations=3)
+        assert cache_key("q", adaptive=None) == cache_key("q")
+
+
+class TestExpiry:
+    """Test TTL, staleness and eviction"""
+
+    def test_stale_then_expired(self):
+        """Test that entries turn stale before they expire"""
+        clock = FakeClock()
+        cache = ResultCache(ttl=100, stale_after=30, clock=clock)
+        cache.put("k", {"final_summary": "S"})
+
+        assert not cache.is_stale(cache.get("k"))
+        clock.now += 50
+        assert cache.is_stale(cache.get("k"))
+        clock.now += 50
+        assert cache.get("k") is None
+        assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": 2 / 3, "entries": 0}
+
+    def test_least_recently_used_evicted(self):
+        """Test that reading an entry protects it from eviction"""
+        cache = ResultCache(max_entries=2)
+        cache.put("a", {})
+        cache.put("b", {})
+        cache.get("a")
+        cache.put("c", {})
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+
+class TestGetOrRun:
+    """Test compute-on-miss behavior"""
+
+    def test_hit_refresh_and_uncacheable(self):
+        """Test hits, forced refreshes and results that are not stored"""
+        cache = ResultCache()
+        calls = []
+
+        def run():
+            calls.append(1)
+            return {"final_summary": f"run {len(calls)}"}
+
+        assert cache.get_or_run("k", run)[1] is False
+        entry, hit = cache.get_or_run("k", run)
+        assert hit and entry.result["final_summary"] == "run 1"
+
+        entry, hit = cache.get_or_run("k", run, refresh=True)
+        assert not hit and entry.result["final_summary"] == "run 2"
+
+        cache.get_or_run("partial", run, cacheable=lambda result: False)
+        assert cache.stats()["entries"] == 1
+
+    def test_concurrent_requests_run_once(self):
+        """Test that users asking the same question at once share one run"""
+        cache = ResultCache()
+        calls = []
+
+        def run():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"final_summary": "S"}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_run("k", run)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert sorted(hit for _, hit in results) == [False, True, True, True]
@@ -0,0 +1,178 @@
+"""
+Tests for the warm research daemon
+Run with: python -m pytest test_daemon.py
+"""
+
+import io
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import pytest
+import main
+from daemon import ResearchDaemon, _peer_uid, request, run_remote, start_background
+
+ARGS = ["--search", "local", "--corpus", "corpus", "--max-iterations", "1"]
+
+
+@pytest.fixture(scope="module")
+def project(tmp_path_factory):
+    """An offline project directory (local corpus; the stub LLM is set per test)"""
+    path = tmp_path_factory.mktemp("project")
+    (path / "corpus").mkdir()
+    (path / "corpus" / "notes.md").write_text(
+        "Quantum computers use qubits.\n\nSurface codes correct errors.\n\nSolar panels are getting cheaper.\n"
+    )
+    return path
+
+
+@pytest.fixture
+def offline(project, monkeypatch):
+    """Run from the project directory with the stub LLM"""
+    monkeypatch.chdir(project)
+    monkeypatch.setenv("LLM_PROVIDER", "stub")
+    return project
+
+
+@pytest.fixture(scope="module")
+def socket_path():
+    """A short socket path (AF_UNIX paths are limited to ~100 characters)"""
+    directory = tempfile.mkdtemp()
+    yield os.path.join(directory, "daemon.sock")
+    shutil.rmtree(directory)
+
+
+def start_daemon(project, socket_path):
+    cwd, provider = os.getcwd(), os.environ.get("LLM_PROVIDER")
+    os.chdir(project)
+    os.environ["LLM_PROVIDER"] = "stub"
+    try:
+        return start_background(socket_path, os.path.join(project, "daemon.log"))
+    finally:
+        os.chdir(cwd)
+        if provider is None:
+            os.environ.pop("LLM_PROVIDER")
+        else:
+            os.environ["LLM_PROVIDER"] = provider
+
+
+@pytest.fixture(scope="module")
+def daemon(project, socket_path):
+    """A daemon process serving the project directory, shared by the module"""
+    yield start_daemon(project, socket_path)
+    request({"command": "stop"}, socket_path)
+
+
+def remote(argv, socket_path):
+    out = io.StringIO()
+    code = run_remote(argv, socket_path, stdout=out, stderr=io.StringIO())
+    return code, out.getvalue()
+
+
+class TestDaemon:
+    """Test runs served by a warm daemon"""
+
+    def test_same_output_as_in_process(self, daemon, offline, socket_path, capsys):
+        """Test that a daemon run prints what an in-process run prints"""
+        runs = request({"command": "status"}, socket_path)["runs"]
+        code, output = remote(["quantum error correction"] + ARGS, socket_path)
+        main.run(main.parse_args(["quantum error correction"] + ARGS))
+
+        assert code == 0
+        assert "📊 FINAL SUMMARY" in output
+        assert output == capsys.readouterr().out
+
+        status = request({"command": "status"}, socket_path)
+        assert status["pid"] != os.getpid()
+        assert status["runs"] == runs + 1 and status["active"] == 0
+        assert status["workflows"] == 2  # the warm-up default and the local-search one
+
+    def test_concurrent_runs_get_their_own_output(self, daemon, offline, socket_path):
+        """Test that prints from overlapping runs reach the right client"""
+        results = {}
+
+        def ask(query):
+            results[query] = remote([query] + ARGS, socket_path)
+
+        threads = [threading.Thread(target=ask, args=(q,)) for q in ("quantum qubits", "solar panels")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results["quantum qubits"][0] == results["solar panels"][0] == 0
+        assert "Query: quantum qubits" in results["quantum qubits"][1]
+        assert "solar panels" not in results["quantum qubits"][1]
+        assert "quantum qubits" not in results["solar panels"][1]
+
+    def test_other_directory_runs_in_process(self, daemon, socket_path, tmp_path, monkeypatch):
+        """Test that the daemon refuses runs from another working directory"""
+        runs = request({"command": "status"}, socket_path)["runs"]
+        monkeypatch.chdir(tmp_path)
+        assert run_remote(["quantum"] + ARGS, socket_path) is None
+        assert request({"command": "status"}, socket_path)["runs"] == runs
+
+    def test_different_environment_runs_in_process(self, daemon, offline, socket_path, tmp_path, monkeypatch):
+        """Test that settings the daemon would ignore (here RECORD_TRACE) make it refuse the run"""
+        runs = request({"command": "status"}, socket_path)["runs"]
+        monkeypatch.setenv("RECORD_TRACE", str(tmp_path / "trace.jsonl.gz"))
+        errors = io.StringIO()
+
+        assert run_remote(["quantum"] + ARGS, socket_path, stdout=io.StringIO(), stderr=errors) is None
+        assert "RECORD_TRACE" in errors.getvalue() and "running in-process" in errors.getvalue()
+        assert request({"command": "status"}, socket_path)["runs"] == runs
+
+
+class TestSocketSecurity:
+    """Test that only the daemon's own user can reach it"""
+
+    def test_socket_is_private(self, daemon, socket_path):
+        """Test that the socket is 0600 and both ends run as the same user"""
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        left, right = socket.socketpair(socket.AF_UNIX)
+        with left, right:
+            assert _peer_uid(left) == os.getuid()
+
+    def test_shared_directory_is_refused(self, tmp_path):
+        """Test that the daemon will not listen in a directory other users can open"""
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        with pytest.raises(RuntimeError, match="not a private directory"):
+            ResearchDaemon(str(shared / "daemon.sock")).serve_forever()
+
+    def test_foreign_socket_is_ignored(self, daemon, socket_path, monkeypatch, capsys):
+        """Test that clients do not talk to a socket owned by another user"""
+        monkeypatch.setattr("daemon._uid", lambda: os.getuid() + 1)
+        assert request({"command": "status"}, socket_path) is None
+        assert "owned by uid" in capsys.readouterr().err
+
+
+class TestFallback:
+    """Test behaviour without a running daemon"""
+
+    def test_no_daemon(self, tmp_path):
+        """Test that clients report no daemon instead of failing"""
+        missing = str(tmp_path / "missing.sock")
+        assert run_remote(["quantum"], missing) is None
+        assert request({"command": "status"}, missing) is None
+
+    def test_main_falls_back_in_process(self, offline, monkeypatch, capsys):
+        """Test that main.py runs the query itself when no daemon is listening"""
+        monkeypatch.setattr("daemon.DAEMON_SOCKET", str(offline / "missing.sock"))
+        main.main(["quantum error correction"] + ARGS)
+        assert "📊 FINAL SUMMARY" in capsys.readouterr().out
+
+    def test_stale_socket_is_replaced(self, project):
+        """Test that a socket file left by a crashed daemon does not block start-up"""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "stale.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        try:
+            assert start_daemon(project, path)["runs"] == 0
+            request({"command": "stop"}, path)
+        finally:
+            shutil.rmtree(directory)
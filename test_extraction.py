@@ -0,0 +1,80 @@
+"""
+Tests for source content extraction
+Run with: python -m pytest test_extraction.py
+"""
+
+from extraction import (
+    BM25, build_research_context, dedupe_sources, hamming_distance, select_passages,
+    simhash, split_sentences, strip_boilerplate, tokenize
+)
+
+
+ARTICLE = (
+    "Quantum computers reached a new error-correction milestone this year. "
+    "Researchers demonstrated logical qubits that outperform physical ones. "
+    "The weather in the city was mild on the day of the announcement."
+)
+
+
+class TestCleaning:
+    """Test boilerplate removal and sentence splitting"""
+
+    def test_strip_boilerplate(self):
+        """Test that cookie banners and repeated lines are dropped"""
+        text = "Accept cookies to continue\nReal content here.\nReal content here.\n© 2025 Example Inc"
+
+        assert strip_boilerplate(text) == "Real content here."
+
+    def test_split_sentences(self):
+        """Test sentence splitting on punctuation"""
+        assert len(split_sentences(ARTICLE)) == 3
+
+
+class TestDeduplication:
+    """Test SimHash near-duplicate detection"""
+
+    def test_near_duplicates_share_fingerprint_bits(self):
+        """Test that a lightly edited copy is close in SimHash space"""
+        copy = ARTICLE.replace("this year", "in 2025")
+
+        assert hamming_distance(simhash(ARTICLE), simhash(copy)) < hamming_distance(
+            simhash(ARTICLE), simhash("Stock markets fell sharply after the central bank decision.")
+        )
+
+    def test_dedupe_sources_drops_syndicated_copy(self):
+        """Test that identical syndicated articles collapse to one source"""
+        results = [
+            {"url": "a", "content": ARTICLE},
+            {"url": "b", "content": ARTICLE},
+            {"url": "c", "content": "Stock markets fell sharply after the central bank decision."},
+        ]
+
+        assert [r["url"] for r in dedupe_sources(results)] == ["a", "c"]
+
+
+class TestRanking:
+    """Test BM25 passage selection"""
+
+    def test_bm25_prefers_matching_document(self):
+        """Test that documents containing query terms score higher"""
+        bm25 = BM25([tokenize("quantum error correction"), tokenize("mild weather today")])
+        scores = bm25.scores(tokenize("quantum correction"))
+
+        assert scores[0] > scores[1] == 0
+
+    def test_select_passages_respects_budget(self):
+        """Test that only the most relevant sentences fit the budget"""
+        results = [{"url": "a", "content": ARTICLE}]
+        passages = select_passages("quantum error correction milestone", results, max_chars=80)
+
+        assert len(passages) == 1
+        assert "error-correction milestone" in passages[0]["text"]
+        assert "weather" not in passages[0]["text"]
+
+    def test_build_research_context_numbers_sources(self):
+        """Test prompt formatting of selected passages"""
+        results = [{"content": "Test result 1"}, {"content": "Another finding entirely"}]
+        context = build_research_context("test", results)
+
+        assert context.startswith("Source 1: Test result 1")
+        assert "Source 2: Another finding entirely" in context
@@ -0,0 +1,106 @@
+"""
+Tests for the research history index
+Run with: python -m pytest test_history.py
+"""
+
+import os
+import pytest
+from history import HistoryIndex, get_history_index, match_expression, search_history
+from utils import migrate_results, save_research_result
+
+
+def result(query, summary="", findings=(), critiques=()):
+    return {
+        "query": query,
+        "final_summary": summary,
+        "research_results": list(findings),
+        "critique_feedback": list(critiques),
+        "iteration": 1,
+        "max_iterations": 2,
+    }
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    """A results/ directory with three saved runs, indexed as they were saved"""
+    monkeypatch.chdir(tmp_path)
+    save_research_result(result("Quantum computing error correction",
+                                "Surface codes lead error correction research."), "research_result_1.json")
+    save_research_result(result("Battery chemistry trends",
+                                "Sodium-ion cells are gaining share.",
+                                findings=["Solid-state batteries remain expensive to manufacture."]),
+                         "research_result_2.json.gz", compression="gzip")
+    save_research_result(result("Grid storage outlook",
+                                "Utilities are adding batteries alongside solar.",
+                                critiques=["The quantum sensing claim lacks a source."]),
+                         "research_result_3.json")
+    return tmp_path
+
+
+class TestMatchExpression:
+    """Test keyword to FTS5 translation"""
+
+    def test_quotes_terms_and_drops_stopwords(self):
+        """Test that operators and punctuation in user text cannot break the query"""
+        assert match_expression('the "error" OR correction*') == '"error" "correction"'
+        assert match_expression("a b", any_terms=True) == '"b"'
+        assert match_expression("?!") == ""
+
+    def test_field_filter(self):
+        """Test column filters and unknown field names"""
+        assert match_expression("solar", fields=["summary"]) == '{summary} : ("solar")'
+        with pytest.raises(ValueError):
+            match_expression("solar", fields=["title"])
+
+
+class TestHistoryIndex:
+    """Test indexing and ranked search"""
+
+    def test_saves_are_searchable(self, results_dir):
+        """Test that save_research_result updates the index incrementally"""
+        matches = search_history("error correction")
+
+        assert [m["path"] for m in matches] == [os.path.join("results", "research_result_1.json")]
+        assert "[error] [correction]" in matches[0]["snippet"].lower()
+        assert matches[0]["score"] > 0
+
+    def test_query_field_ranks_first(self, results_dir):
+        """Test BM25 field weights: a match in the question beats one in a critique"""
+        matches = search_history("quantum")
+
+        assert [m["query"] for m in matches] == ["Quantum computing error correction", "Grid storage outlook"]
+        assert search_history("quantum", fields=["critiques"])[0]["query"] == "Grid storage outlook"
+
+    def test_stemming_and_any_terms(self, results_dir):
+        """Test that word forms match and any_terms widens the search"""
+        assert {m["query"] for m in search_history("battery")} == {
+            "Battery chemistry trends", "Grid storage outlook"
+        }
+        assert search_history("sodium solar") == []
+        assert len(search_history("sodium solar", any_terms=True)) == 2
+
+    def test_refresh_tracks_changed_and_deleted_files(self, results_dir, monkeypatch):
+        """Test that a rebuilt index matches the directory and refresh is incremental"""
+        monkeypatch.setenv("HISTORY_INDEX", "0")
+        save_research_result(result("Fusion reactor milestones"), "research_result_4.json")
+        os.remove(os.path.join("results", "research_result_1.json"))
+        index = get_history_index()
+
+        assert search_history("fusion") == []
+        assert index.refresh() == {"added": 1, "updated": 0, "removed": 1}
+        assert index.refresh() == {"added": 0, "updated": 0, "removed": 0}
+        assert [m["query"] for m in search_history("fusion")] == ["Fusion reactor milestones"]
+        assert len(index) == 3
+
+        fresh = HistoryIndex(str(results_dir / "copy.db"))
+        assert fresh.refresh()["added"] == 3
+
+    def test_search_after_migrating(self, results_dir):
+        """Test that migrated results are found under their new names and the old ones are gone"""
+        migrate_results("results", "gzip")
+
+        matches = search_history("error correction")
+        assert [m["path"] for m in matches] == [os.path.join("results", "research_result_1.json.gz")]
+        assert all(os.path.exists(m["path"]) for m in search_history("battery"))
+        assert len(get_history_index()) == 3
+        assert get_history_index().refresh() == {"added": 0, "updated": 0, "removed": 0}
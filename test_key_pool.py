@@ -0,0 +1,158 @@
+"""
+Tests for API-key pooling
+Run with: python -m pytest test_key_pool.py
+"""
+
+import urllib.error
+import pytest
+from unittest.mock import Mock
+from agents import LocalChatModel, StubChatModel
+from benchmark import serve_openai_stub
+from key_pool import KeyPool, PoolExhaustedError, build_llm_pool, mask_key, parse_duration
+
+
+@pytest.fixture
+def endpoints():
+    """Start stub OpenAI-compatible servers: endpoints(quota, ...) -> [(server, client)]"""
+    servers = []
+
+    def start(*quotas):
+        started = []
+        for quota in quotas:
+            server, url = serve_openai_stub(StubChatModel(), rate_limit=(quota, 60.0) if quota else None)
+            servers.append(server)
+            started.append((server, LocalChatModel(url, "stub", f"key-{len(servers)}", max_tokens=64)))
+        return started
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def pool_of(members, **options):
+    return KeyPool([client for _, client in members], [f"key {i}" for i in range(len(members))], **options)
+
+
+class TestParsing:
+    """Test rate-limit header values and key masking"""
+
+    def test_parse_duration(self):
+        """Test Groq-style reset durations and plain seconds"""
+        assert parse_duration("7.66s") == pytest.approx(7.66)
+        assert parse_duration("2m59.56s") == pytest.approx(179.56)
+        assert parse_duration("120ms") == pytest.approx(0.12)
+        assert parse_duration("30") == 30.0
+        assert parse_duration("") is None
+
+    def test_mask_key(self):
+        """Test that stats never show a whole key"""
+        assert mask_key("gsk_abcdefghijkl") == "gsk_...ijkl"
+        assert mask_key(None) == "no key"
+
+    def test_build_llm_pool_from_env(self, monkeypatch):
+        """Test that GROQ_API_KEYS and LLM_POOL_URLS each add members"""
+        monkeypatch.setenv("GROQ_API_KEYS", "gsk_first_key_1, gsk_second_key_2")
+        monkeypatch.setenv("LLM_POOL_URLS", "http://gpu-box:8080/v1|secret-token,http://localhost:8081/v1")
+        pool = build_llm_pool(lambda *args: args, "llama-3.3-70b-versatile")
+
+        assert len(pool) == 4
+        assert [m.client[2] for m in pool.members] == ["gsk_first_key_1", "gsk_second_key_2", "secret-token", None]
+        assert pool.stats()[0]["name"] == "groq gsk_...ey_1"
+
+        monkeypatch.delenv("GROQ_API_KEYS")
+        monkeypatch.delenv("LLM_POOL_URLS")
+        assert build_llm_pool(lambda *args: args, "llama-3.3-70b-versatile") is None
+
+
+class TestBalancing:
+    """Test load balancing by remaining quota"""
+
+    def test_prefers_key_with_most_quota_left(self, endpoints):
+        """Test that calls follow the x-ratelimit-remaining headers"""
+        pool = pool_of(endpoints(3, 10))
+        for _ in range(8):
+            assert pool.invoke("Hello").content.startswith("[stub ")
+
+        small, large = pool.stats()
+        assert small["calls"] == 1 and large["calls"] == 7
+        assert large["remaining_requests"] == 3
+        assert small["rate_limited"] == large["rate_limited"] == 0
+
+    def test_exhausted_quota_is_skipped(self, endpoints):
+        """Test that a key reporting no requests left is not tried until it resets"""
+        pool = pool_of(endpoints(1, 0))
+        for _ in range(4):
+            pool.invoke("Hello")
+
+        limited, unlimited = pool.stats()
+        assert limited["calls"] == 1 and limited["rate_limited"] == 0
+        assert limited["state"] == "cooling"
+        assert unlimited["calls"] == 3
+
+
+class TestFailover:
+    """Test failover and per-key health"""
+
+    def test_rate_limited_key_fails_over(self, endpoints):
+        """Test that a 429 cools the key down for its retry-after and the call moves on"""
+        members = endpoints(1, 0)
+        members[0][1].invoke("Use up the quota")
+        pool = pool_of(members)
+
+        for _ in range(3):
+            assert pool.invoke("Hello").content
+        limited, healthy = pool.stats()
+        assert limited["rate_limited"] == 1 and limited["state"] == "cooling"
+        assert healthy["calls"] == 3
+
+    def test_revoked_and_failing_keys(self, endpoints):
+        """Test that 401s mark a key revoked and 5xx cool it down"""
+        members = endpoints(0, 0, 0)
+        members[0][0].status = 401
+        members[1][0].status = 503
+        pool = pool_of(members)
+
+        for _ in range(4):
+            assert pool.invoke("Hello").content
+        revoked, failing, healthy = pool.stats()
+        assert revoked["state"] == "revoked" and revoked["errors"] == 1
+        assert failing["state"] == "cooling" and failing["errors"] == 1
+        assert healthy["calls"] == 4 and healthy["errors"] == 0
+
+    def test_bad_request_is_not_retried(self, endpoints):
+        """Test that a 400 is raised at once instead of trying every key"""
+        members = endpoints(0, 0)
+        for server, _ in members:
+            server.status = 400
+        pool = pool_of(members)
+
+        with pytest.raises(urllib.error.HTTPError):
+            pool.invoke("Hello")
+        assert sum(m["calls"] for m in pool.stats()) == 1
+
+    def test_all_keys_down(self, endpoints):
+        """Test PoolExhaustedError once every key has failed the call"""
+        members = endpoints(0, 0)
+        for server, _ in members:
+            server.status = 500
+        pool = pool_of(members, max_wait=0.1)
+
+        with pytest.raises(PoolExhaustedError, match="500"):
+            pool.invoke("Hello")
+
+    def test_search_pool_fails_over_and_copies(self):
+        """Test pooled search tools: connection errors fail over, model_copy keeps every key"""
+        down = Mock()
+        down.invoke.side_effect = ConnectionError("unreachable")
+        up = Mock()
+        up.invoke.return_value = [{"url": "https://example.com", "content": "result"}]
+        pool = KeyPool([down, up])
+
+        # Ties rotate, so one of two calls tries the unreachable key first
+        for _ in range(2):
+            assert pool.invoke("battery chemistry") == up.invoke.return_value
+        assert [m["errors"] for m in pool.stats()] == [1, 0]
+
+        copy = pool.model_copy(update={"max_results": 5})
+        down.model_copy.assert_called_once_with(update={"max_results": 5})
+        assert len(copy) == 2
@@ -0,0 +1,123 @@
+"""
+Tests for adaptive concurrency limiting
+Run with: python -m pytest test_limiter.py
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from limiter import AdaptiveLimiter, LimitedLLM, is_rate_limited
+from scheduler import ScheduledLLM, Scheduler
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class TestSignals:
+    """Test how call outcomes move the limit"""
+
+    def test_rate_limit_detection(self):
+        """Test 429s are recognised by status code, response or name"""
+        response_error = Exception("boom")
+        response_error.response = Mock(status_code=429)
+
+        assert is_rate_limited(RateLimitError())
+        assert is_rate_limited(response_error)
+        assert is_rate_limited(Exception("Error code: 429 - rate limit reached"))
+        assert not is_rate_limited(ValueError("bad request"))
+
+    def test_slow_start_then_additive_increase(self):
+        """Test +1 per busy call until the first cut, then +1/limit"""
+        limiter = AdaptiveLimiter(initial_limit=4)
+        for _ in range(4):
+            limiter.record(limiter.epoch, 0.1, in_flight=limiter.limit)
+        assert limiter.limit == 8
+
+        limiter.record(limiter.epoch, 0.1, RateLimitError())
+        assert limiter.limit == 4
+        for _ in range(4):
+            limiter.record(limiter.epoch, 0.1, in_flight=limiter.limit)
+        assert limiter.limit == 4 and limiter.stats()["increases"] == 8
+        limiter.record(limiter.epoch, 0.1, in_flight=limiter.limit)
+        assert limiter.limit == 5
+
+    def test_idle_capacity_does_not_grow(self):
+        """Test that calls far below the limit do not raise it"""
+        limiter = AdaptiveLimiter(initial_limit=8)
+        for _ in range(20):
+            limiter.record(limiter.epoch, 0.1, in_flight=1)
+        assert limiter.limit == 8
+
+    def test_one_cut_per_epoch(self):
+        """Test that a burst of 429s from the same window halves the limit once"""
+        limiter = AdaptiveLimiter(initial_limit=16)
+        epoch = limiter.epoch
+        for _ in range(5):
+            limiter.record(epoch, 0.1, RateLimitError())
+
+        assert limiter.limit == 8
+        assert limiter.stats()["rate_limited"] == 5
+        limiter.record(limiter.epoch, 0.1, RateLimitError())
+        assert limiter.limit == 4
+
+    def test_latency_spike_backs_off(self):
+        """Test that latency well above the baseline cuts the limit, and errors do not"""
+        limiter = AdaptiveLimiter(initial_limit=10, max_limit=10)
+        for _ in range(10):
+            limiter.record(limiter.epoch, 0.1, in_flight=10, kind="llm")
+        limiter.record(limiter.epoch, 0.05, in_flight=10, kind="search")
+        limiter.record(limiter.epoch, 0.1, ValueError("bad request"))
+        assert limiter.limit == 10
+
+        epoch = limiter.epoch
+        for _ in range(3):
+            limiter.record(epoch, 1.0, in_flight=10, kind="llm")
+
+        assert limiter.limit == 8
+        assert limiter.stats()["latency_spikes"] >= 1
+
+
+class TestGating:
+    """Test the limiter as a gate and inside the scheduler"""
+
+    def test_limited_llm_caps_concurrency(self):
+        """Test that no more than the limit run at once"""
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def invoke(messages, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return Mock(content="ok")
+
+        model = LimitedLLM(Mock(invoke=Mock(side_effect=invoke)), limiter)
+        threads = [threading.Thread(target=model.invoke, args=([],)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limiter.stats()["in_flight"] == 0
+
+    def test_scheduler_follows_limiter(self):
+        """Test that the scheduler's slots track the limit and 429s still propagate"""
+        limiter = AdaptiveLimiter(initial_limit=4)
+        scheduler = Scheduler(limiter=limiter)
+        llm = Mock()
+        llm.invoke.side_effect = RateLimitError("429")
+
+        with pytest.raises(RateLimitError):
+            ScheduledLLM(llm, scheduler).invoke([])
+
+        stats = scheduler.concurrency_stats()
+        assert scheduler.concurrency == 2
+        assert stats["adaptive"] and stats["limit"] == 2 and stats["rate_limited"] == 1
+        assert stats["in_flight"] == 0
@@ -0,0 +1,119 @@
+"""
+Tests for run profiling
+Run with: python -m pytest test_profiling.py
+"""
+
+import contextvars
+import json
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from profiling import format_summary, profile_run, profile_span, traced
+
+
+def busy(seconds):
+    """Spin on the CPU so the sampler has something to see"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSpans:
+    """Test span recording and summaries"""
+
+    def test_span_is_noop_outside_run(self):
+        """Test that instrumented code runs unchanged without a profiler"""
+        with profile_span("search", "search"):
+            value = 1
+        assert traced("node")(lambda: value + 1)() == 2
+
+    def test_summary_splits_io_time(self):
+        """Test that LLM and search spans count as I/O time"""
+        with profile_run("test") as profiler:
+            with profile_span("research", "node"):
+                with profile_span("research", "llm"):
+                    time.sleep(0.02)
+                with profile_span("search", "search"):
+                    time.sleep(0.01)
+
+        summary = profiler.summary()
+        assert summary["io_ms"] >= 30
+        assert summary["wall_ms"] >= summary["io_ms"]
+        assert summary["categories_ms"]["node"] >= summary["io_ms"]
+        assert list(summary["spans_ms"])[0] == "node:research"
+        assert "Wall time" in format_summary(summary)
+
+
+    def test_overlapping_spans_count_once(self):
+        """Test that nested and concurrent spans do not push I/O time past wall time"""
+        def call():
+            with profile_span("map", "llm"):
+                time.sleep(0.05)
+
+        with profile_run("test") as profiler:
+            with profile_span("outer", "llm"):
+                with profile_span("inner", "llm"):
+                    time.sleep(0.01)
+            # Workers see the profiler through a copied context, as in map_sources
+            threads = [threading.Thread(target=contextvars.copy_context().run, args=(call,)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        summary = profiler.summary()
+        assert summary["io_ms"] <= summary["wall_ms"]
+        assert summary["categories_ms"]["llm"] == pytest.approx(summary["io_ms"])
+        # Summed, the spans would be 10 + 10 + 4 x 50 = 220 ms
+        assert 50 <= summary["spans_ms"]["llm:map"] < 100
+        assert 60 <= summary["io_ms"] < 120
+
+
+class TestSpeedscope:
+    """Test the flame graph export"""
+
+    def test_events_are_balanced(self, tmp_path):
+        """Test that every opened frame is closed, including abandoned spans"""
+        with profile_run("test") as profiler:
+            with profile_span("outer"):
+                with profile_span("inner"):
+                    pass
+            profiler.span("abandoned").__enter__()
+
+        path = profiler.save(str(tmp_path / "run.speedscope.json"))
+        with open(path) as f:
+            doc = json.load(f)
+
+        events = doc["profiles"][0]["events"]
+        assert [e["type"] for e in events].count("O") == [e["type"] for e in events].count("C") == 3
+        names = [doc["shared"]["frames"][e["frame"]]["name"] for e in events]
+        assert names[:4] == ["python:outer", "python:inner", "python:inner", "python:outer"]
+
+    def test_sampler_collects_stacks(self):
+        """Test that sampling adds a sampled lane with the busy function"""
+        with profile_run("test", sample=True, interval=0.001) as profiler:
+            busy(0.05)
+
+        doc = profiler.to_speedscope()
+        sampled = [p for p in doc["profiles"] if p["type"] == "sampled"]
+        assert profiler.summary()["samples"] > 0
+        frames = {doc["shared"]["frames"][i]["name"] for p in sampled for stack in p["samples"] for i in stack}
+        assert "busy" in frames
+
+    def test_workflow_nodes_and_calls_traced(self):
+        """Test that a workflow run records node and LLM spans"""
+        from agents import create_research_workflow, run_research_assistant
+
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="Test response")
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        workflow = create_research_workflow(mock_llm, mock_search)
+
+        with profile_run("test") as profiler:
+            run_research_assistant("Test query", max_iterations=1, workflow=workflow)
+
+        spans = profiler.summary()["spans_ms"]
+        for name in ("node:research", "node:summarize", "llm:research", "search:search", "graph:workflow"):
+            assert name in spans
@@ -0,0 +1,109 @@
+"""
+Tests for prompt templates and prompt-redundancy tracking
+Run with: python -m pytest test_prompts.py
+"""
+
+import sys
+import threading
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from prompts import (
+    BASE_SYSTEM_PROMPT, CRITIQUE_FOCUS_PROMPTS, CRITIQUE_PROMPT, CRITIQUE_VERDICT_INSTRUCTION, RESEARCH_PROMPT,
+    PromptTemplate, PromptTracker, parse_verdict, record_prompt, track_prompts
+)
+
+
+class TestPromptTemplate:
+    """Test precompiled prompt templates"""
+
+    def test_format_messages(self):
+        """Test that templates render a system and human message"""
+        messages = CRITIQUE_PROMPT.format_messages(query="Test query", research="Findings")
+
+        assert isinstance(messages[0], SystemMessage)
+        assert isinstance(messages[1], HumanMessage)
+        assert messages[0].content.startswith(BASE_SYSTEM_PROMPT)
+        assert messages[1].content == "Query: Test query\n\nResearch:\nFindings\n\nProvide brief critique:"
+
+    def test_system_prompt_is_compacted(self):
+        """Test that indentation from triple-quoted prompts is removed"""
+        assert "  " not in RESEARCH_PROMPT.system
+
+    def test_critiques_ask_for_a_verdict(self):
+        """Test that every critique prompt asks for the verdict line"""
+        for template in [CRITIQUE_PROMPT, *CRITIQUE_FOCUS_PROMPTS.values()]:
+            assert template.system.endswith(CRITIQUE_VERDICT_INSTRUCTION)
+
+    def test_parse_verdict(self):
+        """Test that only the verdict token decides, not the critique's wording"""
+        assert parse_verdict("No significant gaps or errors.\nVERDICT: DONE") == "done"
+        assert parse_verdict("Missing battery costs.\n**Verdict:** continue") == "continue"
+        assert parse_verdict("There is a gap; more research is needed.") is None
+        # Merged parallel critiques: any focus asking for another round wins
+        merged = "Factuality: Fine.\nVERDICT: DONE\n\nCoverage: Omits cost.\nVERDICT: CONTINUE"
+        assert parse_verdict(merged) == "continue"
+
+    def test_missing_field_raises(self):
+        """Test that rendering without a field fails loudly"""
+        template = PromptTemplate("t", "System", "Query: {query}\n{body}")
+
+        assert template.fields == ["query", "body"]
+        with pytest.raises(KeyError):
+            template.render(query="q")
+
+
+class TestPromptTracker:
+    """Test per-run prompt redundancy tracking"""
+
+    def test_duplicated_content_is_counted(self):
+        """Test that resent paragraphs and shared prefixes are reported"""
+        tracker = PromptTracker()
+        research = "A finding paragraph that is long enough to count as several tokens."
+
+        tracker.record("research", RESEARCH_PROMPT.format_messages(query="q", search_results="s"), research)
+        tracker.record("critique", CRITIQUE_PROMPT.format_messages(query="q", research=research))
+        report = tracker.report()
+
+        assert report["calls"][0]["duplicated_tokens"] == 0
+        assert report["calls"][1]["duplicated_tokens"] >= len(research) // 4
+        assert report["calls"][1]["cached_prefix_tokens"] >= len(BASE_SYSTEM_PROMPT) // 4
+        assert report["prompt_tokens"] == sum(c["prompt_tokens"] for c in report["calls"])
+
+    def test_concurrent_records(self):
+        """Test that worker threads sharing a tracker count a resent prompt as new only once"""
+        tracker = PromptTracker()
+        messages = [HumanMessage(content="\n".join(f"Source paragraph {i}" for i in range(2000)))]
+
+        start = threading.Barrier(8)
+
+        def worker():
+            start.wait()
+            for _ in range(2):
+                tracker.record("map_source", messages)
+
+        # Switch threads as often as possible to expose unsynchronised updates
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        calls = tracker.report()["calls"]
+        assert len(calls) == 16
+        # The first call is all new; every later one resends all of it
+        assert [c["duplicated_tokens"] for c in calls].count(0) == 1
+        assert len({c["duplicated_tokens"] for c in calls[1:]}) == 1
+
+    def test_record_prompt_outside_run_is_noop(self):
+        """Test that recording without an active tracker does nothing"""
+        record_prompt("research", [HumanMessage(content="hello")])
+
+        with track_prompts() as tracker:
+            record_prompt("research", [HumanMessage(content="hello")])
+
+        assert len(tracker.calls) == 1
@@ -0,0 +1,89 @@
+"""
+Tests for compact run records
+Run with: python -m pytest test_records.py
+"""
+
+import pytest
+from records import RunRecord, iter_records, pack_list, pack_text, unpack_list, unpack_text
+from utils import save_research_result
+
+
+STATE = {
+    "query": "What are the latest developments in quantum computing?",
+    "research_results": ["Quantum finding. " * 40, "Second finding"],
+    "critique_feedback": ["Needs more sources"],
+    "final_summary": "Summary of quantum progress. " * 20,
+    "iteration": 2,
+    "max_iterations": 2,
+    "query_class": "standard",
+}
+
+
+class TestPacking:
+    """Test text blob packing"""
+
+    def test_long_text_is_compressed(self):
+        """Test that long repetitive text is stored as smaller bytes"""
+        text = "Repetitive model output. " * 100
+        blob = pack_text(text)
+
+        assert isinstance(blob, bytes)
+        assert len(blob) < len(text) // 5
+        assert unpack_text(blob) == text
+
+    def test_short_text_stays_plain(self):
+        """Test that short text is not compressed"""
+        assert pack_text("short") == "short"
+
+    def test_list_round_trip(self):
+        """Test that lists survive packing into one blob"""
+        items = ["one", "two\n\nparagraphs", ""]
+
+        assert unpack_list(pack_list(items)) == items
+        assert unpack_list(pack_list([])) == []
+
+
+class TestRunRecord:
+    """Test conversion to and from AgentState"""
+
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_state_round_trip(self, compress):
+        """Test that to_state restores the original state"""
+        record = RunRecord.from_state(STATE, compress=compress)
+
+        assert record.to_state() == STATE
+
+    def test_queries_are_interned(self):
+        """Test that records of the same query share one string"""
+        a = RunRecord.from_state(dict(STATE, query="".join(["repeat ", "query"])))
+        b = RunRecord.from_state(dict(STATE, query="".join(["repeat", " query"])))
+
+        assert a.query is b.query
+
+    def test_slots_prevent_instance_dict(self):
+        """Test that records carry no per-instance __dict__"""
+        assert not hasattr(RunRecord.from_state(STATE), "__dict__")
+
+
+class TestLazyLoading:
+    """Test deferred loading from the result store"""
+
+    def test_fields_load_on_first_access(self, tmp_path, monkeypatch):
+        """Test that lazy records read large fields only when needed"""
+        monkeypatch.chdir(tmp_path)
+        save_research_result(STATE, "research_result_0001.json")
+
+        records = list(iter_records("results"))
+
+        assert len(records) == 1
+        record = records[0]
+        assert not record.loaded
+        assert record.query == STATE["query"]
+        assert record.iteration == 2
+        assert record.research_results == STATE["research_results"]
+        assert record.loaded
+
+    def test_unload_requires_source(self):
+        """Test that in-memory records cannot drop their only copy"""
+        with pytest.raises(ValueError):
+            RunRecord.from_state(STATE).unload()
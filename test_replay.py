@@ -0,0 +1,139 @@
+"""
+Tests for traffic record and replay
+Run with: python -m pytest test_replay.py
+"""
+
+import sys
+import time
+import pytest
+from unittest.mock import Mock
+from langchain_core.messages import HumanMessage, SystemMessage
+from agents import create_research_workflow, run_research_assistant
+from replay import (
+    Recorder, ReplayLLM, ReplayMissError, ReplaySearch, Trace, read_trace, replay_trace
+)
+from sessions import ANSWER_OR_SEARCH, FollowUpResearch, SessionStore
+
+
+def slow_llm(latency=0.05):
+    """Mock chat model whose answer depends on the prompt"""
+    def invoke(messages, **kwargs):
+        time.sleep(latency)
+        return Mock(content=f"Answer to {len(messages[1].content)} chars",
+                    response_metadata={"token_usage": {"total_tokens": 42}})
+    llm = Mock()
+    llm.invoke.side_effect = invoke
+    return llm
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    """Record one run of the default workflow"""
+    path = str(tmp_path / "trace.jsonl.gz")
+    search = Mock()
+    search.invoke.return_value = [{"url": "https://example.com", "content": "Test result"}]
+    recorder = Recorder(path)
+    workflow = create_research_workflow(slow_llm(), search, recorder=recorder)
+    result = run_research_assistant("Test query", max_iterations=1, workflow=workflow, recorder=recorder)
+    return path, result
+
+
+class TestRecorder:
+    """Test trace capture"""
+
+    def test_trace_has_runs_and_calls(self, trace_path):
+        """Test that every call is recorded with its run, latency and response"""
+        path, result = trace_path
+        entries = list(read_trace(path))
+
+        runs = [e for e in entries if e["type"] == "run"]
+        calls = [e for e in entries if e["type"] != "run"]
+        assert [r["query"] for r in runs] == ["Test query"]
+        assert runs[0]["settings"]["max_iterations"] == 1
+        assert [c["type"] for c in calls] == ["search", "llm", "llm", "llm"]
+        assert all(c["run"] == runs[0]["id"] for c in calls)
+        assert all(c["latency"] >= 0.05 for c in calls if c["type"] == "llm")
+        assert calls[-1]["response"]["content"] == result["final_summary"]
+        assert "request" not in calls[0]
+
+
+class TestReplay:
+    """Test serving recorded responses"""
+
+    def test_replay_matches_and_scales_latency(self, trace_path):
+        """Test that a replayed run gives the same answer ten times faster"""
+        path, result = trace_path
+        trace = Trace.load(path, speed=10)
+        workflow = create_research_workflow(ReplayLLM(trace), ReplaySearch(trace))
+
+        start = time.perf_counter()
+        replayed = run_research_assistant("Test query", max_iterations=1, workflow=workflow)
+
+        assert replayed["final_summary"] == result["final_summary"]
+        assert time.perf_counter() - start < 0.1
+        assert trace.stats == {"exact": 4, "fallback": 0, "miss": 0}
+
+    def test_changed_prompt_falls_back_by_prompt(self, trace_path):
+        """Test that an edited request gets the response recorded for its prompt"""
+        path, _ = trace_path
+        messages = [SystemMessage(content="Unknown role"), HumanMessage(content="New prompt")]
+
+        with pytest.raises(ReplayMissError):
+            ReplayLLM(Trace.load(path, speed=0, strict=True)).invoke(messages)
+
+        trace = Trace.load(path, speed=0)
+        assert ReplayLLM(trace).invoke(messages).content.startswith("Answer to")
+        assert trace.stats["fallback"] == 1
+
+    def test_replay_trace_reruns_recorded_queries(self, trace_path):
+        """Test the replay driver against current code"""
+        path, _ = trace_path
+
+        report = replay_trace(path, speed=10)
+
+        assert [r["query"] for r in report["runs"]] == ["Test query"]
+        assert report["runs"][0]["error"] is None
+        assert report["matches"]["miss"] == 0
+
+    def test_concurrent_replay_restores_stdout(self, tmp_path):
+        """Test that replaying runs in parallel leaves sys.stdout as it found it"""
+        path = str(tmp_path / "trace.jsonl.gz")
+        search = Mock()
+        search.invoke.return_value = [{"url": "https://example.com", "content": "Test result"}]
+        recorder = Recorder(path)
+        workflow = create_research_workflow(slow_llm(0.01), search, recorder=recorder)
+        for i in range(12):
+            run_research_assistant(f"Query {i}", max_iterations=1, workflow=workflow, recorder=recorder)
+        stdout = sys.stdout
+
+        report = replay_trace(path, speed=0, concurrency=6)
+
+        assert sys.stdout is stdout
+        assert len(report["runs"]) == 12 and report["matches"]["miss"] == 0
+
+    def test_app_sessions_replay(self, tmp_path):
+        """Test that a web-app conversation (first question, then a follow-up that searches) replays in order"""
+        path = str(tmp_path / "trace.jsonl.gz")
+
+        def invoke(messages, **kwargs):
+            if ANSWER_OR_SEARCH in messages[1].content:
+                return Mock(content="SEARCH: solar panel prices")
+            return Mock(content=f"Answer to {len(messages[1].content)} chars")
+        llm = Mock()
+        llm.invoke.side_effect = invoke
+        search = Mock()
+        search.invoke.return_value = [{"url": "https://example.com", "content": "Test result"}]
+        research = FollowUpResearch(SessionStore(), llm=llm, search_tool=search, recorder=Recorder(path))
+        research.ask("s1", "solar power adoption", max_iterations=1)
+        research.ask("s1", "How did prices change?")
+
+        entries = list(read_trace(path))
+        runs = [e for e in entries if e["type"] == "run"]
+        assert [r["session"] for r in runs] == ["s1", "s1"]
+        assert [e["type"] for e in entries if e["type"] != "run"].count("search") == 2
+
+        report = replay_trace(path, speed=0)
+
+        assert [r["query"] for r in report["runs"]] == ["solar power adoption", "How did prices change?"]
+        assert all(r["error"] is None for r in report["runs"])
+        assert report["matches"] == {"exact": len(entries) - len(runs), "fallback": 0, "miss": 0}
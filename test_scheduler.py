@@ -0,0 +1,126 @@
+"""
+Tests for priority scheduling and fair queuing
+Run with: python -m pytest test_scheduler.py
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from scheduler import (
+    QuotaExceededError, ScheduledLLM, Scheduler, current_job, scheduling
+)
+
+
+def run_in_order(scheduler, jobs):
+    """
+    Hold the only slot, queue (tenant, priority) jobs one by one, then release
+
+    Returns:
+        Labels in the order the scheduler dispatched them
+    """
+    release = threading.Event()
+    order = []
+    holder = threading.Thread(target=scheduler.run, args=(release.wait, 1))
+    holder.start()
+    while scheduler._active == 0:
+        time.sleep(0.001)
+
+    threads = []
+    for i, (tenant, priority) in enumerate(jobs):
+        def job(tenant=tenant, priority=priority, label=f"{tenant}-{i}"):
+            with scheduling(tenant, priority):
+                scheduler.run(lambda: order.append(label), 100)
+        thread = threading.Thread(target=job)
+        thread.start()
+        while len(scheduler._pending) < i + 1:
+            time.sleep(0.001)
+        threads.append(thread)
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join()
+    return order
+
+
+class TestContext:
+    """Test tenant and priority attribution"""
+
+    def test_defaults_and_nesting(self):
+        """Test that scheduling blocks override and restore the current job"""
+        assert current_job() == ("default", "interactive")
+        with scheduling("team-a", "batch"):
+            with scheduling(priority="interactive"):
+                assert current_job() == ("team-a", "interactive")
+            assert current_job() == ("team-a", "batch")
+        assert current_job() == ("default", "interactive")
+
+    def test_unknown_priority_rejected(self):
+        """Test that only known priority classes are accepted"""
+        with pytest.raises(ValueError):
+            with scheduling(priority="urgent"):
+                pass
+
+
+class TestFairQueue:
+    """Test dispatch order"""
+
+    def test_interactive_jumps_batch_backlog(self):
+        """Test that an interactive call is served before queued batch calls"""
+        scheduler = Scheduler(max_concurrent=1)
+        order = run_in_order(scheduler, [("a", "batch"), ("a", "batch"), ("a", "batch"), ("b", "interactive")])
+
+        assert order[0] == "b-3"
+        assert scheduler.wait_stats()["batch"]["count"] == 3
+
+    def test_tenants_share_batch_capacity(self):
+        """Test that a tenant queueing more calls does not crowd out another"""
+        scheduler = Scheduler(max_concurrent=1)
+        order = run_in_order(scheduler, [("a", "batch")] * 4 + [("b", "batch")] * 2)
+
+        assert order[:4] == ["a-0", "b-4", "a-1", "b-5"]
+
+    def test_quota_exceeded(self):
+        """Test that a tenant over its quota is refused"""
+        scheduler = Scheduler(tenant_quotas={"a": 500})
+        with scheduling("a"):
+            scheduler.run(lambda: None, 400)
+            with pytest.raises(QuotaExceededError):
+                scheduler.run(lambda: None, 400)
+        assert scheduler.usage() == {"a": 400}
+
+
+class TestScheduledClients:
+    """Test the LLM wrapper and workflow integration"""
+
+    def test_usage_settled_from_token_usage(self):
+        """Test that tenant usage uses the provider's reported tokens"""
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(
+            content="ok", response_metadata={"token_usage": {"total_tokens": 120}}
+        )
+        scheduler = Scheduler()
+        model = ScheduledLLM(mock_llm, scheduler)
+
+        with scheduling("team-a"):
+            assert model.invoke([Mock(content="x" * 400)]).content == "ok"
+        assert scheduler.usage() == {"team-a": 120}
+
+    def test_workflow_calls_are_scheduled(self):
+        """Test that a scheduled workflow bills LLM and search calls to the tenant"""
+        from agents import create_research_workflow, run_research_assistant
+
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="Test response")
+        mock_search = Mock()
+        mock_search.invoke.return_value = [{"content": "Test result"}]
+        scheduler = Scheduler()
+
+        workflow = create_research_workflow(mock_llm, mock_search, scheduler=scheduler)
+        run_research_assistant("Test query", max_iterations=1, workflow=workflow,
+                               tenant="team-a", priority="batch")
+
+        stats = scheduler.wait_stats()
+        assert stats["batch"]["count"] == 4
+        assert stats["interactive"]["count"] == 0
+        assert list(scheduler.usage()) == ["team-a"]
@@ -0,0 +1,126 @@
+"""
+Tests for the search providers
+Run with: python -m pytest test_search.py
+"""
+
+import os
+import pytest
+from unittest.mock import Mock
+from search import (
+    HybridSearchProvider, LocalIndex, LocalSearchProvider, SearchProvider, TavilyProvider,
+    chunk_text, get_search_provider
+)
+
+
+DOCS = {
+    "quantum.md": "Quantum error correction reached a milestone.\n\nLogical qubits beat physical qubits.",
+    "energy.txt": "Solar capacity grew fastest in Asia.\n\nWind power followed closely.",
+    "notes.csv": "quantum,ignored",
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    for name, text in DOCS.items():
+        tmp_path.joinpath(name).write_text(text, encoding="utf-8")
+    return tmp_path
+
+
+class StaticProvider(SearchProvider):
+    """Provider returning a fixed ranking"""
+
+    def __init__(self, name, urls):
+        super().__init__()
+        self.name = name
+        self.urls = urls
+
+    def search(self, query, max_results):
+        return [{"url": u, "content": f"Distinct content for {u} number {i}"} for i, u in enumerate(self.urls)]
+
+
+class TestLocalIndex:
+    """Test the incremental inverted index"""
+
+    def test_chunk_text_groups_paragraphs(self):
+        """Test that paragraphs are grouped up to the chunk size"""
+        text = "\n\n".join(["a" * 300] * 4)
+
+        assert [len(c) for c in chunk_text(text, 700)] == [602, 602]
+
+    def test_refresh_and_search(self, corpus):
+        """Test that only corpus file types are indexed and ranked by relevance"""
+        index = LocalIndex(str(corpus))
+
+        assert index.refresh() == {"added": 2, "updated": 0, "removed": 0}
+        results = index.search("quantum qubits", max_results=5)
+        assert results[0]["title"] == "quantum"
+        assert all(r["title"] != "energy" for r in results)
+
+    def test_refresh_is_incremental(self, corpus):
+        """Test that refresh re-reads only changed files and drops deleted ones"""
+        index = LocalIndex(str(corpus))
+        index.refresh()
+
+        assert index.refresh() == {"added": 0, "updated": 0, "removed": 0}
+
+        corpus.joinpath("energy.txt").write_text("Quantum batteries are new.", encoding="utf-8")
+        os.remove(corpus / "quantum.md")
+
+        assert index.refresh() == {"added": 0, "updated": 1, "removed": 1}
+        assert [r["title"] for r in index.search("quantum")] == ["energy"]
+
+    def test_save_and_load(self, corpus, tmp_path):
+        """Test that a reloaded index answers the same and skips unchanged files"""
+        index = LocalIndex(str(corpus))
+        index.refresh()
+        path = str(tmp_path / "index.json")
+        index.save(path)
+
+        loaded = LocalIndex.load(path)
+
+        assert loaded.search("solar") == index.search("solar")
+        assert loaded.refresh() == {"added": 0, "updated": 0, "removed": 0}
+
+
+class TestProviders:
+    """Test provider wrappers and fusion"""
+
+    def test_tavily_provider_normalizes_results(self):
+        """Test that Tavily results are trimmed and normalized"""
+        client = Mock()
+        client.invoke.return_value = [{"url": "u1", "content": "c1"}, {"url": "u2", "content": "c2"}]
+
+        results = TavilyProvider(client).invoke("query", max_results=1)
+
+        assert results == [{"url": "u1", "title": "", "content": "c1", "score": 0.0}]
+
+    def test_hybrid_fuses_rankings(self):
+        """Test that results ranked well by both providers come first"""
+        hybrid = HybridSearchProvider([
+            StaticProvider("web", ["a", "b", "c"]),
+            StaticProvider("local", ["c", "d"]),
+        ])
+
+        results = hybrid.invoke("query", max_results=3)
+
+        assert [r["url"] for r in results] == ["c", "a", "b"]
+        assert results[0]["providers"] == ["web", "local"]
+
+    def test_unknown_provider_rejected(self):
+        """Test provider name validation"""
+        with pytest.raises(ValueError):
+            get_search_provider("bing")
+
+    def test_offline_workflow_with_local_search(self, corpus):
+        """Test the full pipeline against the local corpus"""
+        from agents import create_research_workflow, run_research_assistant
+
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(content="Test response")
+        workflow = create_research_workflow(mock_llm, LocalSearchProvider(str(corpus)))
+
+        result = run_research_assistant("quantum qubits", max_iterations=1, workflow=workflow)
+
+        research_prompt = mock_llm.invoke.call_args_list[0][0][0][1].content
+        assert "Logical qubits" in research_prompt
+        assert result["final_summary"] == "Test response"
@@ -0,0 +1,130 @@
+"""
+Tests for conversational follow-up sessions
+Run with: python -m pytest test_sessions.py
+"""
+
+import pytest
+from unittest.mock import Mock
+from sessions import ANSWER_OR_SEARCH, FollowUpResearch, Session, SessionStore
+
+
+SOURCES = [
+    {"url": "https://example.com/a", "content": "Solar capacity grew fastest in Asia last year."},
+    {"url": "https://example.com/b", "content": "Rooftop panels got cheaper in Europe."},
+]
+
+
+def make_research(replies=None):
+    """FollowUpResearch over mocks; `replies` answer follow-up calls in order"""
+    llm = Mock()
+    llm.invoke.return_value = Mock(content="Solar grew in Asia.")
+    search = Mock()
+    search.invoke.return_value = list(SOURCES)
+    research = FollowUpResearch(SessionStore(), llm=llm, search_tool=search)
+    research.ask("s1", "solar power adoption", max_iterations=1)
+    if replies:
+        llm.invoke.side_effect = [Mock(content=reply) for reply in replies]
+    return research, llm, search
+
+
+class TestSessionStore:
+    """Test session bounds"""
+
+    def test_lru_eviction_and_ttl(self):
+        """Test that the oldest and idle sessions are dropped"""
+        store = SessionStore(max_sessions=2, ttl=60)
+        first = store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+
+        assert store.get("a") is first
+        assert store.get("b") is not None and store.evicted == 2
+
+        first.updated -= 120
+        assert store.get("a") is not first
+
+    def test_session_bounds_sources_and_turns(self):
+        """Test that sources dedupe by URL and both lists are capped"""
+        session = Session("s", max_sources=2, max_turns=2)
+
+        assert session.add_sources(SOURCES) == SOURCES
+        assert session.add_sources(SOURCES[:1]) == []
+        session.add_sources([{"url": "https://example.com/c", "content": "New"}])
+        for i in range(3):
+            session.add_turn(f"q{i}", f"a{i}")
+
+        assert list(session.sources) == ["https://example.com/a", "https://example.com/c"]
+        assert [t["query"] for t in session.turns] == ["q1", "q2"]
+        assert session.findings().startswith("a2")
+
+
+class TestFollowUp:
+    """Test answering follow-ups from session state"""
+
+    def test_first_question_runs_full_research(self):
+        """Test that a new session's question runs the workflow and keeps its sources"""
+        research, llm, search = make_research()
+        session = research.store.get("s1")
+
+        assert search.invoke.call_count == 1
+        assert llm.invoke.call_count == 3
+        assert len(session.sources) == 2 and session.state["final_summary"]
+
+    def test_first_question_searches_at_run_depth(self):
+        """Test that the workflow does the first search, with the adaptive profile's source count"""
+        llm = Mock()
+        llm.invoke.return_value = Mock(content="Looks good")
+        search = Mock()
+        search.invoke.return_value = [{"url": f"https://example.com/{i}", "content": f"Source {i}"} for i in range(8)]
+        research = FollowUpResearch(SessionStore(), llm=llm, search_tool=search)
+
+        state = research.ask("s1", "Compare solar versus wind costs, reliability, and land use", adaptive=True)
+
+        assert state["query_class"] == "deep"
+        assert search.invoke.call_count == 1
+        assert len(state["sources"]) == 5 and len(research.store.get("s1").sources) == 5
+
+    def test_cached_first_answer_seeds_new_session(self):
+        """Test that a first run's state (as the web app caches it) gives another session its sources"""
+        research, llm, search = make_research()
+        state = research.ask("s2", "solar power adoption", max_iterations=1)
+        searches = search.invoke.call_count
+        llm.invoke.return_value = Mock(content="Asia led solar growth.")
+
+        assert state["sources"] == SOURCES
+        session = research.adopt("s3", state)
+        result = research.ask("s3", "Which region grew most?")
+
+        assert list(session.sources) == [source["url"] for source in SOURCES]
+        assert result["follow_up"] and not result["searched"]
+        assert "Rooftop panels" in llm.invoke.call_args[0][0][1].content
+        assert search.invoke.call_count == searches
+
+    def test_follow_up_answered_without_search(self):
+        """Test that a follow-up the findings cover costs one call and no search"""
+        research, llm, search = make_research(["Asia led solar growth."])
+
+        result = research.ask("s1", "Which region grew most?")
+
+        assert result["follow_up"] and not result["searched"]
+        assert result["final_summary"] == "Asia led solar growth."
+        assert llm.invoke.call_count == 4 and search.invoke.call_count == 1
+        prompt = llm.invoke.call_args[0][0][1].content
+        assert "Rooftop panels" in prompt and ANSWER_OR_SEARCH in prompt
+        assert [c["agent"] for c in result["prompt_stats"]["calls"]] == ["follow_up"]
+
+    def test_follow_up_searches_only_the_delta(self):
+        """Test that missing information triggers one narrow search and a second answer"""
+        research, llm, search = make_research(["SEARCH: solar panel prices 2024", "Panels cost less."])
+        search.invoke.return_value = SOURCES[:1] + [
+            {"url": "https://example.com/c", "content": "Panel prices fell 20% in 2024."}
+        ]
+
+        result = research.ask("s1", "How did prices change?")
+
+        assert result["searched"] and result["delta_query"] == "solar panel prices 2024"
+        assert result["new_sources"] == 1
+        assert search.invoke.call_args[0][0] == "solar panel prices 2024"
+        assert "fell 20%" in llm.invoke.call_args[0][0][1].content
+        assert research.store.get("s1").turns[-1]["answer"] == "Panels cost less."
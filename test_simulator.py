@@ -0,0 +1,113 @@
+"""
+Tests for the capacity-planning simulator
+Run with: python -m pytest test_simulator.py
+"""
+
+import pytest
+from unittest.mock import Mock
+from langchain_core.messages import AIMessage
+from agents import create_research_workflow, run_research_assistant
+from prompts import RESEARCH_PROMPT
+from replay import Recorder, llm_request_key
+from simulator import CallSample, Simulator, Workload
+
+
+def fixed_workload(continue_probability=0.0, max_iterations=1, tokens=1000):
+    """Every search takes 0.5s and every LLM call 1s and `tokens` tokens"""
+    llm_call = [CallSample(1.0, tokens // 2, tokens // 2)]
+    return Workload(
+        {"search": [CallSample(0.5, 0, 0)], "research": llm_call, "critique": llm_call,
+         "update_summary": llm_call, "summarize": llm_call},
+        continue_probability, max_iterations
+    )
+
+
+class TestFit:
+    """Test fitting a workload to recorded traffic"""
+
+    def test_fit_recorded_workflow(self, tmp_path):
+        """Test that calls recorded from create_research_workflow map to their nodes"""
+        path = str(tmp_path / "trace.jsonl.gz")
+        llm = Mock()
+        # Every critique mentions a gap, so should_continue always loops back
+        llm.invoke.return_value = AIMessage(
+            content="There is a gap in coverage.",
+            response_metadata={"token_usage": {"prompt_tokens": 300, "completion_tokens": 50, "total_tokens": 350}}
+        )
+        search = Mock()
+        search.invoke.return_value = [{"url": "https://example.com", "content": "Test result"}]
+        recorder = Recorder(path)
+        workflow = create_research_workflow(llm, search, recorder=recorder)
+        for query in ("first query", "second query"):
+            run_research_assistant(query, max_iterations=2, workflow=workflow, recorder=recorder)
+
+        workload = Workload.load(path)
+        fitted = workload.describe()
+        assert fitted["runs"] == 2 and fitted["ignored_calls"] == 0
+        assert workload.max_iterations == 2
+        assert workload.continue_probability == 1.0
+        assert {node: stats["samples"] for node, stats in fitted["nodes"].items()} == {
+            "search": 4, "research": 4, "critique": 4, "update_summary": 2, "summarize": 2
+        }
+        assert fitted["nodes"]["summarize"]["mean_tokens"] == 350
+
+    def test_continue_probability(self):
+        """Test that only critiques with iterations left count as decisions"""
+        _, label = llm_request_key(RESEARCH_PROMPT.format_messages(query="", search_results=""), {})
+        entries = [{"type": "run", "id": f"r{i}", "settings": {"max_iterations": 3}} for i in range(3)]
+        for run_id, rounds in (("r0", 1), ("r1", 2), ("r2", 3)):
+            entries += [{"type": "llm", "run": run_id, "label": label, "latency": 1.0, "response": {}}] * rounds
+
+        workload = Workload.fit(entries)
+        # Decisions: r0 stop; r1 continue, stop; r2 continue, continue (the last critique had no choice)
+        assert workload.continue_probability == pytest.approx(3 / 5)
+        assert workload.calls["research"][0] == CallSample(1.0, 0, 0)
+        assert workload.calls["summarize"][0].prompt_tokens == 2000  # no samples: RATE_LIMITS.md default
+
+
+class TestSimulation:
+    """Test predictions against cases with known answers"""
+
+    def test_uncontended_latency_is_critical_path(self):
+        """Test that a lone run takes the sum of its steps, with parallel branches overlapped"""
+        one = Simulator(fixed_workload(), concurrency=8, tpm=1e9).run(0.2, minutes=30)
+        assert one["p50_run_s"] == one["p95_run_s"] == pytest.approx(3.5)  # search + research + critique + summarize
+        assert one["p95_wait_s"] == 0 and one["rate_429"] == 0 and one["backlog"] == 0
+
+        # Round 2 runs research (1.5s with its search) alongside update_summary (1s)
+        two = Simulator(fixed_workload(1.0, 2), concurrency=8, tpm=1e9).run(0.2, minutes=30)
+        assert two["p50_run_s"] == pytest.approx(6.0)
+        assert two["iterations"] == 2.0
+
+    def test_tpm_caps_throughput_and_keys_scale_it(self):
+        """Test that 3,000-token runs saturate a 6,000 TPM key at 2 runs/min, and keys add capacity"""
+        workload = fixed_workload()
+        overloaded = Simulator(workload, keys=1, concurrency=8, tpm=6000).run(6, minutes=30)
+        one_key = Simulator(workload, keys=1, concurrency=8, tpm=6000).run(1.5, minutes=120)
+        three_keys = Simulator(workload, keys=3, concurrency=8, tpm=6000).run(4.5, minutes=120)
+
+        # Past capacity every token is used, but on a growing backlog of half-finished runs
+        assert overloaded["key_util"] > 0.85 and overloaded["runs_per_min"] <= 2
+        assert overloaded["rate_429"] > 0.3 and overloaded["backlog"] > 50
+        assert one_key["runs_per_min"] == pytest.approx(1.5, rel=0.15)
+        assert three_keys["runs_per_min"] == pytest.approx(4.5, rel=0.15)
+        assert one_key["backlog"] < 10 and three_keys["backlog"] < 10
+
+    def test_concurrency_limit_queues_calls(self):
+        """Test that too few scheduler slots show up as queueing delay"""
+        workload = fixed_workload()
+        narrow = Simulator(workload, concurrency=1, tpm=1e9).run(40, minutes=10)
+        wide = Simulator(workload, concurrency=16, tpm=1e9).run(40, minutes=10)
+
+        assert narrow["p95_wait_s"] > 1.0 and wide["p95_wait_s"] == 0
+        assert wide["runs_per_min"] == pytest.approx(40, rel=0.15)
+
+    def test_seeded_and_adaptive(self):
+        """Test repeatable results and the adaptive limiter backing off under 429s"""
+        workload = fixed_workload(0.5, 2)
+        first = Simulator(workload, concurrency="auto", tpm=6000, seed=7).run(4, minutes=20)
+        again = Simulator(workload, concurrency="auto", tpm=6000, seed=7).run(4, minutes=20)
+
+        assert first == again
+        assert first["rate_429"] > 0
+        assert 1 <= first["mean_limit"] < 4
@@ -0,0 +1,163 @@
+"""
+Tests for standing-query watch mode
+Run with: python -m pytest test_watch.py
+"""
+
+import sys
+import threading
+import pytest
+from unittest.mock import Mock
+from watch import Watcher, WatchStore, fingerprint, novelty
+
+
+QUERY = "solar power adoption"
+SOURCES = [
+    {"url": "https://example.com/a", "content": "Solar capacity grew fastest in Asia last year."},
+    {"url": "https://example.com/b", "content": "Rooftop panels got cheaper in Europe."},
+]
+
+
+class FakeSearch:
+    """Search tool returning whatever results the test sets"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        if query == "broken":
+            raise RuntimeError("search failed")
+        return list(self.results)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WatchStore(str(tmp_path / "watch.json"))
+    store.add(QUERY)
+    return store
+
+
+def make_watcher(store, reply="Solar capacity grew fastest in Asia; rooftop panels got cheaper."):
+    llm = Mock()
+    llm.invoke.return_value = Mock(content=reply)
+    search = FakeSearch(SOURCES)
+    return Watcher(store, llm=llm, search_tool=search), llm, search
+
+
+class TestStore:
+    """Test the watch list file"""
+
+    def test_add_due_and_reload(self, store, tmp_path):
+        """Test that topics persist and become due after their interval"""
+        assert not store.add(QUERY)
+        topic = store.topics[QUERY]
+        assert store.due() == [topic]
+
+        topic["last_checked"] = 1000.0
+        store.save()
+        reloaded = WatchStore(store.path)
+
+        assert reloaded.due(now=1000.0 + 3600) == []
+        assert len(reloaded.due(now=1000.0 + 24 * 3600)) == 1
+
+    def test_concurrent_saves(self, store):
+        """Test that refresh_all's workers can all save at once"""
+        errors = []
+
+        def save():
+            for _ in range(50):
+                try:
+                    store.save()
+                except OSError as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=save) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert list(WatchStore(store.path).topics) == [QUERY]
+
+    def test_fingerprint_ignores_boilerplate(self):
+        """Test that page furniture does not count as a content change"""
+        changed = {"content": SOURCES[0]["content"] + "\nSubscribe to our newsletter"}
+        assert fingerprint(changed) == fingerprint(SOURCES[0])
+        assert novelty("solar capacity asia", "Solar capacity in Asia") == 0.0
+
+
+class TestRefresh:
+    """Test incremental refreshes"""
+
+    def test_first_run_then_unchanged(self, store):
+        """Test that a refresh with no new sources makes no LLM call"""
+        watcher, llm, _ = make_watcher(store)
+
+        first = watcher.refresh(store.topics[QUERY])
+        calls = llm.invoke.call_count
+        second = watcher.refresh(store.topics[QUERY])
+
+        assert first["status"] == "created" and first["new_sources"] == 2
+        assert second == {"query": QUERY, "new_sources": 0, "status": "unchanged",
+                          "tokens": 0, "saved": first["tokens"]}
+        assert llm.invoke.call_count == calls
+
+    def test_material_change_updates_summary(self, store):
+        """Test that only the new source is sent and the summary is replaced"""
+        watcher, llm, search = make_watcher(store)
+        watcher.refresh(store.topics[QUERY])
+        search.results.append({"url": "https://example.com/c",
+                               "content": "Grid batteries now pair with most new solar farms in Texas."})
+        llm.invoke.return_value = Mock(content="Updated summary")
+
+        report = watcher.refresh(store.topics[QUERY])
+
+        prompt = llm.invoke.call_args[0][0][1].content
+        assert report["status"] == "updated" and report["new_sources"] == 1
+        assert "Texas" in prompt and "Rooftop" not in prompt.split("New sources:")[1]
+        assert 0 < report["tokens"] and report["saved"] > 0
+        assert store.topics[QUERY]["summary"] == "Updated summary"
+
+    def test_minor_and_unchanged_replies_keep_summary(self, store):
+        """Test that nothing-new sources skip or decline the update"""
+        watcher, llm, search = make_watcher(store)
+        watcher.refresh(store.topics[QUERY])
+        summary = store.topics[QUERY]["summary"]
+        calls = llm.invoke.call_count
+
+        search.results.append({"url": "https://example.com/d", "content": "Solar capacity grew in Asia."})
+        assert watcher.refresh(store.topics[QUERY])["status"] == "minor"
+        assert llm.invoke.call_count == calls
+
+        search.results.append({"url": "https://example.com/e", "content": "Wind farms expanded offshore."})
+        llm.invoke.return_value = Mock(content="UNCHANGED")
+        assert watcher.refresh(store.topics[QUERY])["status"] == "no_change"
+        assert store.topics[QUERY]["summary"] == summary
+
+    def test_refresh_all_isolates_errors(self, store):
+        """Test that a failing topic is reported and not saved while others refresh"""
+        store.add("broken")
+        watcher, _, _ = make_watcher(store)
+
+        reports = {r["query"]: r for r in watcher.refresh_all(concurrency=2)}
+
+        assert reports[QUERY]["status"] == "created"
+        assert reports["broken"]["status"] == "error"
+        reloaded = WatchStore(store.path)
+        assert reloaded.topics[QUERY]["summary"]
+        assert reloaded.topics["broken"]["last_checked"] is None
+        assert [t["query"] for t in reloaded.due()] == ["broken"]
+
+    def test_refresh_all_restores_stdout(self, store):
+        """Test that a concurrent pass leaves sys.stdout as it found it"""
+        for i in range(15):
+            store.add(f"{QUERY} {i}")
+        watcher, _, _ = make_watcher(store)
+        stdout = sys.stdout
+
+        reports = watcher.refresh_all(concurrency=8)
+
+        assert sys.stdout is stdout
+        assert [r["status"] for r in reports] == ["created"] * 16
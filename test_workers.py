@@ -0,0 +1,72 @@
+"""
+Tests for the multi-process worker pool
+Run with: python -m pytest test_workers.py
+"""
+
+import pytest
+from unittest.mock import Mock
+from workers import SharedRateLimiter, RateLimitedLLM, ResearchWorkerPool, estimate_tokens
+
+
+def offline_clients():
+    """Module-level factory so worker processes can unpickle it"""
+    from benchmark import StubLLM, StubSearch
+    return StubLLM(latency=0, cpu_iterations=10), StubSearch(latency=0)
+
+
+class TestSharedRateLimiter:
+    """Test the shared token bucket"""
+
+    def test_acquire_within_budget_does_not_wait(self):
+        """Test that acquiring available tokens returns immediately"""
+        limiter = SharedRateLimiter(tokens_per_minute=6000)
+
+        assert limiter.acquire(1000) == 0.0
+        assert limiter.available() == pytest.approx(5000, abs=10)
+
+    def test_refund_restores_tokens(self):
+        """Test that unused reservations are returned"""
+        limiter = SharedRateLimiter(tokens_per_minute=6000)
+        limiter.acquire(3000)
+        limiter.refund(2000)
+
+        assert limiter.available() == pytest.approx(5000, abs=10)
+
+
+class TestRateLimitedLLM:
+    """Test the rate-limited LLM wrapper"""
+
+    def test_invoke_reserves_and_refunds(self):
+        """Test that a call reserves prompt + output tokens and refunds the rest"""
+        mock_llm = Mock()
+        mock_llm.invoke.return_value = Mock(
+            content="ok", response_metadata={"token_usage": {"total_tokens": 100}}
+        )
+        limiter = SharedRateLimiter(tokens_per_minute=12000)
+        model = RateLimitedLLM(mock_llm, limiter, output_tokens=1000)
+
+        response = model.invoke([Mock(content="x" * 400)])
+
+        assert response.content == "ok"
+        assert limiter.available() == pytest.approx(11900, abs=10)
+
+    def test_estimate_tokens(self):
+        """Test prompt token estimation"""
+        assert estimate_tokens("x" * 400) == 101
+        assert estimate_tokens([Mock(content="x" * 400), Mock(content="y" * 400)]) == 201
+
+
+class TestResearchWorkerPool:
+    """Test the process pool end to end with offline clients"""
+
+    def test_map_returns_results_in_order(self, monkeypatch):
+        """Test that batch results come back in input order"""
+        monkeypatch.setenv("GROQ_API_KEY", "test")
+        monkeypatch.setenv("TAVILY_API_KEY", "test")
+        queries = ["first query", "second query", "third query"]
+
+        with ResearchWorkerPool(processes=2, client_factory=offline_clients) as pool:
+            outputs = pool.map(queries, max_iterations=1)
+
+        assert [o["query"] for o in outputs] == queries
+        assert all(o["result"]["final_summary"] for o in outputs)
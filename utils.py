@@ -2,26 +2,143 @@
 Utility functions for the Multi-Agent Research Assistant
 """
 
+import argparse
+import glob
+import gzip
+import html
 import json
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, TextIO, Union
 
+from profiling import profile_span
 
-def save_research_result(result: Dict[str, Any], filename: str = None) -> str:
+try:
+    import zstandard as zstd
+except ImportError:  # optional: gzip needs only the standard library
+    zstd = None
+
+
+EXPORT_FORMATS = {"md", "html", "jsonl"}
+
+# Saved-result storage formats and their file extensions
+COMPRESSION_EXTENSIONS = {"gzip": ".json.gz", "zstd": ".json.zst"}
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_LEVEL = 3
+# The current dictionary (used for new saves) and every trained version by
+# dict_id, so files compressed with an older dictionary stay readable
+ZSTD_DICTIONARY_FILE = "zstd.dict"
+ZSTD_DICTIONARY_VERSION_FILE = "zstd-{dict_id}.dict"
+
+
+def _zstd_dictionary_path(directory: str, dict_id: int = None) -> str:
+    if dict_id is None:
+        return os.path.join(directory, ZSTD_DICTIONARY_FILE)
+    return os.path.join(directory, ZSTD_DICTIONARY_VERSION_FILE.format(dict_id=dict_id))
+
+
+# Loaded dictionaries keyed by path, reloaded when the file changes
+_zstd_dictionaries: Dict[str, Any] = {}
+
+
+def _read_zstd_dictionary(path: str):
+    mtime = os.path.getmtime(path)
+    cached = _zstd_dictionaries.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = _zstd_dictionaries[path] = (mtime, zstd.ZstdCompressionDict(f.read()))
+    return cached[1]
+
+
+def _load_zstd_dictionary(directory: str, dict_id: int = None):
+    """
+    Load the current dictionary, or the one with a given dict_id
+    
+    Raises:
+        ValueError: If a file needs a dictionary that is not in the directory
+    """
+    current = _zstd_dictionary_path(directory)
+    if dict_id is None:
+        return _read_zstd_dictionary(current) if os.path.exists(current) else None
+    
+    versioned = _zstd_dictionary_path(directory, dict_id)
+    if os.path.exists(versioned):
+        return _read_zstd_dictionary(versioned)
+    # Stores trained before dictionaries were versioned only have zstd.dict
+    if os.path.exists(current) and _read_zstd_dictionary(current).dict_id() == dict_id:
+        return _read_zstd_dictionary(current)
+    raise ValueError(f"zstd dictionary {dict_id} not found in {directory}")
+
+
+def encode_result(data: Dict[str, Any], compression: str = None, directory: str = "results") -> bytes:
+    """
+    Serialize a result dictionary in one of the storage formats
+    
+    Args:
+        data: Result dictionary
+        compression: None for indented JSON, "gzip" or "zstd"
+        directory: Result store whose zstd dictionary (if trained) is used
+    
+    Returns:
+        Encoded bytes
+    """
+    if compression is None:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    
+    # Compressed files drop the indentation; it only adds bytes to compress
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    if zstd is None:
+        raise ImportError("zstd compression requires the 'zstandard' package")
+    return zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_load_zstd_dictionary(directory)).compress(raw)
+
+
+def decode_result(payload: bytes, directory: str = "results") -> Dict[str, Any]:
+    """
+    Parse a stored result, detecting gzip/zstd/plain JSON from magic bytes
+    
+    Args:
+        payload: File contents
+        directory: Result store holding the zstd dictionary, if one was used
+    
+    Returns:
+        Result dictionary
+    """
+    if payload.startswith(GZIP_MAGIC):
+        payload = gzip.decompress(payload)
+    elif payload.startswith(ZSTD_MAGIC):
+        if zstd is None:
+            raise ImportError("Reading zstd results requires the 'zstandard' package")
+        # Each frame names its dictionary, so retraining never orphans old files
+        dict_id = zstd.get_frame_parameters(payload).dict_id
+        dictionary = _load_zstd_dictionary(directory, dict_id) if dict_id else None
+        payload = zstd.ZstdDecompressor(dict_data=dictionary).decompress(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+def save_research_result(result: Dict[str, Any], filename: str = None, compression: str = None) -> str:
     """
     Save research results to a JSON file
     
     Args:
         result: The research result dictionary
         filename: Optional custom filename
+        compression: None for indented JSON, "gzip" or "zstd" (defaults to
+            the RESULT_COMPRESSION environment variable)
     
     Returns:
         Path to saved file
     """
+    compression = compression or os.getenv("RESULT_COMPRESSION") or None
+    extension = COMPRESSION_EXTENSIONS[compression] if compression else ".json"
+    
     if filename is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"research_result_{timestamp}.json"
+        filename = f"research_result_{timestamp}{extension}"
     
     # Create results directory if it doesn't exist
     os.makedirs("results", exist_ok=True)
@@ -39,8 +156,15 @@ def save_research_result(result: Dict[str, Any], filename: str = None) -> str:
         "max_iterations": result.get("max_iterations", 0)
     }
     
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(save_data, f, indent=2, ensure_ascii=False)
+    with profile_span("save_research_result", "json"):
+        with open(filepath, "wb") as f:
+            f.write(encode_result(save_data, compression))
+    
+    # Keep the full-text history index in step: one synchronous SQLite write
+    # per save, on by default (HISTORY_INDEX=0 turns it off)
+    if os.getenv("HISTORY_INDEX", "1") != "0":
+        from history import index_result
+        index_result(filepath, save_data)
     
     print(f"✅ Results saved to: {filepath}")
     return filepath
@@ -48,42 +172,139 @@ def save_research_result(result: Dict[str, Any], filename: str = None) -> str:
 
 def load_research_result(filepath: str) -> Dict[str, Any]:
     """
-    Load research results from a JSON file
+    Load research results from a JSON file (plain, gzip or zstd)
     
     Args:
-        filepath: Path to the JSON file
+        filepath: Path to the saved result
     
     Returns:
         Research result dictionary
     """
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(filepath, "rb") as f:
+        payload = f.read()
     
-    return data
+    return decode_result(payload, os.path.dirname(filepath) or ".")
 
 
-def export_to_markdown(result: Dict[str, Any], filename: str = None) -> str:
+def train_zstd_dictionary(directory: str = "results", size: int = 64 * 1024) -> str:
     """
-    Export research results to a markdown file
+    Train a zstd dictionary on the saved results in a directory
+    
+    Small files of similar LLM prose compress much better with a shared
+    dictionary. Later zstd saves into the directory use it automatically.
+    Earlier dictionaries are kept (zstd-<dict_id>.dict), so files saved
+    with them still load; migrate_results re-encodes them with the new one.
     
     Args:
-        result: The research result dictionary
-        filename: Optional custom filename
+        directory: Result store to sample from
+        size: Dictionary size in bytes
     
     Returns:
-        Path to saved file
+        Path to the dictionary file
     """
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"research_report_{timestamp}.md"
+    if zstd is None:
+        raise ImportError("Training a dictionary requires the 'zstandard' package")
     
-    # Create results directory if it doesn't exist
-    os.makedirs("results", exist_ok=True)
+    samples = []
+    for path in sorted(glob.glob(os.path.join(directory, "research_result_*"))):
+        data = load_research_result(path)
+        samples.append(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
     
-    filepath = os.path.join("results", filename)
+    dictionary = zstd.train_dictionary(size, samples)
+    # Keep this version for decoding, then make it the current one for saves
+    path = _zstd_dictionary_path(directory, dictionary.dict_id())
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    current = _zstd_dictionary_path(directory)
+    with open(current + ".tmp", "wb") as f:
+        f.write(dictionary.as_bytes())
+    os.replace(current + ".tmp", current)
+    
+    print(f"✅ Trained zstd dictionary {dictionary.dict_id()} on {len(samples)} results: {path}")
+    return path
+
+
+def _needs_current_dictionary(path: str, current) -> bool:
+    """
+    True for a .zst result compressed without the current dictionary
+    """
+    if current is None or not path.endswith(COMPRESSION_EXTENSIONS["zstd"]):
+        return False
+    with open(path, "rb") as f:
+        header = f.read(18)  # the longest zstd frame header
+    return zstd.get_frame_parameters(header).dict_id != current.dict_id()
+
+
+def migrate_results(directory: str = "results", compression: str = "gzip", keep: bool = False) -> Dict[str, int]:
+    """
+    Re-encode every saved result in a directory with the given compression
+    
+    With zstd, results already in .zst format are re-encoded too when they
+    were compressed without the current dictionary (e.g. after retraining).
+    An existing history index is updated to the new file names.
+    
+    Args:
+        directory: Result store to migrate
+        compression: "gzip", "zstd" or None (back to indented JSON)
+        keep: Keep the original files next to the migrated ones
     
-    # Generate markdown content
-    markdown_content = f"""# Research Report
+    Returns:
+        Dictionary with the number of migrated files and bytes before/after
+    """
+    extension = COMPRESSION_EXTENSIONS[compression] if compression else ".json"
+    stats = {"files": 0, "bytes_before": 0, "bytes_after": 0}
+    
+    current = _load_zstd_dictionary(directory) if compression == "zstd" else None
+    
+    from history import existing_history_index
+    index = existing_history_index(directory)
+    
+    for path in sorted(glob.glob(os.path.join(directory, "research_result_*"))):
+        stem = os.path.basename(path).split(".")[0]
+        target = os.path.join(directory, stem + extension)
+        if target == path and not _needs_current_dictionary(path, current):
+            continue
+        
+        bytes_before = os.path.getsize(path)
+        data = load_research_result(path)
+        payload = encode_result(data, compression, directory)
+        with open(target + ".tmp", "wb") as f:
+            f.write(payload)
+        os.replace(target + ".tmp", target)
+        
+        stats["files"] += 1
+        stats["bytes_before"] += bytes_before
+        stats["bytes_after"] += len(payload)
+        removed = not keep and target != path
+        if removed:
+            os.remove(path)
+        if index is not None:
+            index.add(target, data)
+            if removed:
+                index.remove(path)
+    
+    print(f"✅ Migrated {stats['files']} results to {compression or 'json'}: "
+          f"{stats['bytes_before']:,} -> {stats['bytes_after']:,} bytes")
+    return stats
+
+
+def iter_markdown_report(result: Dict[str, Any]) -> Iterator[str]:
+    """
+    Yield a research report as Markdown, one section at a time
+    
+    Sections are produced lazily so callers can stream them to a file
+    handle or HTTP response without materialising the whole report.
+    
+    Args:
+        result: The research result dictionary
+    
+    Yields:
+        Markdown text chunks in document order
+    """
+    research_results = result.get('research_results', [])
+    critique_feedback = result.get('critique_feedback', [])
+    
+    yield f"""# Research Report
 
 **Generated**: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
@@ -101,132 +322,111 @@ def export_to_markdown(result: Dict[str, Any], filename: str = None) -> str:
 
 """
     
-    for i, research in enumerate(result.get('research_results', []), 1):
-        markdown_content += f"\n### Research Iteration {i}\n\n{research}\n\n"
+    for i, research in enumerate(research_results, 1):
+        yield f"\n### Research Iteration {i}\n\n"
+        yield research
+        yield "\n\n"
     
-    markdown_content += "\n---\n\n## Critique Feedback\n\n"
+    yield "\n---\n\n## Critique Feedback\n\n"
     
-    for i, critique in enumerate(result.get('critique_feedback', []), 1):
-        markdown_content += f"\n### Critique Round {i}\n\n{critique}\n\n"
+    for i, critique in enumerate(critique_feedback, 1):
+        yield f"\n### Critique Round {i}\n\n"
+        yield critique
+        yield "\n\n"
     
-    markdown_content += f"""
+    yield f"""
 ---
 
 ## Statistics
 
-- **Total Iterations**: {result.get('iteration', 0)}
+- **Total Iterations**: {result.get('iteration', result.get('iterations', 0))}
 - **Max Iterations**: {result.get('max_iterations', 0)}
-- **Research Rounds**: {len(result.get('research_results', []))}
-- **Critique Rounds**: {len(result.get('critique_feedback', []))}
+- **Research Rounds**: {len(research_results)}
+- **Critique Rounds**: {len(critique_feedback)}
 
 ---
 
 *Generated by Multi-Agent Research Assistant*
 """
-    
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
-    
-    print(f"✅ Markdown report saved to: {filepath}")
-    return filepath
-
-
-def validate_api_keys() -> Dict[str, bool]:
-    """
-    Validate that required API keys are present
-    
-    Returns:
-        Dictionary with validation status for each key
-    """
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    groq_key = os.getenv("GROQ_API_KEY")
-    tavily_key = os.getenv("TAVILY_API_KEY")
-    
-    validation = {
-        "groq": bool(groq_key and groq_key != "your_groq_api_key_here"),
-        "tavily": bool(tavily_key and tavily_key != "your_tavily_api_key_here")
-    }
-    
-    return validation
-
-
-def print_validation_status():
-    """
-    Print API key validation status
-    """
-    validation = validate_api_keys()
-    
-    print("\n" + "="*60)
-    print("API Key Validation")
-    print("="*60)
-    
-    print(f"Groq API Key:   {'✅ Valid' if validation['groq'] else '❌ Missing or Invalid'}")
-    print(f"Tavily API Key: {'✅ Valid' if validation['tavily'] else '❌ Missing or Invalid'}")
-    
-    if not all(validation.values()):
-        print("\n⚠️  Please configure your API keys in the .env file")
-        print("See SETUP.md for instructions")
-    else:
-        print("\n✅ All API keys are configured!")
-    
-    print("="*60 + "\n")
 
 
-def format_time(seconds: float) -> str:
+def iter_html_report(result: Dict[str, Any]) -> Iterator[str]:
     """
-    Format seconds into human-readable time
+    Yield a research report as a standalone HTML document
     
     Args:
-        seconds: Time in seconds
+        result: The research result dictionary
     
-    Returns:
-        Formatted time string
+    Yields:
+        HTML text chunks in document order
     """
-    if seconds < 60:
-        return f"{seconds:.2f} seconds"
-    elif seconds < 3600:
-        minutes = seconds / 60
-        return f"{minutes:.2f} minutes"
-    else:
-        hours = seconds / 3600
-        return f"{hours:.2f} hours"
+    research_results = result.get('research_results', [])
+    critique_feedback = result.get('critique_feedback', [])
+    query = html.escape(result.get('query', 'N/A'))
+    
+    yield f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Research Report: {query}</title>
+<style>.section {{ white-space: pre-wrap; }}</style>
+</head>
+<body>
+<h1>Research Report</h1>
+<p><strong>Generated</strong>: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
+<h2>Query</h2>
+<p>{query}</p>
+<h2>Summary</h2>
+<div class="section">"""
+    yield html.escape(result.get('final_summary', 'N/A'))
+    yield "</div>\n<hr>\n<h2>Research Findings</h2>\n"
+    
+    for i, research in enumerate(research_results, 1):
+        yield f'<h3>Research Iteration {i}</h3>\n<div class="section">'
+        yield html.escape(research)
+        yield "</div>\n"
+    
+    yield "<hr>\n<h2>Critique Feedback</h2>\n"
+    
+    for i, critique in enumerate(critique_feedback, 1):
+        yield f'<h3>Critique Round {i}</h3>\n<div class="section">'
+        yield html.escape(critique)
+        yield "</div>\n"
+    
+    yield f"""<hr>
+<h2>Statistics</h2>
+<ul>
+<li><strong>Total Iterations</strong>: {result.get('iteration', result.get('iterations', 0))}</li>
+<li><strong>Max Iterations</strong>: {result.get('max_iterations', 0)}</li>
+<li><strong>Research Rounds</strong>: {len(research_results)}</li>
+<li><strong>Critique Rounds</strong>: {len(critique_feedback)}</li>
+</ul>
+<p><em>Generated by Multi-Agent Research Assistant</em></p>
+</body>
+</html>
+"""
 
 
-def truncate_text(text: str, max_length: int = 100) -> str:
+def write_markdown_report(result: Dict[str, Any], fh: TextIO) -> int:
     """
-    Truncate text to maximum length with ellipsis
+    Stream a Markdown report into an open text file handle
     
     Args:
-        text: Text to truncate
-        max_length: Maximum length
+        result: The research result dictionary
+        fh: Writable text file handle
     
     Returns:
-        Truncated text
+        Number of characters written
     """
-    if len(text) <= max_length:
-        return text
-    return text[:max_length-3] + "..."
-
-
-if __name__ == "__main__":
-    # Run validation when script is executed directly
-    print_validation_status()
-
-"""
-Utility functions for the Multi-Agent Research Assistant
-"""
-
-import json
-import os
-from datetime import datetime
-from typing import Dict, Any
+    written = 0
+    for chunk in iter_markdown_report(result):
+        written += fh.write(chunk)
+    return written
 
 
-def save_research_result(result: Dict[str, Any], filename: str = None) -> str:
+def export_to_markdown(result: Dict[str, Any], filename: str = None) -> str:
     """
-    Save research results to a JSON file
+    Export research results to a markdown file
     
     Args:
         result: The research result dictionary
@@ -237,114 +437,119 @@ def save_research_result(result: Dict[str, Any], filename: str = None) -> str:
     """
     if filename is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"research_result_{timestamp}.json"
+        filename = f"research_report_{timestamp}.md"
     
     # Create results directory if it doesn't exist
     os.makedirs("results", exist_ok=True)
     
     filepath = os.path.join("results", filename)
     
-    # Prepare data for JSON serialization
-    save_data = {
-        "timestamp": datetime.now().isoformat(),
-        "query": result.get("query", ""),
-        "final_summary": result.get("final_summary", ""),
-        "research_results": result.get("research_results", []),
-        "critique_feedback": result.get("critique_feedback", []),
-        "iterations": result.get("iteration", 0),
-        "max_iterations": result.get("max_iterations", 0)
-    }
-    
     with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(save_data, f, indent=2, ensure_ascii=False)
+        write_markdown_report(result, f)
     
-    print(f"✅ Results saved to: {filepath}")
+    print(f"✅ Markdown report saved to: {filepath}")
     return filepath
 
 
-def load_research_result(filepath: str) -> Dict[str, Any]:
+def _open_text(path: str, compression: str = None) -> TextIO:
     """
-    Load research results from a JSON file
-    
-    Args:
-        filepath: Path to the JSON file
-    
-    Returns:
-        Research result dictionary
+    Open a text file for writing, optionally through gzip or zstd
     """
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    return data
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    if compression == "zstd":
+        if zstd is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        return zstd.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
 
 
-def export_to_markdown(result: Dict[str, Any], filename: str = None) -> str:
+def _unique_stem(directory: str, stem: str, extensions: Iterable[str]) -> str:
     """
-    Export research results to a markdown file
+    Return stem, or stem with a numeric suffix, so that no stem+extension exists yet
+    """
+    candidate, number = stem, 1
+    while any(os.path.exists(os.path.join(directory, candidate + ext)) for ext in extensions):
+        number += 1
+        candidate = f"{stem}_{number}"
+    return candidate
+
+
+def bulk_export(
+    results: Iterable[Union[str, Dict[str, Any]]],
+    output_dir: str = "results",
+    formats: Iterable[str] = ("md", "html", "jsonl"),
+    compression: str = None
+) -> Dict[str, Any]:
+    """
+    Export many research results to Markdown, HTML and JSONL in one pass
+    
+    Each result is loaded (if given as a path), written to every requested
+    format and then dropped, so memory stays bounded by the largest single
+    result rather than the whole batch. Existing files are never
+    overwritten: clashing names get a numeric suffix.
     
     Args:
-        result: The research result dictionary
-        filename: Optional custom filename
+        results: Result dictionaries or paths to saved result files
+        output_dir: Directory to write exports into
+        formats: Any of "md", "html" and "jsonl"
+        compression: Compress the JSONL export with "gzip" or "zstd"
     
     Returns:
-        Path to saved file
+        Dictionary with the number of exported results and written paths
     """
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"research_report_{timestamp}.md"
-    
-    # Create results directory if it doesn't exist
-    os.makedirs("results", exist_ok=True)
-    
-    filepath = os.path.join("results", filename)
-    
-    # Generate markdown content
-    markdown_content = f"""# Research Report
-
-**Generated**: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-## Query
-
-{result.get('query', 'N/A')}
-
-## Summary
-
-{result.get('final_summary', 'N/A')}
-
----
-
-## Research Findings
-
-"""
-    
-    for i, research in enumerate(result.get('research_results', []), 1):
-        markdown_content += f"\n### Research Iteration {i}\n\n{research}\n\n"
-    
-    markdown_content += "\n---\n\n## Critique Feedback\n\n"
+    formats = set(formats)
+    unknown = formats - EXPORT_FORMATS
+    if unknown:
+        raise ValueError(f"Unsupported export formats: {', '.join(sorted(unknown))}")
     
-    for i, critique in enumerate(result.get('critique_feedback', []), 1):
-        markdown_content += f"\n### Critique Round {i}\n\n{critique}\n\n"
+    os.makedirs(output_dir, exist_ok=True)
     
-    markdown_content += f"""
----
-
-## Statistics
-
-- **Total Iterations**: {result.get('iteration', 0)}
-- **Max Iterations**: {result.get('max_iterations', 0)}
-- **Research Rounds**: {len(result.get('research_results', []))}
-- **Critique Rounds**: {len(result.get('critique_feedback', []))}
-
----
-
-*Generated by Multi-Agent Research Assistant*
-"""
-    
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
-    
-    print(f"✅ Markdown report saved to: {filepath}")
-    return filepath
+    summary = {"count": 0, "md": [], "html": [], "jsonl": None}
+    jsonl_file = None
+    if "jsonl" in formats:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = {None: "", "gzip": ".gz", "zstd": ".zst"}[compression]
+        extension = f".jsonl{suffix}"
+        stem = _unique_stem(output_dir, f"research_results_{timestamp}", [extension])
+        summary["jsonl"] = os.path.join(output_dir, stem + extension)
+        jsonl_file = _open_text(summary["jsonl"], compression)
+    
+    try:
+        for index, item in enumerate(results, 1):
+            if isinstance(item, str):
+                stem = os.path.basename(item).split(".")[0]
+                result = load_research_result(item)
+            else:
+                stem = f"research_report_{index:05d}"
+                result = item
+            # Same-named inputs (or an earlier export) must not be overwritten
+            stem = _unique_stem(output_dir, stem, [f".{fmt}" for fmt in ("md", "html") if fmt in formats])
+            
+            if "md" in formats:
+                path = os.path.join(output_dir, f"{stem}.md")
+                with open(path, "w", encoding="utf-8") as f:
+                    write_markdown_report(result, f)
+                summary["md"].append(path)
+            
+            if "html" in formats:
+                path = os.path.join(output_dir, f"{stem}.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    for chunk in iter_html_report(result):
+                        f.write(chunk)
+                summary["html"].append(path)
+            
+            if jsonl_file is not None:
+                json.dump(result, jsonl_file, ensure_ascii=False)
+                jsonl_file.write("\n")
+            
+            summary["count"] += 1
+    finally:
+        if jsonl_file is not None:
+            jsonl_file.close()
+    
+    print(f"✅ Exported {summary['count']} results to: {output_dir}")
+    return summary
 
 
 def validate_api_keys() -> Dict[str, bool]:
@@ -426,6 +631,31 @@ def truncate_text(text: str, max_length: int = 100) -> str:
     return text[:max_length-3] + "..."
 
 
+def main():
+    """
+    Utility CLI: API key validation (default) and result store maintenance
+    """
+    parser = argparse.ArgumentParser(description="Research assistant utilities")
+    sub = parser.add_subparsers(dest="command")
+    
+    migrate = sub.add_parser("migrate", help="Re-encode saved results with a compression format")
+    migrate.add_argument("--dir", default="results", help="Result directory (default: results)")
+    migrate.add_argument("--compression", choices=["gzip", "zstd", "none"], default="gzip")
+    migrate.add_argument("--keep", action="store_true", help="Keep the original files")
+    migrate.add_argument("--train-dictionary", action="store_true",
+                         help="Train a zstd dictionary on the results first")
+    
+    args = parser.parse_args()
+    
+    if args.command == "migrate":
+        compression = None if args.compression == "none" else args.compression
+        if args.train_dictionary:
+            train_zstd_dictionary(args.dir)
+        migrate_results(args.dir, compression, keep=args.keep)
+    else:
+        print_validation_status()
+
+
 if __name__ == "__main__":
     # Run validation when script is executed directly
-    print_validation_status()
+    main()
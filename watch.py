@@ -0,0 +1,389 @@
+"""
+Multi-Agent Research Assistant - Standing-Query Watch Mode
+Keeps a watch list of research topics current: each refresh searches again,
+but only new or changed sources reach the LLM, and a topic's summary is
+rewritten only when they add something material
+
+Usage:
+    python watch.py add "Latest developments in quantum computing"
+    python watch.py add --file topics.txt --interval-hours 24
+    python watch.py refresh --concurrency 8
+    python watch.py refresh --loop --every 3600
+"""
+
+import argparse
+import contextlib
+import contextvars
+import copy
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents import (
+    create_research_workflow, get_llm, get_search_provider, request_scheduler, run_research_assistant,
+    search_sources, tavily_search
+)
+from extraction import (
+    build_research_context, hamming_distance, simhash, strip_boilerplate, tokenize
+)
+from prompts import WATCH_UPDATE_PROMPT, estimate_tokens, record_prompt
+from scheduler import ScheduledLLM, ScheduledSearch, Scheduler, scheduling
+
+
+WATCH_FILE = os.getenv("WATCH_FILE", os.path.join("results", "watch.json"))
+DEFAULT_INTERVAL_HOURS = 24.0
+DEFAULT_CONCURRENCY = 8
+
+# SimHash bit distance at or below which a re-fetched page counts as unchanged
+CHANGE_DISTANCE = 3
+
+# Share of new distinct terms (not already in the summary) below which new
+# sources are recorded as seen without an LLM call
+MIN_NOVELTY = 0.25
+
+# Source text sent with an update call
+UPDATE_CONTEXT_CHARS = 1500
+UNCHANGED_REPLY = "UNCHANGED"
+
+# Scheduler tenant for watch-mode calls; they run in the batch class
+WATCH_TENANT = "watch"
+
+
+def source_key(result: Dict[str, Any]) -> str:
+    """
+    Identify a source by URL, or by its content when it has none
+    """
+    url = result.get("url")
+    if url:
+        return url
+    return "sha1:" + hashlib.sha1(result.get("content", "").encode("utf-8")).hexdigest()
+
+
+def fingerprint(result: Dict[str, Any]) -> int:
+    """
+    SimHash of a source's cleaned content, so cosmetic edits are ignored
+    """
+    return simhash(strip_boilerplate(result.get("content", "")))
+
+
+def novelty(summary: str, text: str) -> float:
+    """
+    Share of the distinct terms in `text` that the summary does not mention
+    """
+    terms = set(tokenize(text))
+    if not terms:
+        return 0.0
+    return len(terms - set(tokenize(summary))) / len(terms)
+
+
+class WatchStore:
+    """
+    JSON file holding every watched topic's last summary and seen sources
+
+    Topics are keyed by query. Writes go to a temporary file that replaces
+    the store, so an interrupted refresh never leaves a corrupt file.
+    """
+
+    def __init__(self, path: str = WATCH_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.topics: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.topics = json.load(f)
+
+    def add(self, query: str, interval_hours: float = DEFAULT_INTERVAL_HOURS) -> bool:
+        """
+        Add a topic; returns False if it is already watched
+        """
+        query = query.strip()
+        with self._lock:
+            if query in self.topics:
+                return False
+            self.topics[query] = {
+                "query": query,
+                "interval_hours": interval_hours,
+                "summary": "",
+                "sources": {},
+                "full_run_tokens": 0,
+                "last_checked": None,
+                "last_updated": None,
+                "refreshes": 0,
+            }
+        return True
+
+    def put(self, topic: Dict[str, Any]):
+        """
+        Store a refreshed topic
+        """
+        with self._lock:
+            self.topics[topic["query"]] = topic
+
+    def remove(self, query: str) -> bool:
+        """
+        Stop watching a topic; returns whether it was watched
+        """
+        with self._lock:
+            return self.topics.pop(query.strip(), None) is not None
+
+    def due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Topics never checked or not checked within their interval
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return [
+                topic for topic in self.topics.values()
+                if topic["last_checked"] is None
+                or now - topic["last_checked"] >= topic["interval_hours"] * 3600
+            ]
+
+    def save(self):
+        """
+        Write the store to disk atomically
+
+        refresh_all saves from every worker; holding the lock through the
+        rename keeps them off each other's temp file and stops an older
+        snapshot replacing a newer one.
+        """
+        with self._lock:
+            data = json.dumps(self.topics, ensure_ascii=False, indent=1)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+
+
+class Watcher:
+    """
+    Refreshes watched topics incrementally
+
+    A topic's first refresh is a normal research run. After that a refresh
+    searches again and compares the results with the sources seen so far:
+    nothing new costs no LLM tokens, marginally new sources are recorded
+    without a call, and otherwise one short update call merges only the
+    new sources into the stored summary.
+    """
+
+    def __init__(
+        self,
+        store: WatchStore,
+        llm=None,
+        search_tool=None,
+        workflow=None,
+        max_iterations: int = 1,
+        max_results: int = 5,
+        scheduler: Optional[Scheduler] = None
+    ):
+        """
+        Args:
+            store: Watch list to refresh
+            llm: Model for update calls (defaults to the summarize agent's)
+            search_tool: Search tool (defaults to SEARCH_PROVIDER)
+            workflow: Compiled workflow for first runs (built from llm/search_tool)
+            max_iterations: Research iterations of a topic's first run
+            max_results: Sources fetched per refresh
+            scheduler: Optional fair queue; watch calls are queued as batch work
+        """
+        self.store = store
+        search_tool = search_tool if search_tool is not None else get_search_provider(tavily_client=tavily_search)
+        self.workflow = workflow if workflow is not None else create_research_workflow(
+            llm, search_tool, scheduler=scheduler
+        )
+        llm = llm if llm is not None else get_llm(agent="summarize")
+        if scheduler is not None:
+            llm = ScheduledLLM(llm, scheduler)
+            search_tool = ScheduledSearch(search_tool, scheduler)
+        self.llm = llm
+        self.search_tool = search_tool
+        self.max_iterations = max_iterations
+        self.max_results = max_results
+
+    def _first_run(self, topic: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        state = run_research_assistant(
+            topic["query"], max_iterations=self.max_iterations, workflow=self.workflow,
+            search_results=results, tenant=WATCH_TENANT, priority="batch"
+        )
+        stats = state["prompt_stats"]
+        tokens = stats["prompt_tokens"] + stats["completion_tokens"]
+        topic["summary"] = state["final_summary"]
+        topic["full_run_tokens"] = tokens
+        return {"status": "created", "tokens": tokens, "saved": 0}
+
+    def _update(self, topic: Dict[str, Any], fresh: List[Dict[str, Any]]) -> Dict[str, Any]:
+        new_text = "\n".join(strip_boilerplate(result.get("content", "")) for result in fresh)
+        if novelty(topic["summary"], new_text) < MIN_NOVELTY:
+            return {"status": "minor", "tokens": 0}
+
+        context = build_research_context(topic["query"], fresh, UPDATE_CONTEXT_CHARS)
+
+        messages = WATCH_UPDATE_PROMPT.format_messages(
+            query=topic["query"], summary=topic["summary"], sources=context
+        )
+        response = self.llm.invoke(messages)
+        reply = response.content.strip()
+        record_prompt(WATCH_UPDATE_PROMPT.name, messages, reply)
+        tokens = estimate_tokens(messages) + estimate_tokens(reply)
+
+        if not reply or reply.rstrip(".").upper() == UNCHANGED_REPLY:
+            return {"status": "no_change", "tokens": tokens}
+        topic["summary"] = reply
+        return {"status": "updated", "tokens": tokens}
+
+    def refresh(self, topic: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Refresh one topic in place (the caller saves it)
+
+        Returns:
+            Report with status ('created', 'unchanged', 'minor', 'no_change',
+            'updated' or 'error'), new source count, tokens used and tokens
+            saved compared to rerunning the full pipeline
+        """
+        report = {"query": topic["query"], "new_sources": 0}
+        try:
+            with scheduling(WATCH_TENANT, "batch"):
+                results = search_sources(self.search_tool, topic["query"], self.max_results)
+
+                seen = topic["sources"]
+                fresh = []
+                for result in results:
+                    key, mark = source_key(result), fingerprint(result)
+                    if key not in seen or hamming_distance(seen[key], mark) > CHANGE_DISTANCE:
+                        fresh.append(result)
+                    seen[key] = mark
+                report["new_sources"] = len(fresh)
+
+                if not topic["summary"]:
+                    report.update(self._first_run(topic, results))
+                elif not fresh:
+                    report.update(status="unchanged", tokens=0)
+                else:
+                    report.update(self._update(topic, fresh))
+        except Exception as e:
+            report.update(status="error", tokens=0, saved=0, error=str(e))
+            return report
+
+        now = time.time()
+        topic["last_checked"] = now
+        topic["refreshes"] += 1
+        if report["status"] in ("created", "updated"):
+            topic["last_updated"] = now
+        report.setdefault("saved", max(0, topic["full_run_tokens"] - report["tokens"]))
+        return report
+
+    def refresh_all(self, concurrency: int = DEFAULT_CONCURRENCY, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Refresh every due topic (or all, with force) with bounded concurrency
+
+        Each topic is refreshed on a copy and written back on success, and
+        the store is saved after every topic so a long pass can be interrupted.
+        The agents' progress output is silenced for the whole pass.
+        """
+        topics = list(self.store.topics.values()) if force else self.store.due()
+        if not topics:
+            return []
+
+        def run(topic):
+            topic = copy.deepcopy(topic)
+            report = self.refresh(topic)
+            if report["status"] != "error":
+                self.store.put(topic)
+                self.store.save()
+            return report
+
+        # sys.stdout is process-wide, so it is swapped once here rather than in
+        # each worker, where overlapping swaps could leave it pointing nowhere
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(topics))) as pool:
+                futures = [pool.submit(contextvars.copy_context().run, run, topic) for topic in topics]
+                return [future.result() for future in futures]
+
+
+def print_report(reports: List[Dict[str, Any]], elapsed: float):
+    """
+    Print per-topic refresh results and token savings
+    """
+    for report in reports:
+        detail = f" ({report['error']})" if report.get("error") else ""
+        print(f"  {report['status']:<10} {report['new_sources']:>3} new  {report['tokens']:>6} tokens  "
+              f"{report['saved']:>6} saved  {report['query'][:60]}{detail}")
+
+    used = sum(r["tokens"] for r in reports)
+    saved = sum(r["saved"] for r in reports)
+    counts: Dict[str, int] = {}
+    for report in reports:
+        counts[report["status"]] = counts.get(report["status"], 0) + 1
+    print(f"\n✅ Refreshed {len(reports)} topics in {elapsed:.1f}s: "
+          + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    if used + saved:
+        print(f"🪙 Tokens: {used} used, {saved} saved vs full reruns ({saved / (used + saved):.0%})")
+
+
+def main():
+    """
+    Watch CLI entry point
+    """
+    parser = argparse.ArgumentParser(description="Keep standing research queries up to date")
+    parser.add_argument("--store", default=WATCH_FILE, help=f"Watch list file (default: {WATCH_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Watch one or more queries")
+    add.add_argument("query", nargs="*", help="Query to watch")
+    add.add_argument("--file", help="Text file with one query per line")
+    add.add_argument("--interval-hours", type=float, default=DEFAULT_INTERVAL_HOURS)
+
+    remove = sub.add_parser("remove", help="Stop watching a query")
+    remove.add_argument("query", nargs="+")
+
+    sub.add_parser("list", help="Show watched queries")
+
+    refresh = sub.add_parser("refresh", help="Refresh due topics")
+    refresh.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    refresh.add_argument("--max-iterations", type=int, default=1, help="Iterations of a topic's first run")
+    refresh.add_argument("--all", action="store_true", help="Refresh every topic, due or not")
+    refresh.add_argument("--loop", action="store_true", help="Keep refreshing on a schedule")
+    refresh.add_argument("--every", type=float, default=3600, help="Seconds between passes with --loop")
+    args = parser.parse_args()
+
+    store = WatchStore(args.store)
+
+    if args.command == "add":
+        queries = [" ".join(args.query)] if args.query else []
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as f:
+                queries += [line.strip() for line in f if line.strip()]
+        added = sum(store.add(query, args.interval_hours) for query in queries)
+        store.save()
+        print(f"👀 Watching {added} new topics ({len(store.topics)} total)")
+    elif args.command == "remove":
+        removed = store.remove(" ".join(args.query))
+        store.save()
+        print("🗑️ Removed" if removed else "⚠️ Not watched")
+    elif args.command == "list":
+        for topic in store.topics.values():
+            checked = topic["last_checked"]
+            when = datetime.fromtimestamp(checked).strftime("%Y-%m-%d %H:%M") if checked else "never"
+            print(f"  {when:<16}  every {topic['interval_hours']:g}h  {topic['query']}")
+    else:
+        watcher = Watcher(store, max_iterations=args.max_iterations, scheduler=request_scheduler)
+        while True:
+            start = time.perf_counter()
+            reports = watcher.refresh_all(args.concurrency, force=args.all)
+            if reports:
+                print_report(reports, time.perf_counter() - start)
+            else:
+                print("😴 No topics due")
+            if not args.loop:
+                break
+            time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Multi-Agent Research Assistant - Multi-Process Worker Pool
+Runs research queries across processes so Python-side work is not serialized
+on a single GIL, while all workers share one LLM rate-limit budget
+
+Usage:
+    python workers.py queries.txt --processes 4 --save
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from prompts import estimate_tokens
+
+
+class SharedRateLimiter:
+    """
+    Token bucket shared by every worker process
+    
+    The bucket lives in shared memory, so all processes draw from a single
+    tokens-per-minute budget (e.g. the Groq free tier's 12,000 TPM).
+    """
+    
+    def __init__(self, tokens_per_minute: int = 12000, context=None):
+        context = context or multiprocessing.get_context()
+        self.capacity = float(tokens_per_minute)
+        self._rate = self.capacity / 60.0
+        self._lock = context.Lock()
+        self._tokens = context.Value("d", self.capacity, lock=False)
+        self._updated = context.Value("d", time.time(), lock=False)
+    
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated.value)
+        self._tokens.value = min(self.capacity, self._tokens.value + elapsed * self._rate)
+        self._updated.value = now
+    
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until `tokens` are available and take them from the bucket
+        
+        Args:
+            tokens: Number of tokens the call is expected to use
+        
+        Returns:
+            Seconds spent waiting
+        """
+        tokens = min(float(tokens), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                self._refill(now)
+                if self._tokens.value >= tokens:
+                    self._tokens.value -= tokens
+                    return waited
+                wait = (tokens - self._tokens.value) / self._rate
+            time.sleep(wait)
+            waited += wait
+    
+    def refund(self, tokens: int):
+        """
+        Return over-reserved tokens to the bucket once actual usage is known
+        """
+        if tokens <= 0:
+            return
+        with self._lock:
+            self._refill(time.time())
+            self._tokens.value = min(self.capacity, self._tokens.value + tokens)
+    
+    def available(self) -> float:
+        """
+        Tokens currently available in the bucket
+        """
+        with self._lock:
+            self._refill(time.time())
+            return self._tokens.value
+
+
+class RateLimitedLLM:
+    """
+    Wraps a chat model so every invoke draws from a SharedRateLimiter
+    
+    The reservation is the estimated prompt size plus the model's output
+    cap; the unused part is refunded from the provider's token usage.
+    """
+    
+    def __init__(self, llm, limiter: SharedRateLimiter, output_tokens: int = None):
+        self.llm = llm
+        self.limiter = limiter
+        self.output_tokens = output_tokens or getattr(llm, "max_tokens", None) or 1024
+    
+    def invoke(self, messages, *args, **kwargs):
+        reserved = estimate_tokens(messages) + kwargs.get("max_tokens", self.output_tokens)
+        self.limiter.acquire(reserved)
+        response = self.llm.invoke(messages, *args, **kwargs)
+        
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        used = usage.get("total_tokens")
+        if isinstance(used, int):
+            self.limiter.refund(reserved - used)
+        return response
+    
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def default_clients() -> Tuple[Any, Any]:
+    """
+    Build the default Groq LLM and Tavily search clients
+    """
+    from agents import llm, tavily_search
+    return llm, tavily_search
+
+
+# Per-process state, populated by the pool initializer and built lazily
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(limiter: SharedRateLimiter, client_factory: Callable, quiet: bool):
+    _worker.clear()
+    _worker.update(limiter=limiter, client_factory=client_factory, quiet=quiet, workflow=None)
+
+
+def _get_workflow():
+    """
+    Build the clients and compiled graph once per worker process
+    """
+    if _worker.get("workflow") is None:
+        from agents import create_research_workflow
+        
+        model, search_tool = _worker["client_factory"]()
+        if _worker["limiter"] is not None:
+            model = RateLimitedLLM(model, _worker["limiter"])
+        _worker["workflow"] = create_research_workflow(model, search_tool)
+    return _worker["workflow"]
+
+
+def _run_query(query: str, max_iterations: int) -> Dict[str, Any]:
+    from agents import run_research_assistant
+    
+    workflow = _get_workflow()
+    start = time.perf_counter()
+    stream = io.StringIO() if _worker.get("quiet") else sys.stdout
+    with contextlib.redirect_stdout(stream):
+        state = run_research_assistant(query, max_iterations=max_iterations, workflow=workflow)
+    
+    return {
+        "query": query,
+        "result": dict(state),
+        "seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
+
+
+class ResearchWorkerPool:
+    """
+    Process pool for run_research_assistant workloads
+    
+    Each worker lazily builds its own clients and compiled workflow on its
+    first query and reuses them afterwards. Results come back over the
+    pool's pipes as plain dictionaries.
+    """
+    
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        tokens_per_minute: Optional[int] = 12000,
+        client_factory: Callable[[], Tuple[Any, Any]] = default_clients,
+        quiet: bool = True
+    ):
+        """
+        Args:
+            processes: Number of worker processes (defaults to CPU count)
+            tokens_per_minute: Shared LLM budget; None disables limiting
+            client_factory: Module-level callable returning (llm, search_tool)
+            quiet: Suppress per-run console output in workers
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.limiter = SharedRateLimiter(tokens_per_minute) if tokens_per_minute else None
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(self.limiter, client_factory, quiet)
+        )
+    
+    def submit(self, query: str, max_iterations: int = 2) -> Future:
+        """
+        Schedule a single query and return a future for its result
+        """
+        return self._executor.submit(_run_query, query, max_iterations)
+    
+    def map(self, queries: Iterable[str], max_iterations: int = 2) -> List[Dict[str, Any]]:
+        """
+        Run many queries and return their results in input order
+        """
+        futures = [self.submit(query, max_iterations) for query in queries]
+        return [future.result() for future in futures]
+    
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        self._executor.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_batch(
+    queries: Iterable[str],
+    max_iterations: int = 2,
+    processes: Optional[int] = None,
+    tokens_per_minute: Optional[int] = 12000
+) -> List[Dict[str, Any]]:
+    """
+    Run a batch of research queries across a process pool
+    
+    Args:
+        queries: Research questions
+        max_iterations: Maximum research-critique cycles per query
+        processes: Number of worker processes
+        tokens_per_minute: Shared LLM budget across all workers
+    
+    Returns:
+        One dictionary per query with its final state and timing
+    """
+    with ResearchWorkerPool(processes, tokens_per_minute) as pool:
+        return pool.map(queries, max_iterations)
+
+
+def main():
+    """
+    Batch CLI entry point
+    """
+    parser = argparse.ArgumentParser(description="Run a batch of research queries in parallel")
+    parser.add_argument("queries_file", help="Text file with one query per line")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--max-iterations", type=int, default=2)
+    parser.add_argument("--tpm", type=int, default=12000, help="Shared tokens-per-minute budget")
+    parser.add_argument("--save", action="store_true", help="Save each result to results/")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None,
+                        help="Compress saved results")
+    args = parser.parse_args()
+    
+    with open(args.queries_file, "r", encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    
+    start = time.perf_counter()
+    outputs = run_batch(queries, args.max_iterations, args.processes, args.tpm)
+    elapsed = time.perf_counter() - start
+    
+    if args.save:
+        from datetime import datetime
+        from utils import COMPRESSION_EXTENSIONS, save_research_result
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for i, output in enumerate(outputs, 1):
+            extension = COMPRESSION_EXTENSIONS[args.compression] if args.compression else ".json"
+            save_research_result(output["result"], f"research_result_{timestamp}_{i:04d}{extension}",
+                                 compression=args.compression)
+    
+    print(f"\n✅ Completed {len(outputs)} queries in {elapsed:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()